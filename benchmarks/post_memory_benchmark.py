@@ -0,0 +1,83 @@
+import argparse
+import gc
+import pickle
+import tracemalloc
+from datetime import datetime
+
+from blogging.post import Post
+
+
+#--------------------------------------------------------------------------------------------
+#
+#   bytes per post, dict-based posts with datetimes (before) vs slotted posts (after)
+#
+#   run from the repo root:     python3 -m benchmarks.post_memory_benchmark [--posts N]
+#
+#   memory is what tracemalloc sees allocated for N posts minus their strings,
+#   pickle is the size of a {code: post} checkpoint divided by N
+#
+#---------------------------------------------------------------------------------------------
+
+
+####post as it was before slots: __dict__ and two datetimes
+
+class DictPost:
+
+    def __init__(self, code, title, text, author=None):
+        self.code = code
+        self.title = title
+        self.text = text
+        self.author = author
+        self.created_at = datetime.now()
+        self.updated_at = self.created_at
+
+
+
+####(title, text, author) per post, built before measuring so only the posts count
+
+def make_fields(count):
+
+    return [(f"title {code}", f"text of post {code}", "author") for code in range(count)]
+
+
+
+####bytes allocated per post by make_post over fields
+
+def memory_per_post(make_post, fields):
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    posts = {code: make_post(code, *field) for code, field in enumerate(fields)}
+
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return (after - before) / len(fields), posts
+
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="bytes per post, before and after slots")
+    parser.add_argument("--posts", type=int, default=100000)
+    args = parser.parse_args()
+
+    fields = make_fields(args.posts)
+
+    print(f"{args.posts} posts")
+    print(f"{'':8}{'memory B/post':>16}{'pickle B/post':>16}")
+
+    for label, make_post in (("before", DictPost), ("after", Post)):
+
+        memory, posts = memory_per_post(make_post, fields)
+        size = len(pickle.dumps(posts, pickle.HIGHEST_PROTOCOL)) / args.posts
+        print(f"{label:8}{memory:16.1f}{size:16.1f}")
+
+        del posts
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import pickle
+import tempfile
+import time
+
+from blogging.blog import Blog
+from blogging.configuration import Configuration
+from blogging.dao.post_dao_pickle import PostDAOPickle
+from blogging.post import Post
+
+
+#--------------------------------------------------------------------------------------------
+#
+#   checkpoint load throughput, legacy pickle vs binary record file (posts per second)
+#
+#   run from the repo root:     python3 -m benchmarks.record_load_benchmark [--posts N] [--text N]
+#
+#   both checkpoints hold the same posts, each is loaded --repeat times into a
+#   fresh store and the best time is kept, the log is not involved
+#
+#---------------------------------------------------------------------------------------------
+
+
+####posts with text_size characters of text each
+
+def make_posts(count, text_size):
+
+    text = ("lorem ipsum " * (text_size // 12 + 1))[:text_size]
+    return {code: Post(code, f"title {code}", text, "author") for code in range(1, count + 1)}
+
+
+
+####best seconds to load the checkpoint at the store's filepath
+
+def time_load(blog, repeat):
+
+    best = None
+
+    for _ in range(repeat):
+
+        dao = PostDAOPickle(blog)
+        start = time.perf_counter()
+        dao.load_checkpoint()
+        elapsed = time.perf_counter() - start
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, len(dao.posts)
+
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="checkpoint load throughput, pickle vs records")
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--text", type=int, default=500, help="characters of text per post")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as records_path:
+
+        Configuration.records_path = records_path
+        blog = Blog(1, "benchmark", "benchmark", "benchmark@example.com")
+        posts = make_posts(args.posts, args.text)
+        writer = PostDAOPickle(blog)
+
+        print(f"{args.posts} posts, {args.text} characters of text each")
+        print(f"{'':10}{'seconds':>10}{'posts/s':>14}")
+
+        #legacy: the whole dict pickled
+        with open(writer.filepath, "wb") as file:
+            pickle.dump(posts, file)
+        seconds, loaded = time_load(blog, args.repeat)
+        print(f"{'pickle':10}{seconds:10.3f}{loaded / seconds:14.0f}")
+
+        #record file + out of line bodies
+        writer.write_checkpoint(posts)
+        seconds, loaded = time_load(blog, args.repeat)
+        print(f"{'records':10}{seconds:10.3f}{loaded / seconds:14.0f}")
+
+
+
+if __name__ == "__main__":
+    main()
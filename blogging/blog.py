@@ -1,8 +1,15 @@
 from blogging.dao.post_dao_pickle import PostDAOPickle
+from blogging.dao.post_dao_sqlite import PostDAOSQLite
+from blogging.dao.post_dao_columnar import PostDAOColumnar
+from blogging.dao.post_store_cache import get_post_store_cache
 from .post import Post
 from blogging.configuration import Configuration
 
 class Blog:
+    #no per-blog __dict__, every attribute is listed here
+    #__weakref__: daos hold the blogs they handed out weakly
+    __slots__ = ("id", "name", "url", "email", "next_post_id", "autosave", "post_backend", "_post_dao", "author_index", "__weakref__")
+
     def __init__(self, id, name, url, email):
         self.id = id
         self.name = name
@@ -12,10 +19,54 @@ class Blog:
 
         self.next_post_id = 1
 
-        #initialize dao with autosave from config
+        #autosave and backend from config, dao itself opens on first post op
         config = Configuration()
-        autosave = config.__class__.autosave
-        self.post_dao = PostDAOPickle(self, autosave=autosave)
+        self.autosave = config.__class__.autosave
+        self.post_backend = config.__class__.post_backend
+        self._post_dao = None
+        self.author_index = None    #set by the blog dao holding this blog
+
+
+
+    ####post store, loaded on first access so listing blogs never reads posts
+    ####persistent stores live in the shared lru cache and may be evicted between calls
+    @property
+    def post_dao(self):
+
+        if self.autosave:
+            return get_post_store_cache().get(self, self.open_post_dao)
+
+        #no file to reopen from => keep the store for the life of the blog
+        if self._post_dao is None: self._post_dao = self.open_post_dao()
+
+        return self._post_dao
+
+
+
+    ####release the post store, next post op reopens it
+
+    def close_post_store(self):
+
+        if self.autosave:
+            get_post_store_cache().discard(self)
+
+        elif self._post_dao is not None:
+            self._post_dao.close()
+            self._post_dao = None
+
+
+
+    ####new post store for the configured backend
+
+    def open_post_dao(self):
+
+        if self.post_backend == "sqlite":
+            return PostDAOSQLite(self, autosave=self.autosave)
+
+        if self.post_backend == "columnar":
+            return PostDAOColumnar(self, autosave=self.autosave)
+
+        return PostDAOPickle(self, autosave=self.autosave)
 
 
 
@@ -47,6 +98,15 @@ class Blog:
         if email is not None: self.email=email #fixed name to email
 
 
+    ####(6)new id, posts move with the blog
+    def change_id(self, new_id):
+
+        #store opened under the old id, its records move to the new one
+        post_dao = self.post_dao
+        self.id = new_id
+        post_dao.move_posts(new_id)
+
+
     ##########################
     ## (10 to 14) post ops  ##
     ##########################
@@ -55,11 +115,14 @@ class Blog:
     #create new post,increment code,sets timestamps
     def add_post(self, title, text, author=None):
 
+        #open store first, loading it sets next_post_id
+        post_dao = self.post_dao
         code=self.next_post_id
 
         post=Post(code, title, text, author)
 
-        self.post_dao.create_post(post)
+        post_dao.create_post(post)
+        if self.author_index is not None: self.author_index.add(self.id, code, author)
 
         #increment for next added
         self.next_post_id+=1
@@ -79,33 +142,55 @@ class Blog:
     def find_posts(self, query):
 
         return self.post_dao.retrieve_posts(query)
-        
 
 
-    #####(12)update existing post by code, updates timestamp
-    #####helper for updating post info
-    def update_info_post(self, code, title=None, text=None, author=None):
-        
-        #use dao to update title,text
-        updated = self.post_dao.update_post(code, title, text)
-        if not updated: return False
+
+    ####(11)same, yields posts as they are found
+    def iter_matching_posts(self, query, descending=False):
+
+        return self.post_dao.iter_matching_posts(query, descending)
 
 
-        post = self.get_post(code)
 
-        #check existence
-        if post is None: return False
+    ####(11)same, query is a regex, stops at deadline (monotonic) or once cancel is set
+    def iter_regex_posts(self, pattern, descending=False, deadline=None, cancel=None):
 
-        #author exists
-        if author is not None:
+        return self.post_dao.iter_regex_posts(pattern, descending, deadline, cancel)
 
-            post.author=author
-            post.update_time()
 
+
+    ####(11.1)top posts for query, ranked by relevance
+    def rank_posts(self, query, limit):
+
+        return self.post_dao.rank_posts(query, limit)
+
+
+
+    ####(11.2)posts created from start up to (not including) end, oldest first
+    def posts_created_between(self, start, end):
+
+        return self.post_dao.posts_created_between(start, end)
+
+
+
+    ####(11.3)limit most recently updated posts, newest first
+    def recently_updated_posts(self, limit):
+
+        return self.post_dao.recently_updated_posts(limit)
+
+
+
+    #####(12)update existing post by code, updates timestamp
+    #####helper for updating post info
+    def update_info_post(self, code, title=None, text=None, author=None):
         
-        #make sure change is persistent
-        if getattr(self.post_dao, "autosave", False):
-            self.post_dao.save_to_file()
+        #use dao to update title,text,author in one logged write
+        updated = self.post_dao.update_post(code, title, text, author)
+        if not updated: return False
+
+        #author changed => move the post in the author index
+        if author is not None and self.author_index is not None:
+            self.author_index.add(self.id, code, author)
 
         return True
 
@@ -114,11 +199,35 @@ class Blog:
     #####(13)delete post by code
     def delete_post_by_code(self, code):
 
-        return self.post_dao.delete_post(code)
+        deleted = self.post_dao.delete_post(code)
+        if deleted and self.author_index is not None: self.author_index.remove(self.id, code)
 
+        return deleted
 
 
-    ####(14)list all posts newest to oldest
-    def posts_listed_descending(self):
+
+    ####(14)list all posts newest to oldest, or the limit posts older than after_code
+    def posts_listed_descending(self, after_code=None, limit=None):
         # from newest to oldest (higher code first).
-        return self.post_dao.list_posts()
+        return self.post_dao.list_posts(after_code, limit)
+
+
+
+    ####(14)same, yields posts newest first
+    def iter_posts(self, after_code=None, limit=None):
+
+        return self.post_dao.iter_posts(after_code, limit)
+
+
+
+    ####(14)posts whose text holds the utf-8 bytes needle, newest first, case-sensitive
+    def iter_posts_containing_bytes(self, needle):
+
+        return self.post_dao.iter_posts_containing_bytes(needle)
+
+
+
+    ####(14)every post, newest first, written to a binary file
+    def export_posts(self, file):
+
+        self.post_dao.export_posts(file)
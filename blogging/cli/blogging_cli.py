@@ -28,6 +28,7 @@ class BloggingCLI():
 				if self.login():
 					self.main_menu_cli.main_menu()
 			elif response == 2:
+				self.controller.flush()
 				print('\nSESSION FINISHED.')
 				break
 			else:
@@ -1,6 +1,8 @@
 from blogging.controller import Controller
 from blogging.exception.illegal_access_exception import IllegalAccessException
 from blogging.exception.no_current_blog_exception import NoCurrentBlogException
+from blogging.exception.illegal_operation_exception import IllegalOperationException
+from blogging.exception.search_timeout_exception import SearchTimeoutException
 
 class EditingBlogMenuCLI():
 
@@ -68,18 +70,25 @@ class EditingBlogMenuCLI():
         print('RETRIEVE POSTS FROM BLOG BY TEXT:')
         try:
             search_string = input('Search for: ')
-            found_posts = self.controller.retrieve_posts(search_string)
-            if found_posts:
-                print('\nPosts found for %s:\n' % search_string)
-                for post in found_posts:
-                    self.print_post_data(post)
-            else:
+            regex = input('As a regular expression? (y/N): ').strip().lower() == 'y'
+            found = False
+            for post in self.controller.iter_matching_posts(search_string, regex=regex):
+                if not found:
+                    print('\nPosts found for %s:\n' % search_string)
+                    found = True
+                self.print_post_data(post)
+            if not found:
                 print('\nNo posts found for: %s\n' % search_string)
         except IllegalAccessException:
             print('\nMUST LOGIN FIRST.')
         except NoCurrentBlogException:
             print('\nERROR RETRIEVING POSTS.') 
             print('Cannot retrieve posts without a valid current blog.')
+        except IllegalOperationException as ex:
+            print('\nERROR RETRIEVING POSTS.')
+            print(ex)
+        except SearchTimeoutException:
+            print('\nSEARCH TOOK TOO LONG, STOPPED.')
 
     # helper method to print post data
     def print_post_data(self, post):
@@ -132,11 +141,11 @@ class EditingBlogMenuCLI():
     def list_full_blog_contents(self):
         print('LIST FULL BLOG CONTENTS:\n')
         try:
-            posts = self.controller.list_posts()
-            if posts:
-                for post in posts:
-                    self.print_post_data(post)
-            else:
+            empty = True
+            for post in self.controller.iter_posts():
+                self.print_post_data(post)
+                empty = False
+            if empty:
                 print('\nBlog is empty.\n')
         except IllegalAccessException:
             print('\nMUST LOGIN FIRST.')
@@ -102,12 +102,13 @@ class MainMenuCLI():
         print('RETRIEVE BLOGS BY NAME:')
         try:
             search_string = input('Search for: ')
-            found_blogs = self.controller.retrieve_blogs(search_string)
-            if found_blogs:
-                print('\nBlogs found with name %s:\n' % search_string)
-                for blog in found_blogs:
-                    print(blog)
-            else:
+            found = False
+            for blog in self.controller.iter_matching_blogs(search_string):
+                if not found:
+                    print('\nBlogs found with name %s:\n' % search_string)
+                    found = True
+                print(blog)
+            if not found:
                 print('\nNo blogs found with name: %s\n' % search_string)
         except IllegalAccessException:
             print('\nMUST LOGIN FIRST.')
@@ -177,11 +178,11 @@ class MainMenuCLI():
     def list_all_blogs(self):
         print('LIST ALL BLOGS:\n')
         try:
-            blogs = self.controller.list_blogs()
-            if blogs:
-                for blog in blogs:
-                    print(blog)
-            else:
+            empty = True
+            for blog in self.controller.iter_blogs():
+                print(blog)
+                empty = False
+            if empty:
                 print('\nNo blogs registered in the system.\n')
         except IllegalAccessException:
             print('\nMUST LOGIN FIRST.')
@@ -5,5 +5,21 @@ class Configuration():
     blogs_file = "blogging/blogs.json"
     records_path = "blogging/records"
     records_extension = ".dat"
+    authors_file = "authors.dat"        #author index, inside records_path
+    log_extension = ".log"              #write-ahead log, appended to the record file name
+    index_extension = ".idx"            #saved search indexes, appended to the record file name
+    body_extension = ".body"            #out of line post texts, appended to the record file name
+    column_extension = ".col"           #columnar post store, appended to the record file name
+    log_compact_bytes = 4 * 1024 * 1024 #fold the log into a checkpoint past this size
+    log_compact_records = 10000         #or past this many records
+    blog_backend = "json"               #"json" => BlogDAOJSON, "sqlite" => BlogDAOSQLite
+    post_backend = "pickle"             #"pickle" => PostDAOPickle, "sqlite" => PostDAOSQLite, "columnar" => PostDAOColumnar
+    database_file = "blogging/blogging.db"
+    post_store_cache_blogs = 64                 #max open post stores, none => unbounded
+    post_store_cache_bytes = 256 * 1024 * 1024  #max post bytes held by open stores
+    flush_policy = "always"             #"always" => write on every change, "batch" or "interval" => write-behind
+    flush_interval = 1.0                #seconds a change may wait before it is written
+    flush_batch_ops = 100               #"batch" writes early once this many changes are pending
+    search_time_budget = 2.0            #seconds a regex post search may run
     
 
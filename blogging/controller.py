@@ -1,5 +1,7 @@
 
 import hashlib  #
+import re
+import time
 
 from blogging.exception.illegal_access_exception import IllegalAccessException   #cant access
 from blogging.exception.invalid_logout_exception import InvalidLogoutException   #bad logout
@@ -10,6 +12,9 @@ from blogging.exception.illegal_operation_exception import IllegalOperationExcep
 from blogging.exception.no_current_blog_exception import NoCurrentBlogException
 
 from blogging.dao.blog_dao_json import BlogDAOJSON
+from blogging.dao.blog_dao_sqlite import BlogDAOSQLite
+from blogging.dao.flusher import get_flusher
+from blogging.dao.regex_search import compile_pattern
 from blogging.configuration import Configuration
 
 from .blog import Blog
@@ -49,10 +54,14 @@ class Controller:
 
 
         self.logged_in = None                               #default not logged in
-        self.blog_dao = BlogDAOJSON(autosave=self.autosave) #when autosave true => save/load blog from json
-        self.blogs = self.blog_dao.blogs                    #blog_dao methods
         self.current_blog_id = None                         #default no blog
 
+        #when autosave true => save/load blogs from json or sqlite
+        if config.__class__.blog_backend == "sqlite":
+            self.blog_dao = BlogDAOSQLite(autosave=self.autosave)
+        else:
+            self.blog_dao = BlogDAOJSON(autosave=self.autosave)
+
         #old hardcoded users
 
         # self.users = {
@@ -139,6 +148,9 @@ class Controller:
         if not self.is_logged_in:
             raise InvalidLogoutException()
 
+        #write anything the flusher is still holding
+        self.flush()
+
         #logout
         self.logged_in=None
         self.current_blog_id=None
@@ -147,6 +159,15 @@ class Controller:
 
 
 
+    ####write every pending blog and post change to disk now
+
+    def flush(self):
+
+        get_flusher().flush_all()
+        self.blog_dao.author_index.save_to_file()
+
+
+
 ##########################
 ## (3 to 8) blog ops    ##
 ##########################
@@ -162,7 +183,7 @@ class Controller:
             raise IllegalAccessException()
 
         #if id already taken -> illegal operation
-        if blog_id in self.blogs:
+        if self.blog_dao.search_blog(blog_id) is not None:
             raise IllegalOperationException("Blog ID already exists.")
             #return None
 
@@ -190,15 +211,16 @@ class Controller:
 
 
 
-    ####(8) list all blogs
+    ####(8) list all blogs in creation order
+    ####or one page of them: limit blogs created after after_id, pass the last id back for the next page
     
-    def list_blogs(self):
+    def list_blogs(self, after_id=None, limit=None):
 
         #not logged in -> illegal access
         if not self.is_logged_in:
             raise IllegalAccessException()
         
-        return list(self.blogs.values())
+        return self.blog_dao.list_blogs(after_id, limit)
 
 
 
@@ -216,6 +238,42 @@ class Controller:
 
 
 
+    ####(8.1) list all blogs, one at a time
+
+    def iter_blogs(self, after_id=None, limit=None):
+
+        #not logged in -> illegal access, checked now rather than on first next()
+        if not self.is_logged_in:
+            raise IllegalAccessException()
+
+        return self.blog_dao.iter_blogs(after_id, limit)
+
+
+
+    ####(5.1) retrieve blogs by name substring, yielded as they are found
+
+    def iter_matching_blogs(self, name_substring):
+
+        #not logged in -> illegal access
+        if not self.is_logged_in:
+            raise IllegalAccessException()
+
+        return self.blog_dao.iter_matching_blogs(name_substring)
+
+
+
+    ####(5.2) retrieve blogs whose name starts with prefix, in name order
+
+    def retrieve_blogs_by_prefix(self, prefix):
+
+        #not logged in -> illegal access
+        if not self.is_logged_in:
+            raise IllegalAccessException()
+
+        return self.blog_dao.retrieve_blogs_by_prefix(prefix)
+
+
+
     ####(6) update existing blog
 
     def update_blog(self, old_id, new_id, name, url, email):
@@ -248,8 +306,9 @@ class Controller:
         else:
 
             self.blog_dao.delete_blog(old_id)   #remove
-            blog.id=new_id                      #update id
+            blog.change_id(new_id)              #update id, its post records move too
             self.blog_dao.create_blog(blog)     #create w new id
+            self.blog_dao.author_index.rename_blog(old_id, new_id)  #its posts follow
             
             if  self.current_blog_id == old_id:
                 self.current_blog_id = new_id   #if matched to old id, update it to new
@@ -268,15 +327,18 @@ class Controller:
         
 
         #cannot delete blog that does not exist -> illegal operation
-        if blog_id not in self.blogs:
+        blog = self.blog_dao.search_blog(blog_id)
+        if blog is None:
             raise IllegalOperationException()
         
         #cannot delete active blog -> illegal operation
         if self.current_blog_id == blog_id:
             raise IllegalOperationException()
         
-        # Perform deletion
+        # Perform deletion, release its open post store
         self.blog_dao.delete_blog(blog_id)
+        blog.close_post_store()
+        self.blog_dao.author_index.remove_blog(blog_id)
 
         return True
     
@@ -302,7 +364,7 @@ class Controller:
             raise IllegalAccessException()
         
         #check blog exists
-        if blog_id not in self.blogs:
+        if self.blog_dao.search_blog(blog_id) is None:
             raise IllegalOperationException() 
         
         #change current to the passed in id
@@ -322,11 +384,7 @@ class Controller:
         if self.current_blog_id is None:
             return None
         
-        #if current is set but not in list of blogs
-        if self.current_blog_id not in self.blogs:
-            return None
-        
-        #get blog at id
+        #get blog at id, none if current is set but not in list of blogs
         blog = self.blog_dao.search_blog(self.current_blog_id)
 
         return blog
@@ -396,8 +454,9 @@ class Controller:
 
 
     ####(11)retrieve posts by text in current blog
+    ####regex => query is a pattern, see iter_matching_posts
 
-    def retrieve_posts(self, query):
+    def retrieve_posts(self, query, regex=False, cancel=None):
         
         #not logged in -> illegal access
         if not self.is_logged_in:
@@ -410,13 +469,165 @@ class Controller:
         if blog is None:
             raise NoCurrentBlogException()
         
+        if regex: return list(self.iter_matching_posts(query, regex=True, cancel=cancel))
+
         query_lower = query.lower()
         posts_matched = blog.find_posts(query_lower)
 
         return posts_matched
 
+
+
+    ####(11.3)retrieve posts by text in current blog, yielded as they are found
+    ####the blog is fixed here, unsetting the current blog does not stop the stream
+    ####regex => query is a case-insensitive pattern, the stream ends once cancel
+    ####(threading.Event) is set and raises SearchTimeoutException past search_time_budget
+
+    def iter_matching_posts(self, query, descending=False, regex=False, cancel=None):
+
+        #not logged in -> illegal access
+        if not self.is_logged_in:
+            raise IllegalAccessException()
+
+        #current blog
+        blog = self.blog_dao.search_blog(self.current_blog_id)
+
+        #valid blog
+        if blog is None:
+            raise NoCurrentBlogException()
+
+        if regex:
+
+            #bad pattern => fail now, not on first next()
+            try:
+                compile_pattern(query)
+            except re.error as ex:
+                raise IllegalOperationException(f"Invalid pattern: {ex}")
+
+            deadline = time.monotonic() + Configuration().__class__.search_time_budget
+            return blog.iter_regex_posts(query, descending, deadline, cancel)
+
+        return blog.iter_matching_posts(query.lower(), descending)
+
 		 
 
+    ####(11.1)top posts in current blog for query, most relevant first
+
+    def search_posts_ranked(self, query, limit=10):
+
+        #not logged in -> illegal access
+        if not self.is_logged_in:
+            raise IllegalAccessException()
+
+        #current blog
+        blog = self.blog_dao.search_blog(self.current_blog_id)
+
+        #valid blog
+        if blog is None:
+            raise NoCurrentBlogException()
+
+        return blog.rank_posts(query, limit)
+
+
+
+    ####(11.2)search every blog, yields (blog id, post) as each post is found
+
+    def search_all_posts(self, query, limit=None):
+
+        #not logged in -> illegal access, checked now rather than on first next()
+        if not self.is_logged_in:
+            raise IllegalAccessException()
+
+        return self.stream_all_posts(self.blog_dao.list_blogs(), query.lower(), limit)
+
+
+
+    ####blogs searched in turn, each hit handed over as it is found, stops after limit results
+    ####matching is python work, threads would only take turns on the gil, so no pool
+
+    def stream_all_posts(self, blogs, query, limit):
+
+        if limit is not None and limit <= 0: return
+
+        found = 0
+
+        for blog in blogs:
+            for post in blog.iter_matching_posts(query):
+
+                yield blog.id, post
+                found += 1
+                if limit is not None and found >= limit: return
+
+
+
+    ####(11.4)posts in current blog created from start up to (not including) end, oldest first
+    ####either bound may be none, e.g. posts_created_between(midnight, None) => created today
+
+    def posts_created_between(self, start, end):
+
+        #not logged in -> illegal access
+        if not self.is_logged_in:
+            raise IllegalAccessException()
+
+        #current blog
+        blog = self.blog_dao.search_blog(self.current_blog_id)
+
+        #valid blog
+        if blog is None:
+            raise NoCurrentBlogException()
+
+        return blog.posts_created_between(start, end)
+
+
+
+    ####(11.5)limit most recently updated posts in current blog, newest first
+    ####limit under 1 => none, every backend alike
+
+    def recently_updated_posts(self, limit=10):
+
+        #not logged in -> illegal access
+        if not self.is_logged_in:
+            raise IllegalAccessException()
+
+        #current blog
+        blog = self.blog_dao.search_blog(self.current_blog_id)
+
+        #valid blog
+        if blog is None:
+            raise NoCurrentBlogException()
+
+        #the daos read a negative limit differently (islice raises, sql LIMIT -1 is no limit)
+        if limit < 1: return []
+
+        return blog.recently_updated_posts(limit)
+
+
+
+    ####(11.6)posts by author over every blog, a page of (blog id, post)
+    ####returns (page, cursor), pass the cursor back for the next page, none => last page
+
+    def posts_by_author(self, author, limit=10, cursor=None):
+
+        #not logged in -> illegal access
+        if not self.is_logged_in:
+            raise IllegalAccessException()
+
+        #first use without a saved index => one pass over every blog
+        index = self.blog_dao.author_index
+        if not index.ready: index.rebuild(self.blog_dao.iter_blogs())
+
+        entries, next_cursor = index.page(author, limit, cursor)
+
+        page = []
+        for blog_id, code in entries:
+            blog = self.blog_dao.search_blog(blog_id)
+            post = blog.get_post(code) if blog is not None else None
+            if post is not None: page.append((blog_id, post))
+
+        return page, next_cursor
+
+
+
     ####(12)update post in current blog
 
     def update_post(self, code, title=None, text=None, author=None):
@@ -468,8 +679,9 @@ class Controller:
     
 
     ####(14)list posts in current blog from newest to oldest
+    ####or one page: limit posts older than after_code, pass the last code back for the next page
 
-    def list_posts(self):
+    def list_posts(self, after_code=None, limit=None):
         
         #not logged in -> illegal access
         if not self.is_logged_in:
@@ -482,6 +694,62 @@ class Controller:
         if blog is None:
             raise NoCurrentBlogException()
 
-        posts_sorted = blog.posts_listed_descending()
+        posts_sorted = blog.posts_listed_descending(after_code, limit)
         
-        return posts_sorted
\ No newline at end of file
+        return posts_sorted
+
+
+
+    ####(14.1)list posts in current blog from newest to oldest, one at a time
+
+    def iter_posts(self, after_code=None, limit=None):
+
+        #not logged in -> illegal access
+        if not self.is_logged_in:
+            raise IllegalAccessException()
+
+        blog = self.blog_dao.search_blog(self.current_blog_id)
+
+        #valid blog
+        if blog is None:
+            raise NoCurrentBlogException()
+
+        return blog.iter_posts(after_code, limit)
+
+
+
+    ####(14.2)posts in current blog whose text holds the utf-8 bytes needle, newest first
+    ####exact bytes, no case folding, out of line bodies are searched in the mapped file
+
+    def iter_posts_containing_bytes(self, needle):
+
+        #not logged in -> illegal access
+        if not self.is_logged_in:
+            raise IllegalAccessException()
+
+        blog = self.blog_dao.search_blog(self.current_blog_id)
+
+        #valid blog
+        if blog is None:
+            raise NoCurrentBlogException()
+
+        return blog.iter_posts_containing_bytes(needle)
+
+
+
+    ####(14.3)write every post in current blog to a binary file, newest first
+    ####out of line bodies go from the mapped file to the output without a str in between
+
+    def export_posts(self, file):
+
+        #not logged in -> illegal access
+        if not self.is_logged_in:
+            raise IllegalAccessException()
+
+        blog = self.blog_dao.search_blog(self.current_blog_id)
+
+        #valid blog
+        if blog is None:
+            raise NoCurrentBlogException()
+
+        blog.export_posts(file)
@@ -0,0 +1,234 @@
+import os
+import pickle
+import sys
+import threading
+from itertools import islice
+
+from blogging.configuration import Configuration    #global config
+
+from .sorted_index import SortedIndex               #ordered posts per author
+from .text_fold import fold                         #search folding
+
+
+"""
+
+    AuthorIndex
+
+    author -> posts index over every blog, owned by the blog dao and handed
+    to each blog it holds, Blog.add_post, update_info_post and delete_post_by_code
+    keep it current
+
+    authors match like every other search (text_fold), the folded author is
+    the key, interned so every post by one author shares a single string
+
+        self.authors:   author -> SortedIndex of (blog id, code), pages come from it
+        self.posts:     blog id -> {code: author}, to move or drop entries
+
+    persisted to Configuration.authors_file (in records_path) as the posts map
+    only, the sorted indexes are rebuilt from it on load, the file is removed on
+    the first change after it was written, so a file on disk is never stale:
+    missing => not ready, the controller rebuilds it once from every blog
+
+"""
+
+class AuthorIndex:
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self, autosave=False):
+
+        self.autosave = autosave        #persist on/off
+        self.authors = {}               #author -> SortedIndex of (blog id, code)
+        self.posts = {}                 #blog id -> {code: author}
+        self.ready = False              #covers every post, else rebuild before use
+        self.dirty = False              #changes not in the file
+        self.lock = threading.RLock()
+
+        config_class = Configuration().__class__
+        self.filepath = os.path.join(config_class.records_path, config_class.authors_file)
+
+        if self.autosave: self.load_from_file()
+
+
+
+################
+##   helpers  ##
+################
+
+
+
+    ####load the posts map, rebuild the sorted indexes from it
+
+    def load_from_file(self):
+
+        if not os.path.exists(self.filepath): return
+
+        try:
+            with open(self.filepath, "rb") as file:
+                posts = pickle.load(file)
+
+        #corrupted => rebuild from the blogs
+        except Exception:
+            return
+
+        by_author = {}
+        keys = {}       #saved key -> key, files from before folding hold lowered authors
+
+        for blog_id, codes in posts.items():
+            for code, author in codes.items():
+                key = keys.get(author)
+                if key is None: key = keys[author] = self.author_key(author)
+                codes[code] = key
+                by_author.setdefault(key, []).append((blog_id, code))
+
+        self.posts = posts
+        self.authors = {author: SortedIndex(keys) for author, keys in by_author.items()}
+        self.ready = True
+
+
+
+    ####write the posts map, only a complete index is saved
+
+    def save_to_file(self):
+
+        with self.lock:
+
+            if not self.autosave or not self.ready or not self.dirty: return
+
+            os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+            temp_path = self.filepath + ".tmp"
+            with open(temp_path, "wb") as file:
+                pickle.dump(self.posts, file)
+            os.replace(temp_path, self.filepath)
+
+            self.dirty = False
+
+
+
+    ####first change after a save => the file no longer matches, drop it
+
+    def mark_dirty(self):
+
+        if self.dirty: return
+        self.dirty = True
+
+        if self.autosave and os.path.exists(self.filepath): os.remove(self.filepath)
+
+
+
+    ####folded, interned author, none for posts without one
+
+    def author_key(self, author):
+
+        if author is None or author == "": return None
+        return sys.intern(fold(author))
+
+
+
+###############
+##  methods  ##
+###############
+
+
+
+    ####post code on blog is by author (none => no author)
+
+    def add(self, blog_id, code, author):
+
+        key = self.author_key(author)
+
+        with self.lock:
+
+            old = self.posts.get(blog_id, {}).get(code)
+            if old == key: return
+
+            self.remove(blog_id, code)
+            if key is None: return
+
+            self.posts.setdefault(blog_id, {})[code] = key
+            self.authors.setdefault(key, SortedIndex()).add((blog_id, code))
+            self.mark_dirty()
+
+
+
+    ####post code on blog is gone
+
+    def remove(self, blog_id, code):
+
+        with self.lock:
+
+            codes = self.posts.get(blog_id)
+            if codes is None or code not in codes: return
+
+            key = codes.pop(code)
+            if not codes: del self.posts[blog_id]
+
+            entries = self.authors[key]
+            entries.discard((blog_id, code))
+            if not entries: del self.authors[key]
+
+            self.mark_dirty()
+
+
+
+    ####every post on blog is gone
+
+    def remove_blog(self, blog_id):
+
+        with self.lock:
+            for code in list(self.posts.get(blog_id, ())): self.remove(blog_id, code)
+
+
+
+    ####blog id changed, its posts move with it
+
+    def rename_blog(self, old_id, new_id):
+
+        with self.lock:
+            codes = dict(self.posts.get(old_id, {}))
+            self.remove_blog(old_id)
+            for code, author in codes.items(): self.add(new_id, code, author)
+
+
+
+    ####start over from blogs, one pass over every post
+
+    def rebuild(self, blogs):
+
+        with self.lock:
+
+            self.authors = {}
+            self.posts = {}
+
+            for blog in blogs:
+                for post in blog.iter_posts(): self.add(blog.id, post.code, post.author)
+
+            self.ready = True
+            self.dirty = True
+
+
+
+    ####up to limit (blog id, code) by author after cursor, and the cursor for the next page
+    ####limit under 1 => an empty last page
+
+    def page(self, author, limit, cursor=None):
+
+        if limit < 1: return [], None
+
+        key = self.author_key(author)
+
+        with self.lock:
+
+            entries = self.authors.get(key)
+            if entries is None: return [], None
+
+            #one extra tells whether another page follows
+            keys = entries.irange(low=cursor, inclusive=(False, True))
+            page = list(islice(keys, limit + 1))
+
+        if len(page) > limit: return page[:limit], page[limit - 1]
+        return page, None
@@ -10,12 +10,19 @@ class BlogDAO(ABC):
     def retrieve_blogs(self, search_string):
         pass
     @abstractmethod
+    def retrieve_blogs_by_prefix(self, prefix):
+        pass
+    @abstractmethod
     def update_blog(self, key, blog):
         pass
     @abstractmethod
     def delete_blog(self, key):
         pass
     @abstractmethod
-    def list_blogs(self):
+    def list_blogs(self, after_id=None, limit=None):
         pass
 
+    def iter_blogs(self, after_id=None, limit=None):
+        yield from self.list_blogs(after_id, limit)
+    def iter_matching_blogs(self, search_string):
+        yield from self.retrieve_blogs(search_string)
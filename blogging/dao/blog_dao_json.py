@@ -1,5 +1,7 @@
 import json
 import os
+import threading
+from itertools import islice
 
 from blogging.configuration import Configuration    #global config
 
@@ -8,6 +10,11 @@ from .blog_dao import BlogDAO                       #implements
 
 from .blog_encoder import BlogEncoder
 from .blog_decoder import BlogDecoder
+from .flusher import get_flusher                    #write-behind
+from .sorted_index import SortedIndex               #ordered keys
+from .author_index import AuthorIndex               #posts by author, all blogs
+from .trigram_index import TrigramIndex             #name substring search
+from .text_fold import fold                         #search folding
 
 """
 
@@ -18,6 +25,20 @@ from .blog_decoder import BlogDecoder
     a data access object that stores blog objects in a dictionary
     with the option of storing them on a json file when autosave is true
 
+    mutations mark the dao dirty, the flusher decides when blogs.json is
+    rewritten (Configuration.flush_policy)
+
+    every blog held gets the dao's AuthorIndex, which its post ops keep current
+
+    blogs are listed in creation order, whole or a page (after_id, limit) at
+    a time, pages bisect self.created, a SortedIndex of (creation number, id)
+    kept current by every mutation
+
+    name searches never lowercase a stored name, every name is folded (text_fold) once
+    on create/update/load:
+        substring:  trigram index over the folded names, verified per candidate
+        prefix:     SortedIndex of (folded name, id), bisect to the prefix
+
 """
 
 class BlogDAOJSON(BlogDAO):
@@ -32,6 +53,17 @@ class BlogDAOJSON(BlogDAO):
 
         self.autosave = autosave    #persist on/off
         self.blogs = {}             #blog dictionary
+        self.author_index = AuthorIndex(autosave=autosave)  #posts by author over every blog
+
+        self.names = {}                     #id -> casefolded name
+        self.name_trigrams = TrigramIndex() #trigram -> ids
+        self.name_prefixes = SortedIndex()  #(casefolded name, id)
+        self.order = {}                     #id -> creation number, results keep this order
+        self.created = SortedIndex()        #(creation number, id), for pages
+        self.next_order = 0
+        self.dirty = False          #changes not yet in the json file
+        self.flusher = get_flusher()    #decides when they are written
+        self.lock = threading.RLock()   #guards blogs while the flusher saves
         config = Configuration()    #get config    
 
         self.blogs_file = config.__class__.blogs_file   #reads config from the class level
@@ -79,24 +111,82 @@ class BlogDAOJSON(BlogDAO):
                 )
 
             #store back in the main dict
+            blog.author_index = self.author_index
             self.blogs[blog.id] = blog
+            self.index_name(blog.id, blog)
+
+
+    ####add the name of blog @ key to the name indexes
+
+    def index_name(self, key, blog):
+
+        folded = fold(blog.name)
+
+        self.names[key] = folded
+        self.name_trigrams.add(key, (folded,))
+        self.name_prefixes.add((folded, key))
+
+        if key not in self.order:
+            self.order[key] = self.next_order
+            self.created.add((self.next_order, key))
+            self.next_order += 1
+
+
+
+    ####drop blog @ key from the name indexes, keep_order for a replaced blog
+
+    def unindex_name(self, key, keep_order=False):
+
+        folded = self.names.pop(key, None)
+        if folded is None: return
+
+        self.name_trigrams.remove(key, (folded,))
+        self.name_prefixes.discard((folded, key))
+        if not keep_order: self.created.discard((self.order.pop(key), key))
+
 
 
     ####writes to json
 
     def save_to_file(self):
 
-        #convert dict to blog objects
-        blogs_list = list(self.blogs.values())
+        #held while writing so the flusher and a logout never write at once
+        with self.lock:
+
+            #convert dict to blog objects
+            blogs_list = list(self.blogs.values())
+
+            #open json to write
+            with open(self.blogs_file, "w", encoding="utf-8") as file:
+                json.dump(
+                    blogs_list, 
+                    file,
+                    cls=BlogEncoder,    #use blogencoder
+                    indent=2            #formatting
+                )
+
+
+    ####record a change, written now or later by the flusher
+
+    def mark_dirty(self):
+
+        with self.lock:
+            self.dirty = True
+
+        self.flusher.mark_dirty(self)
+
+
+
+    ####write blogs.json if anything changed
+
+    def flush(self):
+
+        with self.lock:
+            if not self.dirty: return
+            self.dirty = False
+
+        self.save_to_file()
 
-        #open json to write
-        with open(self.blogs_file, "w", encoding="utf-8") as file:
-            json.dump(
-                blogs_list, 
-                file,
-                cls=BlogEncoder,    #use blogencoder
-                indent=2            #formatting
-            )
 
 
 ###############
@@ -120,37 +210,70 @@ class BlogDAOJSON(BlogDAO):
     def create_blog(self, blog):
 
         #store by id
-        self.blogs[blog.id]=blog
+        with self.lock:
+            blog.author_index = self.author_index
+            self.unindex_name(blog.id, keep_order=True)
+            self.blogs[blog.id]=blog
+            self.index_name(blog.id, blog)
         
         #autosave to file
-        if self.autosave: self.save_to_file()
+        if self.autosave: self.mark_dirty()
 
 
 
     ###get all blogs containing search string
 
     def retrieve_blogs(self, search_string):
-        
-        #no search string => return all
+
+        return list(self.iter_matching_blogs(search_string))
+
+
+
+    ####yield blogs containing search string as they are found, in creation order
+
+    def iter_matching_blogs(self, search_string):
+
+        #no search string => every blog
         if search_string is None or search_string=="":
+            yield from self.iter_blogs()
+            return
+
+        #fold like the indexed names
+        search_string = fold(search_string)
+
+        with self.lock:
+
+            ids = self.name_trigrams.candidates(search_string)
+
+            #too short to narrow => check every folded name, no lowercasing
+            if ids is None:
+                matched = [id for id, name in self.names.items() if search_string in name]
+
+            #candidates share every trigram, keep the real matches
+            else:
+                matched = [id for id in ids if search_string in self.names[id]]
+
+            matched.sort(key=self.order.__getitem__)
+            blogs = [self.blogs[id] for id in matched]
+
+        yield from blogs
+
 
-            result = list(self.blogs.values())
-            return result
 
-        #to lowercase
-        search_string = search_string.lower()
-        search_result = []
+    ####blogs whose name starts with prefix, in name order
 
-        #check eah name for substring
-        for blog in self.blogs.values():
+    def retrieve_blogs_by_prefix(self, prefix):
 
-            name_lower = blog.name.lower()
+        prefix = fold(prefix)
 
-            #if found ,keep that blog
-            if search_string in name_lower:
-                search_result.append(blog)
+        with self.lock:
 
-        return search_result
+            blogs = []
+            for name, id in self.name_prefixes.irange(low=(prefix,)):
+                if not name.startswith(prefix): break
+                blogs.append(self.blogs[id])
+
+        return blogs
 
 
 
@@ -159,10 +282,14 @@ class BlogDAOJSON(BlogDAO):
     def update_blog(self, key, blog):
 
         #overwrite blog @ key
-        self.blogs[key]=blog
+        with self.lock:
+            blog.author_index = self.author_index
+            self.unindex_name(key, keep_order=True)
+            self.blogs[key]=blog
+            self.index_name(key, blog)
 
         #autosave to file
-        if self.autosave: self.save_to_file()
+        if self.autosave: self.mark_dirty()
 
 
 
@@ -174,17 +301,44 @@ class BlogDAOJSON(BlogDAO):
         if key in self.blogs:
 
             #remove from dict
-            del self.blogs[key]
+            with self.lock:
+                del self.blogs[key]
+                self.unindex_name(key)
 
             #autosave to file
-            if self.autosave: self.save_to_file()
+            if self.autosave: self.mark_dirty()
 
 
 
-    ####return a list of all objs that are stored
+    ####return a list of all objs that are stored, or one page of them
 
-    def list_blogs(self):
+    def list_blogs(self, after_id=None, limit=None):
         
-        return list(self.blogs.values())
+        #no page asked for => every blog in creation order
+        if after_id is None and limit is None:
+            return list(self.blogs.values())
+
+        return list(self.iter_blogs(after_id, limit))
+
+
+
+    ####yield stored blogs one at a time, a page is limit blogs created after the blog @ after_id
+    ####raises ValueError if there is no blog @ after_id
+
+    def iter_blogs(self, after_id=None, limit=None):
+
+        with self.lock:
+
+            if after_id is None and limit is None:
+                blogs = list(self.blogs.values())
+
+            #bisect to the cursor, copy only the page
+            else:
+                if after_id is not None and after_id not in self.order:
+                    raise ValueError(f"no blog with id {after_id}")
 
+                low = None if after_id is None else (self.order[after_id], after_id)
+                entries = self.created.irange(low=low, inclusive=(False, True))
+                blogs = [self.blogs[id] for _, id in islice(entries, limit)]
 
+        yield from blogs
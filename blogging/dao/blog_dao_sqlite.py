@@ -0,0 +1,250 @@
+import weakref
+
+from blogging.configuration import Configuration    #global config
+
+from blogging.blog import Blog
+from .blog_dao import BlogDAO                       #implements
+from .sqlite_database import get_connection, get_lock
+from .text_fold import fold                         #search folding
+from .author_index import AuthorIndex               #posts by author, all blogs
+
+"""
+
+    BlogDAOSQLite
+
+    implements BlogDao
+
+    a data access object that keeps blogs in a sqlite table,
+    every mutation touches exactly one row instead of rewriting blogs.json
+
+    blogs come back in the order they were created (seq column), like BlogDAOJSON,
+    a page (after_id, limit) is a range scan on the seq index after the cursor's seq
+    each row keeps its folded name (folded column), a prefix lookup is a
+    range on its index, a substring search reads every name
+
+    the blog objects handed out are cached by id, so the same Blog
+    (and its post store) is returned every time it is looked up,
+    each one gets the dao's AuthorIndex, which its post ops keep current
+
+    autosave on: the cache holds blogs weakly, one a caller (or the post store
+    cache, or the flusher) still holds keeps its identity, the rest are let
+    go and rebuilt from their row and saved posts on the next lookup
+    autosave off: nothing is saved, a blog is the only copy of its posts, the
+    cache holds every blog
+
+"""
+
+####add the folded name to tables made before it existed
+
+def add_folded_column(connection):
+
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(blogs)")]
+    if "folded" in columns: return
+
+    connection.execute("ALTER TABLE blogs ADD COLUMN folded TEXT NOT NULL DEFAULT ''")
+    connection.execute("UPDATE blogs SET folded = py_fold(name)")
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS blogs (
+        id      INTEGER PRIMARY KEY,
+        seq     INTEGER NOT NULL,
+        name    TEXT NOT NULL,
+        url     TEXT NOT NULL,
+        email   TEXT NOT NULL,
+        folded  TEXT NOT NULL DEFAULT ''
+    )""",
+    "CREATE INDEX IF NOT EXISTS blogs_seq ON blogs (seq)",
+    "DROP INDEX IF EXISTS blogs_name",
+    add_folded_column,
+    "CREATE INDEX IF NOT EXISTS blogs_folded ON blogs (folded, id)",
+)
+
+BLOG_COLUMNS = "id, name, url, email"
+
+#sorts after every character a name can continue a prefix with
+PREFIX_END = "\U0010ffff"
+
+class BlogDAOSQLite(BlogDAO):
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self, autosave=False):
+
+        self.autosave = autosave    #persist on/off
+        self.blogs = weakref.WeakValueDictionary() if autosave else {}     #blogs handed out, by id
+        self.author_index = AuthorIndex(autosave=autosave)  #posts by author over every blog
+        config = Configuration()    #get config
+
+        #autosave off => nothing touches disk
+        self.database_file = config.__class__.database_file if self.autosave else ":memory:"
+        self.connection = get_connection(self.database_file, SCHEMA)
+        self.lock = get_lock(self.database_file)    #held by every write on the shared connection
+
+
+
+################
+##   helpers  ##
+################
+
+
+
+    ####reuse the cached blog for a row, or build it
+
+    def row_to_blog(self, row):
+
+        id, name, url, email = row
+
+        blog = self.blogs.get(id)
+        if blog is None:
+            blog = Blog(id, name, url, email)
+            blog.author_index = self.author_index
+            self.blogs[id] = blog
+
+        return blog
+
+
+
+###############
+##  methods  ##
+###############
+
+
+
+    ####search by id, primary key lookup
+
+    def search_blog(self, key):
+
+        if key in self.blogs: return self.blogs[key]
+
+        row = self.connection.execute(
+            f"SELECT {BLOG_COLUMNS} FROM blogs WHERE id = ?",
+            (key,)
+        ).fetchone()
+
+        if row is None: return None
+
+        return self.row_to_blog(row)
+
+
+
+    ####add new blog, one row
+
+    def create_blog(self, blog):
+
+        with self.lock, self.connection:
+            self.connection.execute(
+                f"""INSERT OR REPLACE INTO blogs (seq, {BLOG_COLUMNS}, folded)
+                    VALUES ((SELECT coalesce(MAX(seq), 0) + 1 FROM blogs), ?, ?, ?, ?, ?)""",
+                (blog.id, blog.name, blog.url, blog.email, fold(blog.name))
+            )
+
+        blog.author_index = self.author_index
+        self.blogs[blog.id] = blog
+
+
+
+    ###get all blogs containing search string
+
+    def retrieve_blogs(self, search_string):
+
+        return list(self.iter_matching_blogs(search_string))
+
+
+
+    ####yield blogs containing search string as the cursor reaches them
+
+    def iter_matching_blogs(self, search_string):
+
+        #no search string => return all
+        if search_string is None or search_string == "":
+            yield from self.iter_blogs()
+            return
+
+        #a substring can be anywhere, no index narrows it
+        rows = self.connection.execute(
+            f"""SELECT {BLOG_COLUMNS} FROM blogs
+                WHERE instr(folded, ?) > 0
+                ORDER BY seq""",
+            (fold(search_string),)
+        )
+
+        for row in rows: yield self.row_to_blog(row)
+
+
+
+    ####blogs whose name starts with prefix, in name order
+
+    def retrieve_blogs_by_prefix(self, prefix):
+
+        prefix = fold(prefix)
+
+        #names starting with prefix sort between it and it + the last code point,
+        #a range on the folded index, LIKE would read % and _ in the prefix
+        rows = self.connection.execute(
+            f"""SELECT {BLOG_COLUMNS} FROM blogs
+                WHERE folded >= ? AND folded < ?
+                ORDER BY folded, id""",
+            (prefix, prefix + PREFIX_END)
+        )
+
+        return [self.row_to_blog(row) for row in rows]
+
+
+
+    ####write blog fields @ key
+
+    def update_blog(self, key, blog):
+
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE blogs SET id = ?, name = ?, url = ?, email = ?, folded = ? WHERE id = ?",
+                (blog.id, blog.name, blog.url, blog.email, fold(blog.name), key)
+            )
+
+        self.blogs.pop(key, None)
+        blog.author_index = self.author_index
+        self.blogs[blog.id] = blog
+
+
+
+    ####delete blog @ key
+
+    def delete_blog(self, key):
+
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM blogs WHERE id = ?", (key,))
+
+        self.blogs.pop(key, None)
+
+
+
+    ####return a list of all blogs in creation order, or one page of them
+
+    def list_blogs(self, after_id=None, limit=None):
+
+        return list(self.iter_blogs(after_id, limit))
+
+
+
+    ####yield blogs one row at a time, a page is limit blogs created after the blog @ after_id
+    ####raises ValueError if there is no blog @ after_id
+
+    def iter_blogs(self, after_id=None, limit=None):
+
+        after_seq = 0
+
+        if after_id is not None:
+            row = self.connection.execute("SELECT seq FROM blogs WHERE id = ?", (after_id,)).fetchone()
+            if row is None: raise ValueError(f"no blog with id {after_id}")
+            after_seq = row[0]
+
+        rows = self.connection.execute(
+            f"SELECT {BLOG_COLUMNS} FROM blogs WHERE seq > ? ORDER BY seq LIMIT ?",
+            (after_seq, -1 if limit is None else limit)
+        )
+
+        for row in rows: yield self.row_to_blog(row)
@@ -0,0 +1,149 @@
+import mmap
+import os
+
+
+"""
+
+    body file
+
+    post texts kept out of line, next to the checkpoint: <id>.dat.body.<generation>
+    holds every body back to back as utf-8, the checkpoint keeps only the
+    headers (code, title, author, times) and each body's (offset, length)
+
+    the file is mapped with mmap, a Post's text is read from the map when it
+    is accessed, so loading, listing and searching titles never read body bytes
+
+    every checkpoint writes a new generation and points at it, then removes
+    the old one: a crash in between leaves the old checkpoint and the old
+    bodies together, the orphaned new file is removed on the next load
+
+    posts handed out before a checkpoint keep the old map, removing its file
+    may fail while it is mapped (windows), such a file is left in place and
+    removal is retried after the next checkpoint and on the next load
+
+    a body can be had without copying it: read_view() is a memoryview slice of the
+    map, find() searches the mapped bytes in place, only read() builds a str
+
+"""
+
+class BodyFile:
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self, path):
+
+        self.path = path
+
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            self.mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+        self.view = memoryview(self.mapped)     #slices of it share the map, no copy
+
+
+
+###############
+##  methods  ##
+###############
+
+
+
+    ####body at offset as str, decoded straight from the map
+
+    def read(self, offset, length):
+
+        return str(self.view[offset:offset + length], "utf-8")
+
+
+
+    ####body at offset as a memoryview over the map, no copy
+
+    def read_view(self, offset, length):
+
+        return self.view[offset:offset + length]
+
+
+
+    ####true if the utf-8 bytes needle are in the body at offset, searched in place
+
+    def find(self, needle, offset, length):
+
+        return self.mapped.find(needle, offset, offset + length) != -1
+
+
+
+####write the bodies of posts to path, back to back
+####returns (post, text source, offset, length) per post, in order, for Post.move_text
+
+def write_bodies(path, posts):
+
+    placed = []
+    offset = 0
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+
+        for post in posts:
+
+            source = post.text_source()
+            inline, body = source
+
+            #already out of line => write straight from the old map, no decode
+            if body is not None:
+                body_source, body_offset, body_length = body
+                data = body_source.read_view(body_offset, body_length)
+            else:
+                data = (inline or "").encode("utf-8")
+
+            file.write(data)
+            placed.append((post, source, offset, len(data)))
+            offset += len(data)
+
+    os.replace(temp_path, path)
+
+    return placed
+
+
+
+####body files of a checkpoint other than keep, left by a crash or an older generation
+####only <prefix><generation>, copies set aside next to them are not body files
+
+def stale_body_files(directory, prefix, keep):
+
+    if not os.path.isdir(directory): return []
+
+    return [
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.startswith(prefix) and name[len(prefix):].isdigit() and name != keep
+    ]
+
+
+
+####highest generation of any body file on disk for prefix, 0 if none
+
+def last_generation(directory, prefix):
+
+    if not os.path.isdir(directory): return 0
+
+    generations = [
+        int(name[len(prefix):]) for name in os.listdir(directory)
+        if name.startswith(prefix) and name[len(prefix):].isdigit()
+    ]
+
+    return max(generations, default=0)
+
+
+
+####remove paths, one still mapped (windows refuses) stays for the next sweep
+
+def remove_body_files(paths):
+
+    for path in paths:
+        try:
+            os.remove(path)
+        except (FileNotFoundError, PermissionError):
+            pass
@@ -0,0 +1,140 @@
+import atexit
+import threading
+import time
+
+from blogging.configuration import Configuration    #global config
+
+
+"""
+
+    Flusher
+
+    write-behind persistence for the daos, one flusher thread for the whole app
+
+    a dao with autosave on calls mark_dirty(self) after each mutation,
+    what happens next depends on the flush policy:
+
+        always:   the dao is flushed right away on the caller's thread (old behaviour)
+        batch:    flushed once flush_batch_ops mutations are pending,
+                  or flush_interval seconds after the first one, whichever comes first
+        interval: flushed every flush_interval seconds
+
+    all pending daos are flushed together, so a burst of edits costs one write
+    per dao per flush window instead of one per operation
+
+    flush_all() writes everything now, called on logout and at exit
+
+"""
+
+class Flusher:
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self, policy="always", interval=1.0, batch_ops=100):
+
+        self.policy = policy        #always, batch or interval
+        self.interval = interval    #seconds between flushes
+        self.batch_ops = batch_ops  #pending mutations that force a batch flush
+
+        self.pending = {}           #dao identity -> dao waiting to be flushed
+        self.pending_ops = 0        #mutations since the last flush
+
+        self.condition = threading.Condition()
+        self.thread = None
+
+
+
+###############
+##  methods  ##
+###############
+
+
+
+    ####called by a dao after it changed
+
+    def mark_dirty(self, dao):
+
+        #synchronous write on the caller's thread
+        if self.policy not in ("batch", "interval"):
+            dao.flush()
+            return
+
+        with self.condition:
+
+            self.pending[id(dao)] = dao
+            self.pending_ops += 1
+
+            #start the flusher thread on first use
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+            #flusher rechecks pending work and the batch size
+            self.condition.notify()
+
+
+
+    ####flusher thread: wait for the window to close, then flush
+
+    def run(self):
+
+        while True:
+
+            with self.condition:
+
+                #nothing pending => sleep until something is
+                while not self.pending:
+                    self.condition.wait()
+
+                #window opens with the first pending mutation
+                deadline = time.monotonic() + self.interval
+
+                while True:
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0: break
+
+                    #batch closes the window early once it is full
+                    if self.policy == "batch" and self.pending_ops >= self.batch_ops: break
+
+                    self.condition.wait(remaining)
+
+            self.flush_all()
+
+
+
+    ####flush every pending dao now
+
+    def flush_all(self):
+
+        with self.condition:
+            daos = list(self.pending.values())
+            self.pending = {}
+            self.pending_ops = 0
+
+        for dao in daos: dao.flush()
+
+
+
+####shared flusher, policy from Configuration, flushed again at exit
+
+flusher = None
+
+def get_flusher():
+
+    global flusher
+
+    if flusher is None:
+        config_class = Configuration().__class__
+        flusher = Flusher(
+            policy=config_class.flush_policy,
+            interval=config_class.flush_interval,
+            batch_ops=config_class.flush_batch_ops,
+        )
+        atexit.register(flusher.flush_all)
+
+    return flusher
@@ -0,0 +1,228 @@
+import mmap
+import os
+import struct
+
+
+"""
+
+    index file
+
+    the trigram and word indexes of a post store, saved next to its records
+    (<id>.dat.idx) so a cold store can search without tokenizing every post
+
+    layout, little endian:
+
+        header   | magic | version u16 | sections u8 | stamp: checkpoint mtime_ns i64,
+                   checkpoint size i64, log size i64 |
+        trigrams | count u32 | per gram:  key len u32, key utf8, n u32, n codes i64 |
+        words    | count u32 | per word:  key len u32, key utf8, n u32, n (code i64, tf u32 x3) |
+                 | n u32 | n codes i64 | n weighted lengths f64 |
+
+    the stamp is the generation of the record files the indexes were built from,
+    a file whose stamp differs from the store's is stale and ignored
+
+    the file is mapped with mmap, loading only walks the keys to build a directory,
+    a posting list is decoded the first time its key is touched
+
+"""
+
+MAGIC = b"PIDX"
+VERSION = 2     #2: postings over folded text (text_fold), not lower()
+
+HEADER = struct.Struct("<4sHBqqq")
+COUNT = struct.Struct("<I")
+CODE = struct.Struct("<q")
+WORD_POSTING = struct.Struct("<qIII")
+
+#sections bitmask
+HAS_TRIGRAMS = 1
+HAS_WORDS = 2
+
+
+class MappedPostings:
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self, mapped, directory, decode):
+
+        self.mapped = mapped        #mmap of the index file
+        self.directory = directory  #key -> (offset, n) not yet decoded
+        self.decode = decode        #(mapped, offset, n) -> posting list
+
+
+
+###############
+##  methods  ##
+###############
+
+
+
+    ####decode the postings of key and forget its entry, none if absent
+
+    def pop(self, key):
+
+        entry = self.directory.pop(key, None)
+        if entry is None: return None
+
+        offset, n = entry
+        return self.decode(self.mapped, offset, n)
+
+
+
+    ####keys not decoded yet
+
+    def keys(self):
+
+        return list(self.directory)
+
+
+
+    ####drop the directory, the map is closed once nothing refers to it
+
+    def close(self):
+
+        self.directory = {}
+        self.mapped = None
+
+
+
+####trigram postings: set of codes
+
+def decode_codes(mapped, offset, n):
+
+    return set(struct.unpack_from(f"<{n}q", mapped, offset))
+
+
+
+####word postings: code -> (tf title, tf text, tf author)
+
+def decode_word_postings(mapped, offset, n):
+
+    data = mapped[offset:offset + n * WORD_POSTING.size]
+    return {code: (title, text, author) for code, title, text, author in WORD_POSTING.iter_unpack(data)}
+
+
+
+####walk one postings section, key -> (offset, n), returns the directory and the end offset
+
+def read_directory(mapped, offset, entry_size):
+
+    (count,) = COUNT.unpack_from(mapped, offset)
+    offset += COUNT.size
+    directory = {}
+
+    for _ in range(count):
+
+        (key_len,) = COUNT.unpack_from(mapped, offset)
+        offset += COUNT.size
+        key = bytes(mapped[offset:offset + key_len]).decode("utf-8")
+        offset += key_len
+
+        (n,) = COUNT.unpack_from(mapped, offset)
+        offset += COUNT.size
+        directory[key] = (offset, n)
+        offset += n * entry_size
+
+    if offset > len(mapped): raise ValueError("truncated index file")
+
+    return directory, offset
+
+
+
+####one postings section as bytes
+
+def write_section(parts, postings, pack_entries):
+
+    parts.append(COUNT.pack(len(postings)))
+
+    for key, entries in postings.items():
+        encoded = key.encode("utf-8")
+        parts.append(COUNT.pack(len(encoded)))
+        parts.append(encoded)
+        parts.append(COUNT.pack(len(entries)))
+        parts.append(pack_entries(entries))
+
+
+
+def pack_codes(codes):
+
+    return struct.pack(f"<{len(codes)}q", *codes)
+
+
+
+def pack_word_postings(entries):
+
+    return b"".join(WORD_POSTING.pack(code, *tfs) for code, tfs in entries.items())
+
+
+
+####write the indexes built from record files at stamp, none => section left out
+
+def save_indexes(path, stamp, trigram_index=None, word_index=None):
+
+    sections = 0
+    if trigram_index is not None: sections |= HAS_TRIGRAMS
+    if word_index is not None: sections |= HAS_WORDS
+
+    parts = [HEADER.pack(MAGIC, VERSION, sections, *stamp)]
+
+    if trigram_index is not None:
+        write_section(parts, trigram_index.all_postings(), pack_codes)
+
+    if word_index is not None:
+        write_section(parts, word_index.all_postings(), pack_word_postings)
+
+        codes = list(word_index.lengths)
+        parts.append(COUNT.pack(len(codes)))
+        parts.append(pack_codes(codes))
+        parts.append(struct.pack(f"<{len(codes)}d", *(word_index.lengths[code] for code in codes)))
+
+    #temp file + swap, a crash never leaves half an index
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(b"".join(parts))
+    os.replace(temp_path, path)
+
+
+
+####map the index file, none if missing, stale (stamp differs) or corrupted
+####returns (trigram postings, word postings, word lengths), a missing section is none
+
+def load_indexes(path, stamp):
+
+    if not os.path.exists(path): return None
+
+    try:
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, sections, *file_stamp = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != VERSION or tuple(file_stamp) != tuple(stamp):
+            return None
+
+        offset = HEADER.size
+        trigrams = words = lengths = None
+
+        if sections & HAS_TRIGRAMS:
+            directory, offset = read_directory(mapped, offset, CODE.size)
+            trigrams = MappedPostings(mapped, directory, decode_codes)
+
+        if sections & HAS_WORDS:
+            directory, offset = read_directory(mapped, offset, WORD_POSTING.size)
+            words = MappedPostings(mapped, directory, decode_word_postings)
+
+            (n,) = COUNT.unpack_from(mapped, offset)
+            offset += COUNT.size
+            codes = struct.unpack_from(f"<{n}q", mapped, offset)
+            offset += n * CODE.size
+            lengths = dict(zip(codes, struct.unpack_from(f"<{n}d", mapped, offset)))
+
+    #empty, truncated or otherwise unreadable => rebuild
+    except (ValueError, struct.error, UnicodeDecodeError, OSError):
+        return None
+
+    return trigrams, words, lengths
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from .regex_search import filter_posts, folded_literal
 class PostDAO(ABC):
     @abstractmethod
     def search_post(self, key):
@@ -10,11 +11,41 @@ class PostDAO(ABC):
     def retrieve_posts(self, search_string):
         pass
     @abstractmethod
-    def update_post(self, key, new_title, new_text):
+    def update_post(self, key, new_title, new_text, new_author=None):
         pass
     @abstractmethod
     def delete_post(self, key):
         pass
     @abstractmethod
-    def list_posts(self):
+    def list_posts(self, after_code=None, limit=None):
         pass
+    @abstractmethod
+    def rank_posts(self, query, limit):
+        pass
+    @abstractmethod
+    def posts_created_between(self, start, end):
+        pass
+    @abstractmethod
+    def recently_updated_posts(self, limit):
+        pass
+    @abstractmethod
+    def move_posts(self, new_id):
+        pass
+    def iter_posts(self, after_code=None, limit=None):
+        yield from self.list_posts(after_code, limit)
+    def iter_matching_posts(self, search_string, descending=False):
+        posts = self.retrieve_posts(search_string)
+        yield from (reversed(posts) if descending else posts)
+    def iter_posts_containing_bytes(self, needle):
+        for post in self.iter_posts():
+            if post.text_contains(needle): yield post
+    def export_posts(self, file):
+        for post in self.iter_posts():
+            file.write(f"#{post.code} {post.title}\n".encode("utf-8"))
+            file.write(post.text_view())
+            file.write(b"\n\n")
+    def iter_regex_posts(self, pattern, descending=False, deadline=None, cancel=None):
+        candidates = self.iter_matching_posts(folded_literal(pattern), descending)
+        yield from filter_posts(candidates, pattern, self.regex_fields, deadline, cancel)
+    def regex_fields(self, post):
+        return (post.title, post.text, post.author)
@@ -0,0 +1,556 @@
+import bisect
+import os
+import shutil
+import struct
+import threading
+import warnings
+from array import array
+
+from blogging.configuration import Configuration    #global config
+
+from blogging.dao.post_dao import PostDAO           #implements
+from blogging.dao.flusher import get_flusher        #write-behind
+from blogging.dao.record_file import column_bytes, read_column  #little endian columns
+from blogging.dao.word_index import WordIndex       #ranked search
+from blogging.dao.scan_buffer import ScanBuffer     #substring search
+from blogging.dao.string_column import StringColumn #packed string fields
+from blogging.dao.text_fold import FIELD_SEPARATOR, fold, fold_fields
+from blogging.post import Post, to_micros
+
+
+"""
+
+    PostDAOColumnar
+
+    post store for very large blogs, no Post object is kept: every field is a
+    column and row i of every column is the i-th post by code
+
+        self.codes:                 array of codes, ascending
+        self.created, self.updated: arrays of epoch microseconds
+        self.titles, texts, authors: StringColumns, one utf-8 blob each
+
+    a Post is built only when one is returned, listing and time queries work
+    on the columns:
+
+        list_posts:     bisect the cursor in codes, then walk rows backwards
+        time ranges:    bisect a (time, code) ordering of rows, built on the
+                        first time query, dropped when rows move
+
+    substring search scans a ScanBuffer of every folded post, rank_posts a bm25
+    WordIndex, both built on first use, the word index is kept current after
+    that, the scan buffer is dropped by any change
+
+    saved to <id>.dat.col (Configuration.column_extension) as raw column bytes,
+    little endian, one write and one read, no per-post pickling:
+
+        header  | magic | version u16 | rows i64 |
+        columns | codes i64 x rows | created i64 x rows | updated i64 x rows |
+        strings | per field (title, text, author): lengths i64 x rows | blob size i64 | blob |
+
+    columns are byteswapped on big endian hosts (record_file.column_bytes), so
+    a file moves between machines
+
+    a damaged file is copied to <file>.corrupt with a warning and the store
+    starts empty, like PostDAOPickle
+
+    every save rewrites the whole file, meant for large mostly-read blogs, pair it
+    with flush_policy "batch" or "interval" so a burst of edits is one write
+
+"""
+
+MAGIC = b"PCOL"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHq")
+SIZE = struct.Struct("<q")
+
+#bytes per row of a fixed column
+ROW = array("q").itemsize
+
+
+class PostDAOColumnar(PostDAO):
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self, blog, autosave=False):
+
+        self.autosave = autosave    #persist on/off
+        self.blog = blog            #blog post is under
+        self.codes = array("q")     #post codes, ascending
+        self.created = array("q")   #created_us per row
+        self.updated = array("q")   #updated_us per row
+        self.titles = StringColumn()
+        self.texts = StringColumn()
+        self.authors = StringColumn()
+        self.created_order = None   #rows by (created, code), built on first time query
+        self.updated_order = None   #rows by (updated, code), built with it
+        self.scan_buffer = None     #folded posts in one string, built on first search
+        self.word_index = None      #bm25 word index, built on first ranked search
+        self.dirty = False          #changes not yet on disk
+
+
+        ####persistence
+
+        config_class = Configuration().__class__
+        self.records_path = config_class.records_path
+        if self.autosave: os.makedirs(self.records_path, exist_ok=True)
+
+        self.filepath = self.column_path(self.blog.id)
+
+        self.flusher = get_flusher()    #decides when changes are written
+        self.lock = threading.RLock()   #guards the columns
+
+        #if autosave on => load existing posts from file
+        if self.autosave: self.load_from_file()
+
+        self.update_next_post_id()
+
+
+
+#################
+##   helpers   ##
+#################
+
+
+
+    ####column file of blog_id
+
+    def column_path(self, blog_id):
+
+        config_class = Configuration().__class__
+
+        return os.path.join(
+            self.records_path,
+            f"{blog_id}{config_class.records_extension}{config_class.column_extension}"
+        )
+
+
+
+    ####approximate bytes held, for the store cache
+
+    @property
+    def size_bytes(self):
+
+        fixed = ROW * len(self.codes) * 3
+        strings = self.titles.size() + self.texts.size() + self.authors.size()
+        scan = self.scan_buffer.size() if self.scan_buffer is not None else 0
+
+        return fixed + strings + scan
+
+
+
+    ####row of code, none if absent
+
+    def find_row(self, code):
+
+        row = bisect.bisect_left(self.codes, code)
+        if row < len(self.codes) and self.codes[row] == code: return row
+
+        return None
+
+
+
+    ####post built from row
+
+    def row_to_post(self, row):
+
+        post = Post.__new__(Post)
+        post.__setstate__((
+            self.codes[row],
+            self.titles.get(row),
+            self.texts.get(row),
+            self.authors.get(row),
+            self.created[row],
+            self.updated[row],
+        ))
+
+        return post
+
+
+
+    ####rows moved or changed => drop what was derived from them
+
+    def changed(self, rows_moved=True, times_changed=True):
+
+        if rows_moved: self.created_order = None
+        if rows_moved or times_changed: self.updated_order = None
+        self.scan_buffer = None
+
+        if self.autosave:
+            self.dirty = True
+            self.flusher.mark_dirty(self)
+
+
+
+    ####folded (title, text, author) of post, what the word index holds
+
+    def search_fields(self, post):
+
+        return tuple(fold_fields(post).split(FIELD_SEPARATOR))
+
+
+
+    ####rows ordered by (created, code) and (updated, code), rows are in code order
+    ####so a stable sort on the time alone breaks ties by code
+
+    def get_time_orders(self):
+
+        with self.lock:
+
+            if self.created_order is None:
+                self.created_order = sorted(range(len(self.codes)), key=self.created.__getitem__)
+
+            if self.updated_order is None:
+                self.updated_order = sorted(range(len(self.codes)), key=self.updated.__getitem__)
+
+            return self.created_order, self.updated_order
+
+
+
+    ####every folded post in one buffer, rebuilt after any change
+
+    def get_scan_buffer(self):
+
+        with self.lock:
+
+            if self.scan_buffer is None:
+                entries = ((self.codes[row], fold_fields(self.row_to_post(row))) for row in range(len(self.codes)))
+                self.scan_buffer = ScanBuffer(entries, FIELD_SEPARATOR)
+
+            return self.scan_buffer
+
+
+
+    ####word index over every post, built once then maintained
+
+    def get_word_index(self):
+
+        with self.lock:
+
+            if self.word_index is None:
+                index = WordIndex()
+                for row in range(len(self.codes)):
+                    index.add(self.codes[row], self.search_fields(self.row_to_post(row)))
+                self.word_index = index
+
+            return self.word_index
+
+
+
+    ####update next id based on highest code
+
+    def update_next_post_id(self):
+
+        self.blog.next_post_id = self.codes[-1] + 1 if self.codes else 1
+
+
+
+    ####columns from the column file, nothing if it does not exist
+
+    def load_from_file(self):
+
+        if not os.path.exists(self.filepath): return
+
+        with open(self.filepath, "rb") as file:
+            data = memoryview(file.read())
+
+        try:
+            magic, version, rows = HEADER.unpack_from(data, 0)
+            if magic != MAGIC or version != VERSION: raise ValueError("not a column file")
+
+            if rows < 0: raise ValueError("bad row count")
+
+            offset = HEADER.size
+            columns = []
+
+            for _ in range(3):
+                column, offset = read_column("q", data, offset, rows)
+                columns.append(column)
+
+            strings = []
+
+            for _ in range(3):
+                lengths, offset = read_column("q", data, offset, rows)
+                (size,) = SIZE.unpack_from(data, offset)
+                offset += SIZE.size
+                if size < 0 or offset + size > len(data): raise ValueError("truncated strings")
+                strings.append(StringColumn.from_lengths(lengths, data[offset:offset + size]))
+                offset += size
+
+            if offset != len(data): raise ValueError("trailing bytes")
+
+        #damaged => keep a copy for recovery and say so, never drop it silently
+        except (ValueError, struct.error) as ex:
+            self.set_aside(ex)
+            return
+
+        self.codes, self.created, self.updated = columns
+        self.titles, self.texts, self.authors = strings
+
+
+
+    ####copy a damaged column file aside and warn, the store starts empty
+
+    def set_aside(self, reason):
+
+        corrupt_path = self.filepath + ".corrupt"
+        shutil.copyfile(self.filepath, corrupt_path)
+
+        warnings.warn(f"post columns {self.filepath} damaged ({reason}), copy kept at {corrupt_path}")
+
+
+
+    ####write every column, temp file + swap so a crash never leaves half a file
+
+    def save_to_file(self):
+
+        with self.lock:
+
+            parts = [HEADER.pack(MAGIC, VERSION, len(self.codes))]
+            parts += [column_bytes(self.codes), column_bytes(self.created), column_bytes(self.updated)]
+
+            for column in (self.titles, self.texts, self.authors):
+                lengths, blob = column.to_bytes()
+                parts += [lengths, SIZE.pack(len(blob)), blob]
+
+            self.dirty = False
+
+        temp_path = self.filepath + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.writelines(parts)
+        os.replace(temp_path, self.filepath)
+
+
+
+    ####flusher calls this when changes are due
+
+    def flush(self):
+
+        if self.autosave and self.dirty: self.save_to_file()
+
+
+
+    ####blog id changed => save under the new id, drop the old file
+
+    def move_posts(self, new_id):
+
+        with self.lock:
+
+            old_path, self.filepath = self.filepath, self.column_path(new_id)
+
+            if self.autosave:
+                self.save_to_file()
+                if os.path.exists(old_path): os.remove(old_path)
+
+
+
+    ####write what is pending before the store is dropped
+
+    def close(self):
+
+        self.flush()
+
+
+
+##################
+## main methods ##
+##################
+
+
+
+    ####find post by key, none if absent
+
+    def search_post(self, key):
+
+        with self.lock:
+            row = self.find_row(key)
+            return None if row is None else self.row_to_post(row)
+
+
+
+    ####store new post, replaces one with the same code
+
+    def create_post(self, post):
+
+        with self.lock:
+
+            row = self.find_row(post.code)
+
+            #replaced => its created time may differ, both time orders are stale
+            if row is not None:
+                self.write_row(row, post)
+                self.changed()
+
+            else:
+                row = bisect.bisect_left(self.codes, post.code)
+                self.codes.insert(row, post.code)
+                self.created.insert(row, post.created_us)
+                self.updated.insert(row, post.updated_us)
+                self.titles.insert(row, post.title)
+                self.texts.insert(row, post.text)
+                self.authors.insert(row, post.author)
+                if self.word_index is not None: self.word_index.add(post.code, self.search_fields(post))
+                self.changed()
+
+        return post
+
+
+
+    ####overwrite every field of an existing row with post
+
+    def write_row(self, row, post):
+
+        if self.word_index is not None:
+            self.word_index.remove(post.code, self.search_fields(self.row_to_post(row)))
+            self.word_index.add(post.code, self.search_fields(post))
+
+        self.created[row] = post.created_us
+        self.updated[row] = post.updated_us
+        self.titles.set(row, post.title)
+        self.texts.set(row, post.text)
+        self.authors.set(row, post.author)
+
+
+
+    ####get all posts w/ substring
+
+    def retrieve_posts(self, search_string):
+
+        return list(self.iter_matching_posts(search_string))
+
+
+
+    ####yield posts w/ substring by code (newest first if descending)
+
+    def iter_matching_posts(self, search_string, descending=False):
+
+        #if empty or none => every post
+        query = None if search_string is None or search_string == "" else fold(search_string)
+
+        #a separator in the query could match across two fields
+        if query is not None and FIELD_SEPARATOR in query: return
+
+        with self.lock:
+            codes = self.codes[:] if query is None else self.get_scan_buffer().find(query)
+
+        #only codes are held, a post is built when the caller asks for it
+        for code in (reversed(codes) if descending else codes):
+            post = self.search_post(code)
+            if post is not None: yield post    #deleted meanwhile => skipped
+
+
+
+    ####top limit posts for query, best bm25 score first
+
+    def rank_posts(self, query, limit):
+
+        with self.lock:
+            ranked = self.get_word_index().search(fold(query), limit)
+            return [self.row_to_post(self.find_row(code)) for code, score in ranked]
+
+
+
+    ####posts created in [start, end), oldest first, either bound may be none
+
+    def posts_created_between(self, start, end):
+
+        with self.lock:
+            created_order, updated_order = self.get_time_orders()
+            key = self.created.__getitem__
+
+            low = 0 if start is None else bisect.bisect_left(created_order, to_micros(start), key=key)
+            high = len(created_order) if end is None else bisect.bisect_left(created_order, to_micros(end), key=key)
+
+            return [self.row_to_post(row) for row in created_order[low:high]]
+
+
+
+    ####limit most recently updated posts, newest first
+
+    def recently_updated_posts(self, limit):
+
+        with self.lock:
+            created_order, updated_order = self.get_time_orders()
+            rows = updated_order[len(updated_order) - limit:] if limit > 0 else []
+
+            return [self.row_to_post(row) for row in reversed(rows)]
+
+
+
+    ####update title, text or author of post @ key
+
+    def update_post(self, key, new_title, new_text, new_author=None):
+
+        with self.lock:
+
+            row = self.find_row(key)
+
+            #if no post @ key => do nothing
+            if row is None: return False
+
+            post = self.row_to_post(row)
+
+            #title, text, author exist
+            if new_title is not None: post.title = new_title
+            if new_text is not None: post.text = new_text
+            if new_author is not None: post.author = new_author
+
+            #update timestamp
+            post.update_time()
+
+            self.write_row(row, post)
+            self.changed(rows_moved=False)
+
+        return True
+
+
+
+    ####delete post @ key
+
+    def delete_post(self, key):
+
+        with self.lock:
+
+            row = self.find_row(key)
+            if row is None: return False
+
+            if self.word_index is not None:
+                self.word_index.remove(key, self.search_fields(self.row_to_post(row)))
+
+            del self.codes[row]
+            del self.created[row]
+            del self.updated[row]
+            self.titles.delete(row)
+            self.texts.delete(row)
+            self.authors.delete(row)
+            self.changed()
+
+        return True
+
+
+
+    ####list posts in descending order, limit posts with codes below after_code
+
+    def list_posts(self, after_code=None, limit=None):
+
+        return list(self.iter_posts(after_code, limit))
+
+
+
+    ####yield posts newest first, rows below the cursor walked backwards
+
+    def iter_posts(self, after_code=None, limit=None):
+
+        with self.lock:
+            stop = len(self.codes) if after_code is None else bisect.bisect_left(self.codes, after_code)
+            start = 0 if limit is None else max(stop - limit, 0)
+            codes = self.codes[start:stop]
+
+        #only codes are held, a post is built when the caller asks for it
+        for code in reversed(codes):
+            post = self.search_post(code)
+            if post is not None: yield post
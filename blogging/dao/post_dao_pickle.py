@@ -1,9 +1,26 @@
+import gc
 import os
 import pickle
+import shutil
+import warnings
+import struct
+import threading
+import zlib
+from itertools import islice
 
 from blogging.configuration import Configuration    #global config
 
 from blogging.dao.post_dao import PostDAO           #implements
+from blogging.post import Post, to_micros           #time query bounds
+from blogging.dao.body_file import BodyFile, last_generation, remove_body_files, stale_body_files, write_bodies
+from blogging.dao.record_file import decode_records, encode_records, is_record_file
+from blogging.dao.flusher import get_flusher        #write-behind
+from blogging.dao.trigram_index import GRAM, TrigramIndex  #substring search
+from blogging.dao.word_index import WordIndex       #ranked search
+from blogging.dao.index_file import load_indexes, save_indexes
+from blogging.dao.sorted_index import SortedIndex   #ordered codes
+from blogging.dao.text_fold import FIELD_SEPARATOR, fold, fold_fields
+from blogging.dao.scan_buffer import ScanBuffer     #short-query scans
 
 
 """
@@ -16,10 +33,87 @@ from blogging.dao.post_dao import PostDAO           #implements
     depending on autosave on/off, persists them w/ pickle module
 
     autosave off: posts stored in self.posts
-    autosave on: tries to load posts from file, any mutative method writes back to disk
+    autosave on: tries to load posts from file, any mutative method appends one
+                 record to the write-ahead log (<id>.dat.log), save_to_file checkpoints
+
+    log frame layout: | length u32 | crc32 u32 | pickled (op, payload) |
+    payloads are plain tuples and ints, never Post objects, so a frame does
+    not depend on the Post class layout (frames from older logs holding a
+    Post still replay)
+    replay applies the log on top of the last checkpoint (<id>.dat)
+
+    compaction: once the log passes the size or record threshold in Configuration,
+    a background thread folds it into a fresh checkpoint:
+        1. under the lock: copy the posts dict, remember where the log ends (the cut)
+        2. off the lock: pickle the copy to a temp file, swap it in
+        3. under the lock: keep only the frames written after the cut
+    every frame is a whole post or a delete, so replaying frames that are already
+    in the checkpoint is harmless, a crash between 2 and 3 loses nothing
+
+    frames are buffered and handed to the flusher, which writes them right away
+    or in groups depending on Configuration.flush_policy
+
+    searches compare folded text (text_fold): each post's title, text and author
+    are folded once into one string, cached in self.folded until the post
+    changes, so a repeated search allocates nothing per post
+
+    retrieve_posts narrows candidates with a trigram index over the folded
+    title, text and author, rank_posts scores posts with a bm25 word index,
+    each index is built on its first search and kept current by every
+    mutation after that
+
+    queries too short for the trigram index scan a ScanBuffer, every folded
+    text joined into one string searched with str.find, built on the first
+    short query and patched by every mutation after that
+
+    self.codes (SortedIndex) keeps every post code in order, so listing newest
+    first walks it backwards a page at a time instead of sorting all posts
+
+    time queries use two more SortedIndexes of (created_us, code) and
+    (updated_us, code), epoch microsecond ints, built on the first time query, update_post moves a
+    post in the second one when it refreshes the timestamp
+
+    the checkpoint is a versioned binary record file (record_file), a legacy
+    pickled checkpoint still loads and is rewritten as records right away, a
+    damaged checkpoint is copied to <id>.dat.corrupt (its body files to
+    <body file>.corrupt) and reported with a warning, the posts that still
+    check out are kept, a new checkpoint never reuses a generation on disk
+
+    post texts live out of line (body_file): the checkpoint holds headers and
+    (offset, length) into <id>.dat.body.<generation>, a loaded post reads its
+    text from that mapped file on access, posts put since the last checkpoint
+    keep theirs inline until the next one moves them out
+
+    closing the store saves the indexes to <id>.dat.idx, stamped with the
+    checkpoint and log they describe, the first search after a reload maps
+    that file instead of tokenizing every post, unless the records changed since
 
 """
 
+#frame header: payload length, payload crc32
+LOG_FRAME = struct.Struct("<II")
+
+#log operations
+LOG_PUT = "put"         #payload is the post row (code, title, text, author, created_us, updated_us)
+LOG_DELETE = "del"      #payload is the post code
+
+#codes copied per step while listing
+LIST_PAGE = 256
+
+#rough per-post cost of the slotted object and its ints, on top of the strings
+POST_OVERHEAD = 200
+
+
+####approximate bytes held for one post
+
+def post_size(post):
+
+    author_len = len(post.author) if post.author is not None else 0
+    return POST_OVERHEAD + len(post.title) + post.inline_size() + author_len
+
+
+
+
 class PostDAOPickle(PostDAO):
 
 
@@ -33,6 +127,15 @@ class PostDAOPickle(PostDAO):
         self.autosave = autosave    #persist on/off
         self.blog = blog            #blog post is under
         self.posts = {}             #posts dict
+        self.codes = SortedIndex()  #post codes, ascending
+        self.size_bytes = 0         #approximate bytes held, for the store cache
+        self.search_index = None    #trigram index, built on first search
+        self.word_index = None      #bm25 word index, built on first ranked search
+        self.folded = {}            #code -> folded search fields, filled on first search
+        self.scan_buffer = None     #all folded texts in one string, built on first short query
+        self.created_index = None   #(created_us, code), built on first time query
+        self.updated_index = None   #(updated_us, code), built with it
+        self.dirty = False          #changes not yet on disk
 
 
         ####persistence
@@ -44,11 +147,29 @@ class PostDAOPickle(PostDAO):
         self.records_extension = config_class.records_extension #file extension for record files
         os.makedirs(self.records_path, exist_ok=True)           #records dict exists
         
-        #specific blog path
-        self.filepath = os.path.join(
-            self.records_path,
-            f"{self.blog.id}{self.records_extension}"
-        )
+        #specific blog paths: checkpoint, bodies, log, indexes
+        self.set_paths(self.blog.id)
+
+        self.bodies = None          #BodyFile of the current checkpoint
+        self.legacy_checkpoint = False  #loaded from a pickle, rewritten as records after load
+        self.body_generation = 0    #generation of self.bodies
+
+        self.log_records = 0    #frames in the log
+        self.log_bytes = 0      #log size
+
+        self.loaded_stamp = None    #record generation as loaded, none once posts change
+        self.saved_index = None     #(stamp, indexes) the index file holds, skips rewriting it
+
+        #compaction thresholds
+        self.compact_bytes = config_class.log_compact_bytes
+        self.compact_records = config_class.log_compact_records
+
+        self.pending_frames = []                    #frames not yet written to the log
+        self.flusher = get_flusher()                #decides when they are written
+
+        self.lock = threading.RLock()               #guards posts + log appends
+        self.compact_lock = threading.Lock()        #one checkpoint at a time
+        self.compact_thread = None                  #running background compaction
 
         #if autosave on => load existing posts from file
         if self.autosave: self.load_from_file()
@@ -61,26 +182,274 @@ class PostDAOPickle(PostDAO):
 
 
 
-    ####load from json
+    ####record file paths of blog_id
+
+    def set_paths(self, blog_id):
+
+        config_class = Configuration().__class__
+
+        self.filepath = os.path.join(self.records_path, f"{blog_id}{self.records_extension}")
+
+        #bodies sit next to it, one file per checkpoint generation
+        self.body_prefix = f"{os.path.basename(self.filepath)}{config_class.body_extension}."
+
+        #write-ahead log and saved indexes too
+        self.logpath = self.filepath + config_class.log_extension
+        self.indexpath = self.filepath + config_class.index_extension
+
+
+
+    ####bookkeeping for a post entering the store
+
+    def track_post(self, post):
+
+        self.loaded_stamp = None
+        self.patch_scan_buffer(post, True)
+        self.size_bytes += post_size(post)
+        if self.search_index is not None: self.search_index.add(post.code, self.search_fields(post))
+        if self.word_index is not None: self.word_index.add(post.code, self.search_fields(post))
+        if self.created_index is not None: self.created_index.add((post.created_us, post.code))
+        if self.updated_index is not None: self.updated_index.add((post.updated_us, post.code))
+
+
+
+    ####bookkeeping for a post leaving the store (or about to change)
+
+    def untrack_post(self, post):
+
+        self.loaded_stamp = None
+        self.patch_scan_buffer(post, False)
+        self.size_bytes -= post_size(post)
+        if self.search_index is not None: self.search_index.remove(post.code, self.search_fields(post))
+        if self.word_index is not None: self.word_index.remove(post.code, self.search_fields(post))
+        if self.created_index is not None: self.created_index.discard((post.created_us, post.code))
+        if self.updated_index is not None: self.updated_index.discard((post.updated_us, post.code))
+
+        #folded copy is stale once the post changes
+        folded = self.folded.pop(post.code, None)
+        if folded is not None: self.size_bytes -= len(folded)
+
+
+
+    ####folded title, text and author as one string, folded once per post version
+
+    def folded_text(self, post):
+
+        folded = self.folded.get(post.code)
+
+        if folded is None:
+            folded = fold_fields(post)
+            self.folded[post.code] = folded
+            self.size_bytes += len(folded)
+
+        return folded
+
+
+
+    ####folded (title, text, author), what the indexes are built from
+
+    def search_fields(self, post):
+
+        return tuple(self.folded_text(post).split(FIELD_SEPARATOR))
+
+
+
+    ####buffer of every folded text for short queries, built once then patched
+
+    def get_scan_buffer(self):
+
+        with self.lock:
+
+            if self.scan_buffer is None:
+                entries = ((code, self.folded_text(self.posts[code])) for code in self.codes)
+                self.scan_buffer = ScanBuffer(entries, FIELD_SEPARATOR)
+                self.size_bytes += self.scan_buffer.size()
+
+            return self.scan_buffer
+
+
+
+    ####post entered (present) or left the scan buffer, if it is built, size_bytes kept in step
+
+    def patch_scan_buffer(self, post, present):
+
+        buffer = self.scan_buffer
+        if buffer is None: return
+
+        self.size_bytes -= buffer.size()
+        if present: buffer.add(post.code, self.folded_text(post))
+        else: buffer.remove(post.code)
+        self.size_bytes += buffer.size()
+
+
+
+    ####trigram index over every post, built once then maintained
+
+    def get_search_index(self):
+
+        with self.lock:
+
+            if self.search_index is None: self.load_indexes()
+
+            if self.search_index is None:
+                index = TrigramIndex()
+                for post in self.posts.values(): index.add(post.code, self.search_fields(post))
+                self.search_index = index
+
+            return self.search_index
+
+
+
+    ####word index over every post, built once then maintained
+
+    def get_word_index(self):
+
+        with self.lock:
+
+            if self.word_index is None: self.load_indexes()
+
+            if self.word_index is None:
+                index = WordIndex()
+                for post in self.posts.values(): index.add(post.code, self.search_fields(post))
+                self.word_index = index
+
+            return self.word_index
+
+
+
+    ####created and updated time indexes, built once then maintained
+
+    def get_time_indexes(self):
+
+        with self.lock:
+
+            if self.created_index is None:
+                self.created_index = SortedIndex((post.created_us, post.code) for post in self.posts.values())
+                self.updated_index = SortedIndex((post.updated_us, post.code) for post in self.posts.values())
+
+            return self.created_index, self.updated_index
+
+
+
+    ####generation of the record files: checkpoint mtime and size, log size
+
+    def record_stamp(self):
+
+        try:
+            stat = os.stat(self.filepath)
+            checkpoint = (stat.st_mtime_ns, stat.st_size)
+
+        except FileNotFoundError:
+            checkpoint = (0, 0)
+
+        return checkpoint + (self.log_bytes,)
+
+
+
+    ####take saved indexes that match the posts as loaded, stale or missing => none
+
+    def load_indexes(self):
+
+        if self.loaded_stamp is None: return
+
+        loaded = load_indexes(self.indexpath, self.loaded_stamp)
+        if loaded is None: return
+
+        trigrams, words, lengths = loaded
+        if trigrams is not None and self.search_index is None:
+            self.search_index = TrigramIndex(trigrams)
+        if words is not None and self.word_index is None:
+            self.word_index = WordIndex(words, lengths)
+
+        self.saved_index = (self.loaded_stamp, trigrams is not None, words is not None)
+
+
+
+    ####save built indexes, stamped with the record files they match
+
+    def save_indexes(self):
+
+        with self.lock:
+
+            #nothing built, or posts not all on disk
+            if self.search_index is None and self.word_index is None: return
+            if not self.autosave or self.pending_frames: return
+
+            stamp = self.record_stamp()
+            saved = (stamp, self.search_index is not None, self.word_index is not None)
+
+            #file already holds these indexes for these records
+            if saved == self.saved_index: return
+
+            save_indexes(self.indexpath, stamp, self.search_index, self.word_index)
+            self.saved_index = saved
+
+
+
+    ####load checkpoint, then replay the log on top of it
 
     def load_from_file(self):
 
+        with self.lock:
+            self.load_checkpoint()
+            self.replay_log()
+            self.codes = SortedIndex(self.posts)
+            self.update_next_post_id()
+            self.folded = {}
+            self.scan_buffer = None
+            self.size_bytes = sum(post_size(post) for post in self.posts.values())
+            self.loaded_stamp = self.record_stamp()
+
+        #one-time migration: a legacy pickle is replaced by a record file
+        if self.legacy_checkpoint:
+            self.save_to_file()
+            self.legacy_checkpoint = False
+
+        #a long log left by an earlier session is folded right away
+        self.maybe_compact()
+
+
+
+    ####load last checkpoint: a record file, or a legacy pickle
+
+    def load_checkpoint(self):
+
         #does not exist => nothing to load
         if not os.path.exists(self.filepath): return
 
-        #read binary
         with open(self.filepath, "rb") as file:
+            data = file.read()
+
+        #empty => never checkpointed
+        if not data: return
 
-            #try to load
-            try: 
-                loaded = pickle.load(file)
+        if is_record_file(data):
 
-            #if empty or corrupted
-            except Exception: 
+            try:
+                generation, name, headers, bad = decode_records(data)
+            except ValueError as ex:
+                self.set_aside(ex)
                 return
 
-        #expect dict or list of posts
-        if isinstance(loaded, dict): 
+            self.load_headers(generation, name, headers)
+            if bad: self.set_aside(f"{bad} damaged records skipped", [name])
+            return
+
+        #legacy pickles fail in many ways (bad opcode, eof, missing class)
+        try:
+            loaded = pickle.loads(data)
+        except Exception as ex:
+            self.set_aside(ex)
+            return
+
+        self.legacy_checkpoint = True
+
+        #headers + out of line bodies, pickled
+        if isinstance(loaded, dict) and "headers" in loaded:
+            self.load_headers(loaded["generation"], loaded["bodies"], loaded["headers"])
+
+        #dict or list of whole posts
+        elif isinstance(loaded, dict):
             self.posts = loaded
         
         else:
@@ -90,9 +459,139 @@ class PostDAOPickle(PostDAO):
 
             self.posts = temp
 
-        #update next id based on highest id value
-        if self.posts:
-            max_code  = max(self.posts.keys())
+
+
+    ####damaged checkpoint => keep a copy for recovery and say so, never drop it silently
+    ####the body files it may point to are copied too, every generation if the header is unreadable
+
+    def set_aside(self, reason, body_names=None):
+
+        corrupt_path = self.filepath + ".corrupt"
+        shutil.copyfile(self.filepath, corrupt_path)
+
+        if body_names is None:
+            body_paths = stale_body_files(self.records_path, self.body_prefix, None)
+        else:
+            body_paths = [os.path.join(self.records_path, name) for name in body_names]
+
+        for path in body_paths:
+            if os.path.exists(path): shutil.copyfile(path, path + ".corrupt")
+
+        warnings.warn(f"post records {self.filepath} damaged ({reason}), copy kept at {corrupt_path}")
+
+
+
+    ####posts from checkpoint headers, texts stay in the body file
+
+    def load_headers(self, generation, name, headers):
+
+        self.body_generation = generation
+
+        try:
+            self.bodies = BodyFile(os.path.join(self.records_path, name))
+
+        #bodies gone => keep the headers, texts are lost
+        except FileNotFoundError:
+            self.set_aside(f"body file {name} missing", [])
+            self.bodies = None
+
+        #bodies lost => empty texts
+        bodies = self.bodies
+        text = "" if bodies is None else None
+        new = Post.__new__
+
+        #a burst of objects without cycles, collections midway would only cost time
+        gc_enabled = gc.isenabled()
+        gc.disable()
+
+        try:
+            posts = {}
+            for code, title, author, created_us, updated_us, offset, length in headers:
+
+                #slots set directly, no __init__ clock read or __setstate__ unpacking
+                post = new(Post)
+                post.code = code
+                post.title = title
+                post.author = author
+                post.created_us = created_us
+                post.updated_us = updated_us
+                post._text = text
+                post.body = None if bodies is None else (bodies, offset, length)
+
+                posts[code] = post
+
+        finally:
+            if gc_enabled: gc.enable()
+
+        self.posts = posts
+
+        #generations a crash or a refused removal left behind
+        remove_body_files(stale_body_files(self.records_path, self.body_prefix, name))
+
+
+
+    ####apply every complete log frame to self.posts
+
+    def replay_log(self):
+
+        #no log => checkpoint is up to date
+        if not os.path.exists(self.logpath): return
+
+        with open(self.logpath, "rb") as file:
+            data = file.read()
+
+        offset = 0
+        while offset + LOG_FRAME.size <= len(data):
+
+            length, checksum = LOG_FRAME.unpack_from(data, offset)
+            start = offset + LOG_FRAME.size
+            payload = data[start:start + length]
+
+            #torn or corrupted tail => stop at last good frame
+            if len(payload) != length or zlib.crc32(payload) != checksum: break
+
+            try:
+                op, value = pickle.loads(payload)
+            except Exception:
+                break
+
+            self.apply_log_record(op, value)
+            offset = start + length
+            self.log_records += 1
+
+        self.log_bytes = offset
+
+        #drop a torn tail so later appends start on a frame boundary
+        if offset != len(data):
+            with open(self.logpath, "r+b") as file:
+                file.truncate(offset)
+
+
+
+    ####apply one log record
+
+    def apply_log_record(self, op, value):
+
+        if op == LOG_PUT:
+
+            #older logs pickled the Post itself
+            if isinstance(value, tuple):
+                post = Post.__new__(Post)
+                post.__setstate__(value)
+                value = post
+
+            self.posts[value.code] = value
+
+        elif op == LOG_DELETE: self.posts.pop(value, None)
+
+
+
+    ####update next id based on highest id value
+
+    def update_next_post_id(self):
+
+        if self.codes:
+            max_code  = self.codes.last()
             self.blog.next_post_id = max_code +1
 
         #no posts on blog
@@ -101,13 +600,203 @@ class PostDAOPickle(PostDAO):
 
 
 
-    ####writes to pickle file
+    ####checkpoint: writes all posts to pickle file, empties the log
 
     def save_to_file(self):
 
-        #write bytes
-        with open(self.filepath, "wb") as file:
-            pickle.dump(self.posts, file)
+        with self.compact_lock, self.lock: self.checkpoint_all()
+
+        self.save_indexes()
+
+
+
+    ####every post into a fresh checkpoint, the log emptied, caller holds both locks
+
+    def checkpoint_all(self):
+
+        self.write_checkpoint(self.posts)
+
+        #buffered frames are in the checkpoint too
+        self.pending_frames = []
+        self.dirty = False
+
+        #everything in the log is now in the checkpoint
+        if os.path.exists(self.logpath): os.remove(self.logpath)
+        self.log_records = 0
+        self.log_bytes = 0
+
+
+
+    ####write bodies to a new generation, then headers to a temp file and swap,
+    ####a crash never leaves half a checkpoint or headers without their bodies
+
+    def write_checkpoint(self, posts):
+
+        #past any generation on disk, one a damaged checkpoint pointed to is never overwritten
+        generation = max(self.body_generation, last_generation(self.records_path, self.body_prefix)) + 1
+        name = f"{self.body_prefix}{generation}"
+        placed = write_bodies(os.path.join(self.records_path, name), posts.values())
+
+        headers = [
+            (post.code, post.title, post.author, post.created_us, post.updated_us, offset, length)
+            for post, source, offset, length in placed
+        ]
+
+        temp_path = self.filepath + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(encode_records(generation, name, headers))
+        os.replace(temp_path, self.filepath)
+
+        #texts unchanged since they were written now read from the new file
+        bodies = BodyFile(os.path.join(self.records_path, name))
+
+        with self.lock:
+
+            for post, source, offset, length in placed:
+                inline = post.inline_size()
+                if post.move_text(source, (bodies, offset, length)): self.size_bytes -= inline
+
+            self.bodies, self.body_generation = bodies, generation
+
+        #older generations, the one just replaced included, a mapped one may stay until the next sweep
+        remove_body_files(stale_body_files(self.records_path, self.body_prefix, name))
+
+
+
+    ####frame one record, the flusher decides when it reaches the log
+    ####a post is logged as its row tuple, not the object
+
+    def append_log(self, op, value):
+
+        if op == LOG_PUT: value = value.__getstate__()
+
+        payload = pickle.dumps((op, value))
+        header = LOG_FRAME.pack(len(payload), zlib.crc32(payload))
+
+        with self.lock:
+            self.pending_frames.append(header + payload)
+            self.dirty = True
+
+        self.flusher.mark_dirty(self)
+
+
+
+    ####start a background compaction once the log passes a threshold
+
+    def maybe_compact(self):
+
+        #under both thresholds => nothing to do
+        if self.log_bytes < self.compact_bytes and self.log_records < self.compact_records:
+            return
+
+        #checked, started and published under the lock, a waiter never sees an unstarted thread
+        with self.lock:
+
+            #already running
+            if self.compact_thread is not None and self.compact_thread.is_alive(): return
+
+            thread = threading.Thread(target=self.compact, daemon=True)
+            thread.start()
+            self.compact_thread = thread
+
+
+
+    ####fold the log into a fresh checkpoint, writers only wait for the dict copy
+
+    def compact(self):
+
+        with self.compact_lock:
+
+            #(1) snapshot and cut
+            with self.lock:
+                snapshot = dict(self.posts)
+                cut_bytes = self.log_bytes
+                cut_records = self.log_records
+
+            #(2) checkpoint without holding the lock
+            self.write_checkpoint(snapshot)
+
+            #(3) keep only frames appended after the cut
+            with self.lock:
+
+                if os.path.exists(self.logpath):
+                    with open(self.logpath, "rb") as file:
+                        file.seek(cut_bytes)
+                        tail = file.read()
+                else:
+                    tail = b""
+
+                temp_path = self.logpath + ".tmp"
+                with open(temp_path, "wb") as file:
+                    file.write(tail)
+                os.replace(temp_path, self.logpath)
+
+                self.log_bytes = len(tail)
+                self.log_records -= cut_records
+
+
+
+    ####block until a running compaction is done
+
+    def wait_for_compaction(self):
+
+        with self.lock: thread = self.compact_thread
+        if thread is not None: thread.join()
+
+
+
+    ####append buffered frames to the log in one write
+
+    def flush(self):
+
+        with self.lock:
+
+            if self.pending_frames:
+
+                data = b"".join(self.pending_frames)
+                with open(self.logpath, "ab") as file:
+                    file.write(data)
+
+                self.log_records += len(self.pending_frames)
+                self.log_bytes += len(data)
+                self.pending_frames = []
+
+            self.dirty = False
+
+        self.maybe_compact()
+
+
+
+    ####blog id changed => checkpoint under the new id, then drop the files of the old one
+    ####done before the store can be evicted and reopened from the new id
+
+    def move_posts(self, new_id):
+
+        with self.compact_lock, self.lock:
+
+            old_paths = [self.filepath, self.logpath, self.indexpath]
+            old_paths += stale_body_files(self.records_path, self.body_prefix, None)
+            self.set_paths(new_id)
+
+            #autosave off => nothing on disk to move
+            if not self.autosave: return
+
+            #texts are copied from the old bodies, the old log is already in self.posts
+            self.saved_index = None
+            self.checkpoint_all()
+
+        self.save_indexes()
+        remove_body_files(old_paths)
+
+
+
+    ####finish background work before the store is dropped, keep the indexes for next time
+
+    def close(self):
+
+        if self.dirty: self.flush()
+        self.wait_for_compaction()
+        self.save_indexes()
 
 
 
@@ -132,11 +821,17 @@ class PostDAOPickle(PostDAO):
 
     def create_post(self, post):
         
-        #store by code
-        self.posts[post.code]=post
+        with self.lock:
+
+            #store by code
+            old = self.posts.get(post.code)
+            if old is not None: self.untrack_post(old)
+            else: self.codes.add(post.code)
+            self.posts[post.code]=post
+            self.track_post(post)
 
-        #autosave to file
-        if self.autosave: self.save_to_file()
+            #autosave to log
+            if self.autosave: self.append_log(LOG_PUT, post)
 
         return post
 
@@ -145,57 +840,118 @@ class PostDAOPickle(PostDAO):
     ####get all posts w/ substring
 
     def retrieve_posts(self, search_string):
-        
-        #if empty or none
-        if search_string is None or search_string == "":
-            result = list(self.posts.values())
-            return result
 
-        #to lower
-        query = search_string.lower()
-        search_result = []
+        return list(self.iter_matching_posts(search_string))
+
+
+
+    ####yield posts w/ substring as they are found, by code (newest first if descending)
 
-        #check post
-        for post in self.posts.values():
+    def iter_matching_posts(self, search_string, descending=False):
 
-            title_match = query in post.title.lower()   #check title
-            text_match = query in post.text.lower()     #check text
+        #if empty or none => every post
+        query = None if search_string is None or search_string == "" else fold(search_string)
 
-            #only if author exists
-            if post.author is not None:
-                author_match = query in post.author.lower()
+        #a separator in the query could match across two fields
+        if query is not None and FIELD_SEPARATOR in query: return
 
+        with self.lock:
+
+            if query is None:
+                codes = list(reversed(self.codes)) if descending else list(self.posts)
+
+            #too short to narrow with the trigram index => scan every folded text at once
+            elif len(query) < GRAM:
+                codes = self.get_scan_buffer().find(query)
+                if descending: codes.reverse()
+
+            #narrow with the trigram index
             else:
-                author_match = False
+                codes = sorted(self.get_search_index().candidates(query), reverse=descending)
 
-            #if any field matches => keep
-            if title_match or text_match or author_match:
-                search_result.append(post)
+        #only codes are held, each post is checked when the caller asks for the next one
+        for code in codes:
 
-        return search_result
+            post = self.posts.get(code)
+            if post is None: continue   #deleted meanwhile
 
+            if query is None or self.post_matches(post, query): yield post
 
 
-    ####update title or text of post @ key
 
-    def update_post(self, key, new_title, new_text):
-        
-        post=self.posts.get(key)
+    ####true if query is in title, text or author, query already folded
+
+    def post_matches(self, post, query):
+
+        return query in self.folded_text(post)
+
+
+
+    ####top limit posts for query, best bm25 score first
 
-        #if no post @ key => do nothing
-        if post is None: return False
+    def rank_posts(self, query, limit):
+
+        with self.lock:
+            ranked = self.get_word_index().search(fold(query), limit)
+            return [self.posts[code] for code, score in ranked]
+
+
+
+    ####posts created in [start, end), oldest first, either bound may be none
+
+    def posts_created_between(self, start, end):
+
+        with self.lock:
+            created_index, updated_index = self.get_time_indexes()
+
+            #(time,) sorts before every (time, code), so start is kept and end is left out
+            keys = created_index.irange(
+                None if start is None else (to_micros(start),),
+                None if end is None else (to_micros(end),),
+                inclusive=(True, False)
+            )
+
+            return [self.posts[code] for created_us, code in keys]
+
+
+
+    ####limit most recently updated posts, newest first
+
+    def recently_updated_posts(self, limit):
+
+        with self.lock:
+            created_index, updated_index = self.get_time_indexes()
+            return [self.posts[code] for updated_us, code in islice(reversed(updated_index), limit)]
+
+
+
+    ####update title, text or author of post @ key
+
+    def update_post(self, key, new_title, new_text, new_author=None):
         
-        #title exists
-        if new_title is not None: post.title=new_title
+        with self.lock:
 
-        #text exists
-        if new_text is not None: post.text=new_text
+            post=self.posts.get(key)
 
-        #update timestamp
-        post.update_time()
+            #if no post @ key => do nothing
+            if post is None: return False
+            self.untrack_post(post)
+            
+            #title exists
+            if new_title is not None: post.title=new_title
 
-        #autosave to file
-        if self.autosave: self.save_to_file()
+            #text exists
+            if new_text is not None: post.text=new_text
+
+            #author exists
+            if new_author is not None: post.author=new_author
+
+            #update timestamp
+            post.update_time()
+            self.track_post(post)
+
+            #autosave to log
+            if self.autosave: self.append_log(LOG_PUT, post)
 
         return True
         
@@ -205,34 +961,55 @@ class PostDAOPickle(PostDAO):
 
     def delete_post(self, key):
         
-        #if code exists
-        if key in self.posts:
-            del self.posts[key]                     #delete post @ code
-            if self.autosave: self.save_to_file()   #autosave to file
+        with self.lock:
 
-            return True
+            #if code exists
+            if key in self.posts:
+                self.untrack_post(self.posts[key])
+                del self.posts[key]                                 #delete post @ code
+                self.codes.discard(key)
+                if self.autosave: self.append_log(LOG_DELETE, key)  #autosave to log
+
+                return True
         
         return False
 
 
 
-    ####list all posts in descending order
+    ####list posts in descending order, limit posts with codes below after_code
 
-    def list_posts(self):
+    def list_posts(self, after_code=None, limit=None):
 
+        return list(self.iter_posts(after_code, limit))
 
-        posts=self.posts.values()
 
-        ####simple helper
-        def get_post_code(post): return post.code
-        
-        #sort posts in descending order
-        posts_sorted = sorted(
-            posts,
-            key=get_post_code,
-            reverse=True
-            )
-    
-        return posts_sorted
 
-            
\ No newline at end of file
+    ####yield posts in descending order, a page of codes at a time
+
+    def iter_posts(self, after_code=None, limit=None):
+
+        remaining = limit
+
+        while True:
+
+            page = LIST_PAGE if remaining is None else min(remaining, LIST_PAGE)
+
+            #codes below the cursor, newest first, nothing is sorted per call
+            with self.lock:
+                below = self.codes.irange(high=after_code, inclusive=(True, False), reverse=True)
+                codes = list(islice(below, page))
+
+            if not codes: return
+
+            for code in codes:
+
+                post = self.posts.get(code)
+                if post is None: continue   #deleted meanwhile
+
+                yield post
+
+                if remaining is not None:
+                    remaining -= 1
+                    if remaining == 0: return
+
+            after_code = codes[-1]
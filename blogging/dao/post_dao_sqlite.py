@@ -0,0 +1,408 @@
+from datetime import datetime
+
+from blogging.configuration import Configuration    #global config
+
+from blogging.dao.post_dao import PostDAO           #implements
+from blogging.dao.sqlite_database import get_connection, get_lock
+from blogging.dao.text_fold import fold
+from blogging.dao.word_index import tokenize
+from blogging.post import Post
+
+
+"""
+
+    PostDAOSQLite
+
+    implements PostDao
+
+    a data access object that keeps posts in one sqlite table shared by every blog,
+    keyed by (blog_id, code), so only the posts a caller asks for are in memory
+
+    autosave off: table lives in a private in-memory database
+    autosave on: table lives in Configuration.database_file, each mutation is
+                 one single-row transaction
+
+    rank_posts uses an fts5 table over the folded (text_fold) title, text and
+    author, kept in step with posts by triggers, folds the query the same way,
+    so "blog" finds "ＢＬＯＧ" like the file daos, and orders matches by the
+    built-in bm25
+
+"""
+
+#contentless, the indexed text is folded and no longer what posts holds,
+#a delete hands back the same folded values (py_fold is deterministic)
+SEARCH_TABLE = """CREATE VIRTUAL TABLE posts_fts USING fts5(
+        title, text, author, content=''
+    )"""
+
+SEARCH_SCHEMA = (
+    SEARCH_TABLE,
+    """CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts (rowid, title, text, author)
+        VALUES (new.rowid, py_fold(new.title), py_fold(new.text), py_fold(new.author));
+    END""",
+    """CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, title, text, author)
+        VALUES ('delete', old.rowid, py_fold(old.title), py_fold(old.text), py_fold(old.author));
+    END""",
+    """CREATE TRIGGER posts_fts_update AFTER UPDATE ON posts BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, title, text, author)
+        VALUES ('delete', old.rowid, py_fold(old.title), py_fold(old.text), py_fold(old.author));
+        INSERT INTO posts_fts (rowid, title, text, author)
+        VALUES (new.rowid, py_fold(new.title), py_fold(new.text), py_fold(new.author));
+    END""",
+)
+
+SEARCH_TRIGGERS = ("posts_fts_insert", "posts_fts_delete", "posts_fts_update")
+
+#bm25 column weights for title, text, author, same as WordIndex
+RANK_WEIGHTS = "2.0, 1.0, 1.5"
+
+
+####create the search table once, indexing posts stored before it existed
+####a table from an older schema (unfolded text) is dropped and rebuilt
+
+def create_search_table(connection):
+
+    existing = connection.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'posts_fts'"
+    ).fetchone()
+    if existing and existing[0] == SEARCH_TABLE: return
+
+    if existing:
+        for trigger in SEARCH_TRIGGERS: connection.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        connection.execute("DROP TABLE posts_fts")
+
+    for statement in SEARCH_SCHEMA: connection.execute(statement)
+    connection.execute(
+        """INSERT INTO posts_fts (rowid, title, text, author)
+           SELECT rowid, py_fold(title), py_fold(text), py_fold(author) FROM posts"""
+    )
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS posts (
+        blog_id     INTEGER NOT NULL,
+        code        INTEGER NOT NULL,
+        title       TEXT NOT NULL,
+        text        TEXT NOT NULL,
+        author      TEXT,
+        created_at  TEXT NOT NULL,
+        updated_at  TEXT NOT NULL,
+        PRIMARY KEY (blog_id, code)
+    )""",
+    "CREATE INDEX IF NOT EXISTS posts_created_at ON posts (blog_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS posts_updated_at ON posts (blog_id, updated_at)",
+    create_search_table,
+)
+
+POST_COLUMNS = "code, title, text, author, created_at, updated_at"
+
+class PostDAOSQLite(PostDAO):
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self, blog, autosave=False):
+
+        self.autosave = autosave    #persist on/off
+        self.blog = blog            #blog post is under
+        self.blog_id = blog.id      #rows are keyed by the id the blog had when opened
+        self.size_bytes = 0         #posts stay in the database, nothing held
+        self.dirty = False          #every mutation commits right away
+
+        config = Configuration()        #get config
+        config_class = config.__class__ #class level config
+
+        #autosave off => nothing touches disk
+        self.database_file = config_class.database_file if self.autosave else ":memory:"
+        self.connection = get_connection(self.database_file, SCHEMA)
+        self.lock = get_lock(self.database_file)    #held by every write on the shared connection
+
+        #continue numbering after the highest stored code
+        self.update_next_post_id()
+
+
+
+#################
+##   helpers   ##
+#################
+
+
+
+    ####update next id based on highest code in the table
+
+    def update_next_post_id(self):
+
+        row = self.connection.execute(
+            "SELECT MAX(code) FROM posts WHERE blog_id = ?",
+            (self.blog_id,)
+        ).fetchone()
+
+        self.blog.next_post_id = 1 if row[0] is None else row[0] + 1
+
+
+
+    ####blog id changed => rekey its rows
+
+    def move_posts(self, new_id):
+
+        with self.lock, self.connection:
+            self.connection.execute("UPDATE posts SET blog_id = ? WHERE blog_id = ?", (new_id, self.blog_id))
+
+        self.blog_id = new_id
+
+
+
+    ####nothing pending, every mutation is its own transaction
+
+    def flush(self):
+
+        pass
+
+
+
+    ####nothing to release, the connection is shared
+
+    def close(self):
+
+        pass
+
+
+
+    ####rebuild post from a row
+
+    def row_to_post(self, row):
+
+        code, title, text, author, created_at, updated_at = row
+
+        post = Post(code, title, text, author)
+        post.created_at = datetime.fromisoformat(created_at)
+        post.updated_at = datetime.fromisoformat(updated_at)
+
+        return post
+
+
+
+##################
+## main methods ##
+##################
+
+
+
+    ####find post by key, primary key point lookup
+
+    def search_post(self, key):
+
+        row = self.connection.execute(
+            f"SELECT {POST_COLUMNS} FROM posts WHERE blog_id = ? AND code = ?",
+            (self.blog_id, key)
+        ).fetchone()
+
+        if row is None: return None
+
+        return self.row_to_post(row)
+
+
+
+    ####store new post
+
+    def create_post(self, post):
+
+        with self.lock, self.connection:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO posts (blog_id, {POST_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.blog_id,
+                    post.code,
+                    post.title,
+                    post.text,
+                    post.author,
+                    post.created_at.isoformat(),
+                    post.updated_at.isoformat(),
+                )
+            )
+
+        return post
+
+
+
+    ####get all posts w/ substring in title, text or author
+
+    def retrieve_posts(self, search_string):
+
+        return list(self.iter_matching_posts(search_string))
+
+
+
+    ####yield posts w/ substring as the cursor reaches them
+
+    def iter_matching_posts(self, search_string, descending=False):
+
+        order = "DESC" if descending else ""
+
+        #if empty or none
+        if search_string is None or search_string == "":
+            rows = self.connection.execute(
+                f"SELECT {POST_COLUMNS} FROM posts WHERE blog_id = ? ORDER BY code {order}",
+                (self.blog_id,)
+            )
+
+        else:
+            query = fold(search_string)
+            rows = self.connection.execute(
+                f"""SELECT {POST_COLUMNS} FROM posts
+                    WHERE blog_id = ?
+                    AND (
+                        instr(py_fold(title), ?) > 0
+                        OR instr(py_fold(text), ?) > 0
+                        OR instr(py_fold(author), ?) > 0
+                    )
+                    ORDER BY code {order}""",
+                (self.blog_id, query, query, query)
+            )
+
+        for row in rows: yield self.row_to_post(row)
+
+
+
+    ####top limit posts for query, best bm25 score first
+
+    def rank_posts(self, query, limit):
+
+        words = tokenize(fold(query))
+        if not words: return []
+
+        #quote each word so user input is never read as fts syntax
+        match = " OR ".join(f'"{word}"' for word in words)
+        columns = ", ".join(f"posts.{column}" for column in POST_COLUMNS.split(", "))
+
+        rows = self.connection.execute(
+            f"""SELECT {columns} FROM posts_fts
+                JOIN posts ON posts.rowid = posts_fts.rowid
+                WHERE posts_fts MATCH ? AND posts.blog_id = ?
+                ORDER BY bm25(posts_fts, {RANK_WEIGHTS})
+                LIMIT ?""",
+            (match, self.blog_id, limit)
+        )
+
+        return [self.row_to_post(row) for row in rows]
+
+
+
+    ####posts created in [start, end), oldest first, a range scan on posts_created_at
+    ####isoformat timestamps sort like the datetimes they encode
+
+    def posts_created_between(self, start, end):
+
+        bounds = ""
+        params = [self.blog_id]
+
+        if start is not None:
+            bounds += " AND created_at >= ?"
+            params.append(start.isoformat())
+
+        if end is not None:
+            bounds += " AND created_at < ?"
+            params.append(end.isoformat())
+
+        rows = self.connection.execute(
+            f"""SELECT {POST_COLUMNS} FROM posts
+                WHERE blog_id = ?{bounds}
+                ORDER BY created_at, code""",
+            params
+        )
+
+        return [self.row_to_post(row) for row in rows]
+
+
+
+    ####limit most recently updated posts, newest first, walks posts_updated_at backwards
+
+    def recently_updated_posts(self, limit):
+
+        rows = self.connection.execute(
+            f"""SELECT {POST_COLUMNS} FROM posts
+                WHERE blog_id = ?
+                ORDER BY updated_at DESC, code DESC
+                LIMIT ?""",
+            (self.blog_id, limit)
+        )
+
+        return [self.row_to_post(row) for row in rows]
+
+
+
+    ####update title, text or author of post @ key
+
+    def update_post(self, key, new_title, new_text, new_author=None):
+
+        #read and write in one transaction, no other write lands in between
+        with self.lock, self.connection:
+
+            self.connection.execute("BEGIN IMMEDIATE")
+            post = self.search_post(key)
+
+            #if no post @ key => do nothing
+            if post is None: return False
+
+            #title, text, author exist
+            if new_title is not None: post.title = new_title
+            if new_text is not None: post.text = new_text
+            if new_author is not None: post.author = new_author
+
+            #update timestamp
+            post.update_time()
+
+            self.connection.execute(
+                """UPDATE posts SET title = ?, text = ?, author = ?, updated_at = ?
+                   WHERE blog_id = ? AND code = ?""",
+                (post.title, post.text, post.author, post.updated_at.isoformat(), self.blog_id, key)
+            )
+
+        return True
+
+
+
+    ####delete post @ key
+
+    def delete_post(self, key):
+
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM posts WHERE blog_id = ? AND code = ?",
+                (self.blog_id, key)
+            )
+
+        return cursor.rowcount > 0
+
+
+
+    ####list posts in descending order, limit posts with codes below after_code
+
+    def list_posts(self, after_code=None, limit=None):
+
+        return list(self.iter_posts(after_code, limit))
+
+
+
+    ####yield posts newest first, one row at a time
+    ####after_code is the cursor, a range scan on the primary key
+
+    def iter_posts(self, after_code=None, limit=None):
+
+        #no cursor => start at the newest post
+        cursor = "" if after_code is None else "AND code < ?"
+        params = (self.blog_id,) if after_code is None else (self.blog_id, after_code)
+
+        rows = self.connection.execute(
+            f"""SELECT {POST_COLUMNS} FROM posts
+                WHERE blog_id = ? {cursor}
+                ORDER BY code DESC
+                LIMIT ?""",
+            params + (-1 if limit is None else limit,)
+        )
+
+        for row in rows: yield self.row_to_post(row)
@@ -0,0 +1,249 @@
+import atexit
+import threading
+from collections import OrderedDict
+
+from blogging.configuration import Configuration    #global config
+
+
+"""
+
+    PostStoreCache
+
+    bounded lru cache of open post stores (post daos), shared by every blog
+
+    a blog asks the cache for its store on each post operation, the cache keeps
+    at most max_blogs stores or max_bytes of post data, whichever is hit first
+    the least recently used store is evicted: dirty stores are flushed first,
+    then the store is closed and dropped, the next access reopens it from disk
+
+    only persistent stores belong here, a store with autosave off has no file to
+    reopen from, so Blog keeps that one itself
+
+    every store still open at exit is closed, so it can save its search indexes
+    the cache is shared by the threads of a cross-blog search, a lock guards
+    its bookkeeping only: a store is opened (load + log replay) outside it, one
+    opener per blog, and evicted stores are closed (flush, compaction, index
+    save) by a closer thread, a blog asked for while its store is still being
+    closed gets that store back instead of rereading files not yet written
+
+"""
+
+class PostStoreCache:
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self, max_blogs=None, max_bytes=None):
+
+        self.max_blogs = max_blogs  #max open stores, none => unbounded
+        self.max_bytes = max_bytes  #max post bytes held, none => unbounded
+        self.stores = OrderedDict() #blog identity -> store, oldest first
+        self.closing = OrderedDict()#blog identity -> evicted store not closed yet
+        self.opening = {}           #blog identity -> lock held while its store opens
+        self.lock = threading.RLock()
+        self.condition = threading.Condition(self.lock)    #wakes the closer
+        self.thread = None          #closer thread, started on first eviction
+
+        #counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+
+###############
+##  methods  ##
+###############
+
+
+
+    ####store for blog, opened with open_store() on a miss, outside the cache lock
+
+    def get(self, blog, open_store):
+
+        #keyed by identity, the store holds the blog so the key stays valid while cached
+        key = id(blog)
+
+        with self.lock:
+            store = self.lookup(key)
+            if store is not None: return store
+            opening = self.opening.setdefault(key, threading.Lock())
+
+        #one opener per blog, the others wait and find its store
+        with opening:
+
+            with self.lock: store = self.lookup(key)
+
+            if store is None:
+
+                store = open_store()
+
+                with self.lock:
+                    self.misses += 1
+                    self.stores[key] = store
+                    self.evict()
+
+            with self.lock: self.opening.pop(key, None)
+
+        return store
+
+
+
+    ####cached or still closing store for key, none on a miss, caller holds the lock
+
+    def lookup(self, key):
+
+        store = self.stores.get(key)
+
+        #evicted but not closed yet => take it back, disk may not have its changes
+        if store is None and key in self.closing:
+            store = self.stores[key] = self.closing.pop(key)
+
+        if store is not None:
+            self.hits += 1
+            self.stores.move_to_end(key)
+
+        return store
+
+
+
+    ####drop the store for blog without counting an eviction (deleted blogs)
+
+    def discard(self, blog):
+
+        with self.lock:
+            store = self.stores.pop(id(blog), None) or self.closing.pop(id(blog), None)
+
+        if store is not None: self.close_store(store)
+
+
+
+    ####close every open store, evicted ones first
+
+    def close_all(self):
+
+        self.close_evicted()
+
+        with self.lock:
+            stores = list(self.stores.values())
+            self.stores.clear()
+
+        for store in stores: self.close_store(store)
+
+
+
+    ####total post bytes held by open stores
+
+    def total_bytes(self):
+
+        return sum(store.size_bytes for store in self.stores.values())
+
+
+
+    ####evict least recently used stores until back under both limits, the closer closes them
+
+    def evict(self):
+
+        #never evict the store that was just handed out
+        while len(self.stores) > 1 and self.over_limit():
+
+            key, store = self.stores.popitem(last=False)
+            self.closing[key] = store
+            self.evictions += 1
+
+        if not self.closing: return
+
+        #start the closer on first use
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+        self.condition.notify()
+
+
+
+    ####true if either limit is exceeded
+
+    def over_limit(self):
+
+        if self.max_blogs is not None and len(self.stores) > self.max_blogs: return True
+        if self.max_bytes is not None and self.total_bytes() > self.max_bytes: return True
+
+        return False
+
+
+
+    ####closer thread: close evicted stores as they come
+
+    def run(self):
+
+        while True:
+
+            with self.condition:
+                while not self.closing: self.condition.wait()
+
+            self.close_evicted()
+
+
+
+    ####close every evicted store now, on the caller's thread
+
+    def close_evicted(self):
+
+        while True:
+
+            with self.lock:
+                if not self.closing: return
+                key, store = next(iter(self.closing.items()))
+
+            #still listed while it closes, so a get meanwhile takes it back
+            self.close_store(store)
+
+            with self.lock:
+                if self.closing.get(key) is store: del self.closing[key]
+
+
+
+    ####flush a dirty store, then let it finish background work
+
+    def close_store(self, store):
+
+        if store.dirty: store.flush()
+        store.close()
+
+
+
+    ####counters for monitoring
+
+    def stats(self):
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "blogs": len(self.stores),
+            "bytes": self.total_bytes(),
+        }
+
+
+
+####shared cache, sized from Configuration on first use, closed at exit
+
+post_store_cache = None
+
+def get_post_store_cache():
+
+    global post_store_cache
+
+    if post_store_cache is None:
+        config_class = Configuration().__class__
+        post_store_cache = PostStoreCache(
+            max_blogs=config_class.post_store_cache_blogs,
+            max_bytes=config_class.post_store_cache_bytes,
+        )
+        atexit.register(post_store_cache.close_all)
+
+    return post_store_cache
@@ -0,0 +1,242 @@
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+
+
+"""
+
+    record file
+
+    the checkpoint of a post store (<id>.dat): one header per post, the texts
+    are in the body file it names (body_file), little endian, column by column:
+
+        header  | magic | version u16 | flags u16 | generation u32 | count i64 |
+                  authors i32 | strings size i64 | columns + strings crc32 u32 |
+                  bodies name len u16 | bodies name utf8 | header crc32 u32 |
+        columns | code i64, created_us i64, updated_us i64, body offset i64,
+                  body length i64: count each | author i32 x count (index into
+                  the author table, -1 => none) | title len i32 x count |
+                  row crc32 u32 x count | author len i32 x authors |
+        strings | every distinct author, then every title, utf8, each followed by a nul |
+
+    decoding is vectorized: every column is one array.frombytes, the strings
+    are one decode + split on the nuls (flag SPLIT: no string holds a nul),
+    authors are looked up in the table, no python work per row but the zip
+
+    each row's crc32 covers its packed fields, its title and its author, they
+    are only checked when the crc of columns + strings fails: then a row that
+    fails its own is dropped and counted, the rest still load, a broken
+    header or layout raises ValueError
+
+    the format no longer depends on the Post class layout, a reader checks the
+    version and older versions keep their own decoder
+
+"""
+
+MAGIC = b"PREC"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHIqiqIH")
+CRC = struct.Struct("<I")
+
+#fields a row crc covers, before its title and author bytes
+ROW = struct.Struct("<qqqqqii")
+
+#no string holds a nul, strings split on the terminators
+FLAG_SPLIT = 1
+
+#author index of a post without one
+NO_AUTHOR = -1
+
+TERMINATOR = b"\x00"
+
+#i64 columns: code, created_us, updated_us, body offset, body length
+INT_COLUMNS = 5
+
+
+####true if data starts like a record file, else it is a legacy pickle
+
+def is_record_file(data):
+
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+
+####little endian bytes of a column
+
+def column_bytes(column):
+
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+
+    return column.tobytes()
+
+
+
+####column of typecode from little endian bytes, raises ValueError if they do not fit count
+
+def read_column(typecode, data, offset, count):
+
+    column = array(typecode)
+    end = offset + column.itemsize * count
+    if end > len(data): raise ValueError("truncated records")
+
+    column.frombytes(data[offset:end])
+    if sys.byteorder == "big": column.byteswap()
+
+    return column, end
+
+
+
+####checkpoint bytes for headers (code, title, author, created_us, updated_us, body offset, body length)
+
+def encode_records(generation, bodies_name, headers):
+
+    ints = [array("q") for _ in range(INT_COLUMNS)]
+    author_column = array("i")
+    title_lengths = array("i")
+    checksums = array("I")
+    author_table = {}       #author -> index, insertion ordered
+    titles = []
+    flags = FLAG_SPLIT
+
+    for code, title, author, created_us, updated_us, offset, length in headers:
+
+        title_bytes = title.encode("utf-8")
+        author_bytes = b"" if author is None else author.encode("utf-8")
+        if TERMINATOR in title_bytes or TERMINATOR in author_bytes: flags &= ~FLAG_SPLIT
+
+        index = NO_AUTHOR if author is None else author_table.setdefault(author, len(author_table))
+        fields = (code, created_us, updated_us, offset, length)
+
+        for column, value in zip(ints, fields): column.append(value)
+        author_column.append(index)
+        title_lengths.append(len(title_bytes))
+        checksums.append(zlib.crc32(author_bytes, zlib.crc32(title_bytes, zlib.crc32(ROW.pack(*fields, index, len(title_bytes))))))
+        titles.append(title_bytes)
+
+    authors = [author.encode("utf-8") for author in author_table]
+    author_lengths = array("i", map(len, authors))
+
+    columns = [column_bytes(column) for column in ints + [author_column, title_lengths, checksums, author_lengths]]
+    strings = b"".join(value + TERMINATOR for value in authors + titles)
+
+    body = b"".join(columns + [strings])
+    name = bodies_name.encode("utf-8")
+    header = HEADER.pack(
+        MAGIC, VERSION, flags, generation, len(titles), len(authors), len(strings), zlib.crc32(body), len(name)
+    ) + name
+
+    return b"".join([header, CRC.pack(zlib.crc32(header)), body])
+
+
+
+####(generation, bodies name, headers, bad rows) from checkpoint bytes, headers is an iterable
+####of what encode_records took, raises ValueError if the header or the layout it describes is broken
+
+def decode_records(data):
+
+    try:
+        magic, version, flags, generation, count, author_count, strings_size, body_crc, name_len = \
+            HEADER.unpack_from(data, 0)
+        name_end = HEADER.size + name_len
+        (header_crc,) = CRC.unpack_from(data, name_end)
+    except struct.error:
+        raise ValueError("truncated header")
+
+    if magic != MAGIC: raise ValueError("not a record file")
+    if version != VERSION: raise ValueError(f"unsupported version {version}")
+    if zlib.crc32(data[:name_end]) != header_crc: raise ValueError("header checksum")
+    if count < 0 or author_count < 0: raise ValueError("bad counts")
+
+    bodies_name = bytes(data[HEADER.size:name_end]).decode("utf-8")
+
+    data = memoryview(data)
+    offset = name_end + CRC.size
+    columns = []
+
+    for typecode, size in [("q", count)] * INT_COLUMNS + [("i", count), ("i", count), ("I", count), ("i", author_count)]:
+        column, offset = read_column(typecode, data, offset, size)
+        columns.append(column)
+
+    codes, created, updated, offsets, lengths, author_column, title_lengths, checksums, author_lengths = columns
+
+    #a cut string section only loses the rows whose strings were in the cut part
+    strings = bytes(data[offset:])
+    if len(strings) > strings_size: raise ValueError("trailing bytes")
+
+    #whole file intact (the usual case) => no row is checked, strings split in one go
+    if len(strings) == strings_size and zlib.crc32(strings, zlib.crc32(data[name_end + CRC.size:offset])) == body_crc:
+
+        if flags & FLAG_SPLIT:
+            values = strings.decode("utf-8").split("\x00")
+            author_table = values[:author_count] + [None]       #index -1 => none
+            titles = values[author_count:author_count + count]
+
+        else:
+            author_table = split_strings(strings, 0, author_lengths) + [None]
+            titles = split_strings(strings, sum(author_lengths) + author_count, title_lengths)
+
+        authors = map(author_table.__getitem__, author_column)
+        headers = zip(codes, titles, authors, created, updated, offsets, lengths)
+
+        return generation, bodies_name, headers, 0
+
+    return (generation, bodies_name) + checked_rows(columns, strings)
+
+
+
+####values of lengths, back to back from start, each followed by a terminator
+
+def split_strings(strings, start, lengths):
+
+    starts = accumulate((length + 1 for length in lengths), initial=start)
+    return [strings[begin:begin + length].decode("utf-8") for begin, length in zip(starts, lengths)]
+
+
+
+####(headers, bad rows) row by row, every row checked against its own crc
+
+def checked_rows(columns, strings):
+
+    codes, created, updated, offsets, lengths, author_column, title_lengths, checksums, author_lengths = columns
+
+    #(start, end) of each author, one past the end of the strings if cut off
+    author_spans = []
+    start = 0
+    for length in author_lengths:
+        author_spans.append((start, start + length))
+        start += length + 1
+
+    headers = []
+    bad = 0
+    title_start = start
+
+    for row, code in enumerate(codes):
+
+        title_end = title_start + title_lengths[row]
+        index = author_column[row]
+        fields = (code, created[row], updated[row], offsets[row], lengths[row], index, title_lengths[row])
+
+        title_bytes = strings[title_start:title_end]
+        author_bytes = b""
+        if 0 <= index < len(author_spans): author_bytes = strings[slice(*author_spans[index])]
+
+        in_bounds = title_end <= len(strings) and (index == NO_AUTHOR or (
+            index < len(author_spans) and author_spans[index][1] <= len(strings)
+        ))
+
+        title_start = title_end + 1
+
+        #torn or flipped row => skip it, the others are independent
+        if not in_bounds or zlib.crc32(author_bytes, zlib.crc32(title_bytes, zlib.crc32(ROW.pack(*fields)))) != checksums[row]:
+            bad += 1
+            continue
+
+        author = None if index == NO_AUTHOR else author_bytes.decode("utf-8")
+        headers.append((code, title_bytes.decode("utf-8"), author, created[row], updated[row], offsets[row], lengths[row]))
+
+    return headers, bad
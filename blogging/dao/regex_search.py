@@ -0,0 +1,293 @@
+import multiprocessing
+import re
+import threading
+import time
+from functools import lru_cache
+from itertools import islice
+
+from blogging.exception.search_timeout_exception import SearchTimeoutException
+
+from .text_fold import fold                         #search folding
+
+
+"""
+
+    regex search over posts
+
+    a pattern is matched case-insensitively against each field as written
+    (title, text, author) separately, so it never spans two fields
+
+    compiled patterns are memoized in a bounded lru cache, repeating a search
+    or paging through its results compiles once
+
+    before the regex runs, the longest literal every match must contain is
+    pulled out of the pattern and handed to the store's plain substring search,
+    which narrows candidates with whatever index it has (trigrams, scan buffer,
+    sql), only those candidates are matched against the full regex, folding is
+    only ever used for this prefilter
+
+    a re match cannot be interrupted, so a search with a deadline or a cancel
+    event matches in a separate process (Matcher), MATCH_BATCH posts per round
+    trip, while the caller waits on the answer in POLL_INTERVAL slices: past
+    the deadline the process is killed and SearchTimeoutException raised,
+    once cancel is set it is killed and the stream ends, either within one
+    slice, however slow the pattern, idle processes are kept for the next
+    search
+    without either, posts are matched in the caller's thread
+
+"""
+
+#compiled patterns kept
+PATTERN_CACHE_SIZE = 128
+
+#characters that end a literal run
+METACHARS = frozenset(".^$*+?{}[]|()\\")
+
+#a {m}, {m,}, {,n} or {m,n} quantifier
+REPEAT = re.compile(r"\{\d*(,\d*)?\}")
+
+#escapes with arguments, letter => characters after the backslash
+ESCAPE_LENGTHS = {"x": 3, "u": 5, "U": 9}
+
+#posts sent to a match process per round trip
+MATCH_BATCH = 64
+
+#seconds between deadline and cancel checks while a batch is matched
+POLL_INTERVAL = 0.05
+
+idle_matchers = []                  #match processes between searches
+matchers_lock = threading.Lock()
+
+
+####compiled, case-insensitive pattern, raises re.error if invalid
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_pattern(pattern):
+
+    return re.compile(pattern, re.IGNORECASE)
+
+
+
+####index just past the escape at i, its argument included (\x41, \u0041, \N{...}, \101, \12)
+####pattern already compiled, so the escape is well formed
+
+def escape_end(pattern, i):
+
+    kind = pattern[i + 1:i + 2]
+
+    if kind in ESCAPE_LENGTHS: return i + 1 + ESCAPE_LENGTHS[kind]
+
+    if kind == "N":
+        close = pattern.find("}", i)
+        return len(pattern) if close == -1 else close + 1
+
+    #octal or group reference, up to three digits
+    if kind.isdigit():
+        end = i + 2
+        while end < min(i + 4, len(pattern)) and pattern[end].isdigit(): end += 1
+        return end
+
+    return i + 2
+
+
+
+####longest literal that occurs in every match of pattern, "" if none is known
+####unsure about a piece => it ends the run, a missed literal only costs speed
+
+def required_literal(pattern):
+
+    #whitespace and comments are not literal in verbose patterns
+    if compile_pattern(pattern).flags & re.VERBOSE: return ""
+
+    best = ""
+    run = ""
+    depth = 0   #inside groups nothing is required
+    i = 0
+
+    while i < len(pattern):
+
+        char = pattern[i]
+        literal = None
+
+        #escaped punctuation is literal, \d \w \1 \x41 ... are not, their arguments are skipped
+        if char == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if escaped and not escaped.isalnum(): literal = escaped
+            i = escape_end(pattern, i)
+
+        #repeat counts are not literal, a lone { is but is left out
+        elif char == "{":
+            repeat = REPEAT.match(pattern, i)
+            i = repeat.end() if repeat else i + 1
+
+        #character class => skip to its closing bracket
+        elif char == "[":
+            i += 1
+            if pattern[i:i + 1] == "^": i += 1
+            if pattern[i:i + 1] == "]": i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+
+        #alternation at the top => no literal is required
+        elif char == "|" and depth == 0:
+            return ""
+
+        else:
+            if char == "(": depth += 1
+            elif char == ")": depth -= 1
+            elif char not in METACHARS: literal = char
+            i += 1
+
+        #a quantifier after the literal decides whether it is required
+        quantifier = pattern[i:i + 1]
+
+        if literal is not None and depth == 0 and quantifier not in ("*", "?", "{"):
+            run += literal
+            if quantifier != "+": continue
+
+        if len(run) > len(best): best = run
+        run = ""
+
+    return run if len(run) > len(best) else best
+
+
+
+####required literal folded for the store's substring search, "" => every post
+
+def folded_literal(pattern):
+
+    literal = required_literal(pattern)
+    folded = fold(literal)
+
+    #folding changed more than case (ß => ss, ﬁ => fi), the folded text may not
+    #hold it where the regex matches the original, no prefilter is safer
+    return folded if folded == literal.lower() else ""
+
+
+
+####indexes of the posts in batch (field tuples, none for a missing field) matching pattern
+
+def match_batch(pattern, batch):
+
+    regex = compile_pattern(pattern)
+    return [index for index, fields in enumerate(batch) if any(regex.search(field) for field in fields if field is not None)]
+
+
+
+####match process loop: (pattern, batch) in, matching indexes out, until the pipe closes
+
+def serve_matches(connection):
+
+    while True:
+
+        try:
+            pattern, batch = connection.recv()
+        except EOFError:
+            return
+
+        connection.send(match_batch(pattern, batch))
+
+
+
+class Matcher:
+
+    """a process matching batches for one search at a time, killed if it runs too long"""
+
+    def __init__(self):
+
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve_matches, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.alive = True
+
+
+
+    ####matching indexes of batch, none once cancel is set, raises SearchTimeoutException past deadline
+
+    def match(self, pattern, batch, deadline, cancel):
+
+        self.connection.send((pattern, batch))
+
+        while True:
+
+            wait = POLL_INTERVAL if deadline is None else min(POLL_INTERVAL, deadline - time.monotonic())
+            if self.connection.poll(max(wait, 0)): return self.connection.recv()
+
+            if cancel is not None and cancel.is_set():
+                self.kill()
+                return None
+
+            if deadline is not None and time.monotonic() > deadline:
+                self.kill()
+                raise SearchTimeoutException()
+
+
+
+    ####stop the process mid-match
+
+    def kill(self):
+
+        self.alive = False
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+
+####idle match process, or a new one
+
+def take_matcher():
+
+    with matchers_lock:
+        while idle_matchers:
+            matcher = idle_matchers.pop()
+            if matcher.process.is_alive(): return matcher
+
+    return Matcher()
+
+
+
+####matcher done with a search, kept if it was not killed
+
+def release_matcher(matcher):
+
+    if not matcher.alive: return
+
+    with matchers_lock: idle_matchers.append(matcher)
+
+
+
+####posts among candidates matching pattern in one of their fields
+####fields_of(post) => tuple of fields as written, none for a missing one
+
+def filter_posts(candidates, pattern, fields_of, deadline=None, cancel=None):
+
+    #nothing to stop it => match here
+    if deadline is None and cancel is None:
+        regex = compile_pattern(pattern)
+        for post in candidates:
+            if any(regex.search(field) for field in fields_of(post) if field is not None): yield post
+        return
+
+    candidates = iter(candidates)
+    matcher = take_matcher()
+
+    try:
+        while True:
+
+            if cancel is not None and cancel.is_set(): return
+            if deadline is not None and time.monotonic() > deadline: raise SearchTimeoutException()
+
+            batch = list(islice(candidates, MATCH_BATCH))
+            if not batch: return
+
+            matched = matcher.match(pattern, [fields_of(post) for post in batch], deadline, cancel)
+            if matched is None: return
+
+            for index in matched: yield batch[index]
+
+    #a killed matcher is dropped, an abandoned stream leaves it idle
+    finally:
+        release_matcher(matcher)
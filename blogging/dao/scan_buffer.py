@@ -0,0 +1,183 @@
+import bisect
+from array import array
+
+
+"""
+
+    ScanBuffer
+
+    brute-force substring search for queries an index cannot narrow (shorter
+    than a trigram), without a python loop over posts
+
+    every post's folded search text is joined into one string, each post
+    followed by a separator, with two parallel arrays:
+
+        self.starts:    offset in self.buffer where each row's text begins
+        self.codes:     code of each row's post, ascending (see below)
+
+    a search is repeated str.find over the buffer, a hit is mapped back to its
+    post by bisecting starts, then the scan jumps to the next post's start so
+    each post is reported once
+
+    the separator is the one between fields (text_fold.FIELD_SEPARATOR), a
+    query containing it never gets here, so a match never spans two fields or
+    two posts
+
+    a buffer is patched, not rebuilt, as posts change: add appends a post's
+    text (joined into the buffer on the next find), remove marks its row
+    dead so find skips it, once dead rows hold more than COMPACT_RATIO of the
+    characters the live ones are copied into a fresh buffer
+
+    codes stay ascending while posts are added in code order (new posts), a
+    post re-added out of order only costs a sort of the hits until the next
+    compaction puts the rows back in order
+
+"""
+
+#share of dead characters that triggers a compaction
+COMPACT_RATIO = 0.5
+
+class ScanBuffer:
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self, entries, separator):
+
+        self.separator = separator
+        self.fill(entries)
+
+
+
+################
+##   helpers  ##
+################
+
+
+
+    ####start over from entries: (code, folded text), ascending code
+
+    def fill(self, entries):
+
+        self.starts = array("q")    #offset of each row's text
+        self.codes = array("q")     #code of each row
+        self.rows = {}              #code -> row of its live text
+        self.dead = set()           #rows whose post changed or left
+        self.dead_size = 0          #characters held by dead rows
+        self.pending = []           #texts added since the last join
+        self.length = 0             #characters in buffer + pending
+        self.ordered = True         #codes ascending
+        self.buffer = ""
+
+        for code, text in entries: self.append(code, text)
+        self.join()
+
+
+
+    ####new row at the end for code
+
+    def append(self, code, text):
+
+        if self.codes and code < self.codes[-1]: self.ordered = False
+
+        self.rows[code] = len(self.codes)
+        self.starts.append(self.length)
+        self.codes.append(code)
+        self.pending += [text, self.separator]
+        self.length += len(text) + len(self.separator)
+
+
+
+    ####texts added since the last find into the buffer
+
+    def join(self):
+
+        if not self.pending: return
+
+        self.buffer = "".join([self.buffer] + self.pending)
+        self.pending = []
+
+
+
+    ####offset where row ends, separator included
+
+    def row_end(self, row):
+
+        return self.starts[row + 1] if row + 1 < len(self.starts) else self.length
+
+
+
+    ####copy the live rows into a fresh buffer once dead ones take too much
+
+    def maybe_compact(self):
+
+        if self.dead_size <= self.length * COMPACT_RATIO: return
+
+        self.join()
+        separator = len(self.separator)
+        live = [(code, self.buffer[self.starts[row]:self.row_end(row) - separator]) for code, row in sorted(self.rows.items())]
+
+        self.fill(live)
+
+
+
+###############
+##  methods  ##
+###############
+
+
+
+    ####code entered the store or changed, its old text (if any) is dropped
+
+    def add(self, code, text):
+
+        self.remove(code)
+        self.append(code, text)
+
+
+
+    ####code left the store or is about to change
+
+    def remove(self, code):
+
+        row = self.rows.pop(code, None)
+        if row is None: return
+
+        self.dead.add(row)
+        self.dead_size += self.row_end(row) - self.starts[row]
+        self.maybe_compact()
+
+
+
+    ####codes of posts whose text contains query, ascending
+
+    def find(self, query):
+
+        self.join()
+        buffer, starts, codes, dead = self.buffer, self.starts, self.codes, self.dead
+        found = []
+        position = buffer.find(query)
+
+        while position != -1:
+
+            index = bisect.bisect_right(starts, position) - 1
+            if index not in dead: found.append(codes[index])
+
+            #rest of this post can only repeat the hit
+            if index + 1 == len(starts): break
+            position = buffer.find(query, starts[index + 1])
+
+        if not self.ordered: found.sort()
+
+        return found
+
+
+
+    ####approximate bytes held, for the store cache
+
+    def size(self):
+
+        return self.length + self.starts.itemsize * len(self.starts) * 2 + 16 * len(self.rows)
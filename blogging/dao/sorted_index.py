@@ -0,0 +1,197 @@
+import bisect
+
+
+"""
+
+    SortedIndex
+
+    a set of keys kept in ascending order, for listings and range queries
+    that must not sort on every call (post codes, blog ids, timestamps)
+
+    keys live in chunks of at most 2 * LOAD sorted keys, plus the largest key
+    of each chunk (self.maxes):
+
+        find the chunk:     bisect on maxes, O(log N)
+        insert / delete:    bisect + shift inside one chunk, O(LOAD)
+        range query:        bisect to the first key, then walk the chunks
+
+    a full chunk splits in two, an empty one is dropped, so no operation
+    ever moves more than one chunk's worth of keys
+
+    keys only need to be comparable to each other, tuples work, e.g.
+    (timestamp, code) to keep posts with the same timestamp apart
+
+"""
+
+#target chunk size, chunks split past twice this
+LOAD = 256
+
+
+class SortedIndex:
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self, keys=()):
+
+        self.chunks = []    #sorted chunks of keys
+        self.maxes = []     #largest key of each chunk
+        self.size = 0
+
+        keys = sorted(set(keys))
+        for start in range(0, len(keys), LOAD):
+            self.chunks.append(keys[start:start + LOAD])
+            self.maxes.append(self.chunks[-1][-1])
+
+        self.size = len(keys)
+
+
+
+###############
+##  methods  ##
+###############
+
+
+
+    ####add key, true if it was not there yet
+
+    def add(self, key):
+
+        #empty => first chunk
+        if not self.chunks:
+            self.chunks.append([key])
+            self.maxes.append(key)
+            self.size = 1
+            return True
+
+        #chunk whose range covers key, or the last one if key is the largest
+        position = min(bisect.bisect_left(self.maxes, key), len(self.chunks) - 1)
+        chunk = self.chunks[position]
+
+        index = bisect.bisect_left(chunk, key)
+        if index < len(chunk) and chunk[index] == key: return False
+
+        chunk.insert(index, key)
+        self.maxes[position] = chunk[-1]
+        self.size += 1
+
+        #too big => split in two
+        if len(chunk) > 2 * LOAD:
+            self.chunks.insert(position + 1, chunk[LOAD:])
+            del chunk[LOAD:]
+            self.maxes.insert(position, chunk[-1])
+
+        return True
+
+
+
+    ####remove key, true if it was there
+
+    def discard(self, key):
+
+        position = bisect.bisect_left(self.maxes, key)
+        if position == len(self.chunks): return False
+
+        chunk = self.chunks[position]
+        index = bisect.bisect_left(chunk, key)
+        if index == len(chunk) or chunk[index] != key: return False
+
+        del chunk[index]
+        self.size -= 1
+
+        #empty => drop the chunk
+        if not chunk:
+            del self.chunks[position]
+            del self.maxes[position]
+
+        else:
+            self.maxes[position] = chunk[-1]
+
+        return True
+
+
+
+    ####smallest / largest key, none if empty
+
+    def first(self):
+
+        return self.chunks[0][0] if self.chunks else None
+
+
+    def last(self):
+
+        return self.maxes[-1] if self.maxes else None
+
+
+
+    ####keys from low to high, either bound may be none (open)
+    ####inclusive says whether low and high themselves are included
+
+    def irange(self, low=None, high=None, inclusive=(True, True), reverse=False):
+
+        if not self.chunks: return
+
+        low_inclusive, high_inclusive = inclusive
+
+        #(chunk, index) of the first key in range
+        if low is None:
+            start = (0, 0)
+        else:
+            find = bisect.bisect_left if low_inclusive else bisect.bisect_right
+            position = find(self.maxes, low)
+            if position == len(self.chunks): return
+            start = (position, find(self.chunks[position], low))
+
+        #(chunk, index) just past the last key in range
+        if high is None:
+            end = (len(self.chunks) - 1, len(self.chunks[-1]))
+        else:
+            find = bisect.bisect_right if high_inclusive else bisect.bisect_left
+            position = min(find(self.maxes, high), len(self.chunks) - 1)
+            end = (position, find(self.chunks[position], high))
+
+        if start >= end: return
+
+        positions = range(start[0], end[0] + 1)
+        if reverse: positions = reversed(positions)
+
+        for position in positions:
+
+            chunk = self.chunks[position]
+            first = start[1] if position == start[0] else 0
+            stop = end[1] if position == end[0] else len(chunk)
+
+            if reverse:
+                for index in range(stop - 1, first - 1, -1): yield chunk[index]
+            else:
+                for index in range(first, stop): yield chunk[index]
+
+
+
+    def __iter__(self):
+
+        for chunk in self.chunks: yield from chunk
+
+
+    def __reversed__(self):
+
+        for chunk in reversed(self.chunks): yield from reversed(chunk)
+
+
+    def __len__(self):
+
+        return self.size
+
+
+    def __contains__(self, key):
+
+        position = bisect.bisect_left(self.maxes, key)
+        if position == len(self.chunks): return False
+
+        chunk = self.chunks[position]
+        index = bisect.bisect_left(chunk, key)
+
+        return index < len(chunk) and chunk[index] == key
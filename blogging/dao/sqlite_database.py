@@ -0,0 +1,96 @@
+import sqlite3
+import threading
+
+from .text_fold import fold                         #search folding
+
+
+"""
+
+    sqlite_database
+
+    shared connections for the sqlite daos, one per database file
+    so blogs and posts live in the same database
+
+    a connection is used by several threads (cross-blog search), a
+    transaction belongs to the connection, not the thread, so every write
+    runs under the file's lock (get_lock), one thread's commit never ends
+    another's transaction half way
+
+"""
+
+connections = {}
+prepared = {}       #database file -> ids of schemas already created on it
+locks = {}          #database file -> lock its writers hold
+
+
+
+####open (or reuse) a connection and make sure the schema exists
+####schema items are sql statements, or functions taking the connection
+
+def get_connection(database_file, schema):
+
+    #in-memory databases are private to the dao that opened them
+    if database_file == ":memory:":
+        connection = open_connection(database_file)
+        create_schema(connection, schema)
+        return connection
+
+    if database_file not in connections:
+        connections[database_file] = open_connection(database_file)
+        prepared[database_file] = set()
+
+    connection = connections[database_file]
+
+    #once per schema per file
+    if id(schema) not in prepared[database_file]:
+        create_schema(connection, schema)
+        prepared[database_file].add(id(schema))
+
+    return connection
+
+
+
+####lock for the writers of a database file, in-memory databases get their own
+
+def get_lock(database_file):
+
+    if database_file == ":memory:": return threading.RLock()
+
+    return locks.setdefault(database_file, threading.RLock())
+
+
+
+####run schema statements in one transaction
+
+def create_schema(connection, schema):
+
+    with connection:
+        for statement in schema:
+            if callable(statement): statement(connection)
+            else: connection.execute(statement)
+
+
+
+####new connection with the helpers every dao relies on
+
+def open_connection(database_file):
+
+    connection = sqlite3.connect(database_file, check_same_thread=False)
+
+    #searches fold like the file daos, sqlite lower() only folds ascii
+    connection.create_function("py_fold", 1, fold, deterministic=True)
+
+    #delete triggers also fire for rows an INSERT OR REPLACE overwrites
+    connection.execute("PRAGMA recursive_triggers = ON")
+
+    return connection
+
+
+
+####close and forget a shared connection
+
+def close_connection(database_file):
+
+    connection = connections.pop(database_file, None)
+    prepared.pop(database_file, None)
+    if connection is not None: connection.close()
@@ -0,0 +1,187 @@
+from array import array
+from itertools import accumulate
+
+from .record_file import column_bytes, read_column  #little endian columns
+
+
+"""
+
+    StringColumn
+
+    one string field of many rows (e.g. every post title) packed into a single
+    utf-8 blob, row i is blob[offsets[i]:offsets[i] + lengths[i]], a length of
+    -1 means none
+
+    no python string is held per row, a value is decoded when a row is read
+
+    changing or deleting a row leaves its old bytes behind as garbage (new
+    values are appended), once garbage passes half the blob the live bytes are
+    copied into a fresh one, to_bytes() writes the live bytes only, in row
+    order, so a saved column is always compact, lengths little endian
+
+"""
+
+#length of a none value
+NONE = -1
+
+#compact once garbage is more than this share of the blob, and at least COMPACT_MIN bytes
+COMPACT_RATIO = 0.5
+COMPACT_MIN = 64 * 1024
+
+
+class StringColumn:
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self):
+
+        self.blob = bytearray()         #utf-8 bytes of every value, plus garbage
+        self.offsets = array("q")       #start of each row in blob
+        self.lengths = array("q")       #byte length of each row, NONE => none
+        self.garbage = 0                #bytes in blob no row points to
+        self.in_order = True            #rows lie back to back in blob, row order
+
+
+
+###############
+##  methods  ##
+###############
+
+
+
+    ####value of row, none or str
+
+    def get(self, row):
+
+        length = self.lengths[row]
+        if length == NONE: return None
+
+        offset = self.offsets[row]
+        return self.blob[offset:offset + length].decode("utf-8")
+
+
+
+    ####new row at position row
+
+    def insert(self, row, value):
+
+        offset, length = self.append_value(value)
+        if row != len(self.offsets): self.in_order = False
+
+        self.offsets.insert(row, offset)
+        self.lengths.insert(row, length)
+
+
+
+    ####replace the value of row
+
+    def set(self, row, value):
+
+        self.garbage += max(self.lengths[row], 0)
+        self.offsets[row], self.lengths[row] = self.append_value(value)
+        self.in_order = False
+        self.maybe_compact()
+
+
+
+    ####drop row
+
+    def delete(self, row):
+
+        self.garbage += max(self.lengths[row], 0)
+        del self.offsets[row]
+        del self.lengths[row]
+        self.in_order = False
+        self.maybe_compact()
+
+
+
+    ####bytes held, garbage included
+
+    def size(self):
+
+        return len(self.blob) + self.offsets.itemsize * len(self.offsets) * 2
+
+
+
+    ####drop the garbage once it is most of the blob
+
+    def maybe_compact(self):
+
+        if self.garbage < COMPACT_MIN or self.garbage <= len(self.blob) * COMPACT_RATIO: return
+
+        lengths, blob = self.to_bytes()
+        compacted = self.from_bytes(lengths, blob)
+
+        self.blob, self.offsets = compacted.blob, compacted.offsets
+        self.garbage = 0
+        self.in_order = True
+
+
+
+    ####(lengths, blob) with only the live bytes, rows back to back
+
+    def to_bytes(self):
+
+        #appended in row order and never changed => blob is already compact
+        if self.in_order and self.garbage == 0:
+            return column_bytes(self.lengths), bytes(self.blob)
+
+        view = memoryview(self.blob)
+        blob = b"".join(
+            view[offset:offset + length]
+            for offset, length in zip(self.offsets, self.lengths) if length > 0
+        )
+
+        return column_bytes(self.lengths), blob
+
+
+
+    ####column from what to_bytes wrote, raises ValueError if lengths is cut
+
+    @classmethod
+    def from_bytes(cls, lengths, blob):
+
+        itemsize = array("q").itemsize
+        if len(lengths) % itemsize: raise ValueError("truncated lengths")
+
+        lengths, _ = read_column("q", lengths, 0, len(lengths) // itemsize)
+
+        return cls.from_lengths(lengths, blob)
+
+
+
+    ####column over blob from its row lengths (array "q"), raises ValueError if they do not fit blob
+
+    @classmethod
+    def from_lengths(cls, lengths, blob):
+
+        column = cls()
+        column.lengths = lengths
+        column.blob = bytearray(blob)
+
+        #rows are back to back, each offset is the sum of the lengths before it
+        sizes = (length if length > 0 else 0 for length in column.lengths)
+        column.offsets = array("q", accumulate(sizes, initial=0))
+        if column.offsets.pop() != len(column.blob) or min(lengths, default=0) < NONE:
+            raise ValueError("lengths do not fit the blob")
+
+        return column
+
+
+
+    ####utf-8 value appended to blob => (offset, length)
+
+    def append_value(self, value):
+
+        if value is None: return 0, NONE
+
+        data = value.encode("utf-8")
+        offset = len(self.blob)
+        self.blob += data
+
+        return offset, len(data)
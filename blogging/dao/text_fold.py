@@ -0,0 +1,36 @@
+import unicodedata
+
+
+"""
+
+    text folding for searches
+
+    fold() is what every search compares: unicode compatibility normalized
+    (NFKC) and casefolded, so "ＢＬＯＧ", "Blog" and "blog" all match "blog"
+    and "straße" matches "STRASSE"
+
+    a post's searchable fields are folded into one string, joined by
+    FIELD_SEPARATOR, a separator inside a field is folded to a space and a
+    query holding one matches nothing, so a match never spans two fields and
+    splitting the string gives back exactly three fields
+
+"""
+
+FIELD_SEPARATOR = "\x00"
+
+
+####normalized, casefolded text, "" for none
+
+def fold(text):
+
+    if not text: return ""
+    return unicodedata.normalize("NFKC", unicodedata.normalize("NFKC", text).casefold())
+
+
+
+####title, text and author of post folded into one string
+
+def fold_fields(post):
+
+    fields = (fold(post.title), fold(post.text), fold(post.author))
+    return FIELD_SEPARATOR.join(field.replace(FIELD_SEPARATOR, " ") for field in fields)
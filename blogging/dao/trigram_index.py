@@ -0,0 +1,135 @@
+"""
+
+    TrigramIndex
+
+    maps every 3-character substring (trigram) of some texts to the keys whose
+    texts contain it, e.g. "hello" => "hel", "ell", "llo"
+
+    any string of 3+ characters that occurs in a text also has all of its trigrams
+    in that text, so intersecting the postings of the query's trigrams gives a
+    small candidate set that always includes every real match, callers verify
+    each candidate with a plain substring check to keep exact semantics
+
+    texts are indexed as given, callers fold case before adding, removing or querying
+    queries shorter than 3 characters cannot be narrowed, candidates() returns none
+
+    an index loaded from disk starts with its postings still mapped, each gram
+    is decoded into self.postings the first time it is touched
+
+"""
+
+GRAM = 3
+
+
+####set of trigrams in text
+
+def trigrams(text):
+
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class TrigramIndex:
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self, mapped=None):
+
+        self.postings = {}      #trigram -> set of keys
+        self.mapped = mapped    #postings not decoded yet (MappedPostings), none => all in memory
+
+
+
+###############
+##  methods  ##
+###############
+
+
+
+    ####index texts under key
+
+    def add(self, key, texts):
+
+        for gram in self.grams_of(texts):
+
+            keys = self.keys_of(gram)
+            if keys is None:
+                keys = set()
+                self.postings[gram] = keys
+
+            keys.add(key)
+
+
+
+    ####remove key, texts must be the ones it was added with
+
+    def remove(self, key, texts):
+
+        for gram in self.grams_of(texts):
+
+            keys = self.keys_of(gram)
+            if keys is None: continue
+
+            keys.discard(key)
+            if not keys: del self.postings[gram]
+
+
+
+    ####keys that may contain query, none if the query is too short to narrow
+
+    def candidates(self, query):
+
+        grams = trigrams(query)
+        if not grams: return None
+
+        #smallest postings first, the intersection only shrinks
+        postings = sorted((self.keys_of(gram) or () for gram in grams), key=len)
+
+        result = set(postings[0])
+        for keys in postings[1:]:
+            if not result: break
+            result &= keys
+
+        return result
+
+
+
+    ####keys under gram, decoded from the mapped file on first touch
+
+    def keys_of(self, gram):
+
+        keys = self.postings.get(gram)
+
+        if keys is None and self.mapped is not None:
+            keys = self.mapped.pop(gram)
+            if keys is not None: self.postings[gram] = keys
+
+        return keys
+
+
+
+    ####every posting in memory, for saving
+
+    def all_postings(self):
+
+        if self.mapped is not None:
+            for gram in self.mapped.keys(): self.keys_of(gram)
+            self.mapped.close()
+            self.mapped = None
+
+        return self.postings
+
+
+
+    ####union of trigrams over texts, a gram spanning two fields never matches
+
+    def grams_of(self, texts):
+
+        grams = set()
+        for text in texts:
+            if text: grams |= trigrams(text)
+
+        return grams
@@ -0,0 +1,184 @@
+import heapq
+import math
+import re
+
+
+"""
+
+    WordIndex
+
+    inverted index from words to the posts that contain them, with term
+    frequencies kept per field (title, text, author), used for bm25 ranking
+
+    a post's score for a query is the sum over query words of
+
+        idf(word) * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average length))
+
+    where tf is the field-weighted count of the word in the post (a hit in the
+    title counts more than one in the text) and length is the field-weighted
+    word count of the post
+
+    only posts that contain at least one query word are scored, and the top
+    results are picked with a heap instead of sorting every score
+
+    an index loaded from disk starts with its postings still mapped, each word
+    is decoded into self.postings the first time it is touched
+
+"""
+
+#bm25 tuning
+K1 = 1.2
+B = 0.75
+
+#weight of a hit in title, text, author
+FIELD_WEIGHTS = (2.0, 1.0, 1.5)
+
+WORD = re.compile(r"\w+")
+
+
+####lowercased words in text
+
+def tokenize(text):
+
+    return WORD.findall(text.lower()) if text else []
+
+
+class WordIndex:
+
+
+
+############
+##  init  ##
+############
+
+    def __init__(self, mapped=None, lengths=None):
+
+        self.postings = {}              #word -> {key: (tf title, tf text, tf author)}
+        self.mapped = mapped            #postings not decoded yet (MappedPostings), none => all in memory
+        self.lengths = lengths or {}    #key -> weighted word count
+        self.total_length = sum(self.lengths.values())  #sum of lengths, for the average
+
+
+
+###############
+##  methods  ##
+###############
+
+
+
+    ####index fields (title, text, author) under key
+
+    def add(self, key, fields):
+
+        counts = self.count_words(fields)
+
+        for word, tfs in counts.items():
+
+            keys = self.keys_of(word)
+            if keys is None:
+                keys = {}
+                self.postings[word] = keys
+
+            keys[key] = tfs
+
+        length = self.weighted_length(fields)
+        self.lengths[key] = length
+        self.total_length += length
+
+
+
+    ####remove key, fields must be the ones it was added with
+
+    def remove(self, key, fields):
+
+        for word in self.count_words(fields):
+
+            keys = self.keys_of(word)
+            if keys is None: continue
+
+            keys.pop(key, None)
+            if not keys: del self.postings[word]
+
+        self.total_length -= self.lengths.pop(key, 0.0)
+
+
+
+    ####top limit (key, score) pairs for query, best first
+
+    def search(self, query, limit):
+
+        words = set(tokenize(query))
+        if not words or not self.lengths: return []
+
+        count = len(self.lengths)
+        average = self.total_length / count or 1.0
+        scores = {}
+
+        for word in words:
+
+            keys = self.keys_of(word)
+            if not keys: continue
+
+            idf = math.log(1 + (count - len(keys) + 0.5) / (len(keys) + 0.5))
+
+            for key, tfs in keys.items():
+                tf = sum(weight * n for weight, n in zip(FIELD_WEIGHTS, tfs))
+                norm = K1 * (1 - B + B * self.lengths[key] / average)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+
+    ####keys under word, decoded from the mapped file on first touch
+
+    def keys_of(self, word):
+
+        keys = self.postings.get(word)
+
+        if keys is None and self.mapped is not None:
+            keys = self.mapped.pop(word)
+            if keys is not None: self.postings[word] = keys
+
+        return keys
+
+
+
+    ####every posting in memory, for saving
+
+    def all_postings(self):
+
+        if self.mapped is not None:
+            for word in self.mapped.keys(): self.keys_of(word)
+            self.mapped.close()
+            self.mapped = None
+
+        return self.postings
+
+
+
+    ####word -> per-field counts for one post
+
+    def count_words(self, fields):
+
+        counts = {}
+
+        for position, field in enumerate(fields):
+            for word in tokenize(field):
+
+                tfs = counts.get(word)
+                if tfs is None:
+                    tfs = [0] * len(fields)
+                    counts[word] = tfs
+
+                tfs[position] += 1
+
+        return {word: tuple(tfs) for word, tfs in counts.items()}
+
+
+
+    ####field-weighted number of words
+
+    def weighted_length(self, fields):
+
+        return sum(weight * len(tokenize(field)) for weight, field in zip(FIELD_WEIGHTS, fields))
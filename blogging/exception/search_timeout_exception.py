@@ -0,0 +1,2 @@
+class SearchTimeoutException(Exception):
+	''' Search Timeout '''
\ No newline at end of file
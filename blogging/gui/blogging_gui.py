@@ -103,6 +103,10 @@ class BloggingGUI(QMainWindow):
         """search posts by keyword in selected blog"""
         h.handle_search_post_clicked(self)
 
+    def handle_stop_post_search_clicked(self):
+        """stop a post search still running"""
+        h.handle_stop_post_search_clicked(self)
+
     def handle_clear_post_search_clicked(self):
         """clear post search and show all posts again"""
         h.handle_clear_post_search_clicked(self)
@@ -282,11 +286,15 @@ class BloggingGUI(QMainWindow):
 
         self.post_search_edit = QLineEdit()
         self.post_search_edit.setPlaceholderText("Search posts by keyword (title/text/author).")
+        self.post_regex_check = QCheckBox("Regex")
         self.button_search_post = QPushButton("Search")
+        self.button_stop_post_search = QPushButton("Stop")
         self.button_clear_post_search = QPushButton("Clear")
 
         post_search_row.addWidget(self.post_search_edit)
+        post_search_row.addWidget(self.post_regex_check)
         post_search_row.addWidget(self.button_search_post)
+        post_search_row.addWidget(self.button_stop_post_search)
         post_search_row.addWidget(self.button_clear_post_search)
         posts_column.addLayout(post_search_row)
 
@@ -331,6 +339,7 @@ class BloggingGUI(QMainWindow):
         self.button_delete_post.clicked.connect(self.handle_delete_post_clicked)
         self.button_list_posts.clicked.connect(self.handle_list_posts_clicked)
         self.button_search_post.clicked.connect(self.handle_search_post_clicked)
+        self.button_stop_post_search.clicked.connect(self.handle_stop_post_search_clicked)
         self.button_clear_post_search.clicked.connect(self.handle_clear_post_search_clicked)
 
 def main():
@@ -345,5 +354,11 @@ def main():
     window.show()
     app.exec()
 
+    #a search still running ends before the stores are flushed
+    h.finish_post_search(window)
+
+    #write anything still pending before the process exits
+    window.controller.flush()
+
 if __name__ == '__main__':
     main()
@@ -1,5 +1,66 @@
-from PyQt6.QtWidgets import QMessageBox, QDialog, QInputDialog
+import threading
+from contextlib import contextmanager
+from itertools import islice
+
+from PyQt6.QtCore import QThread
+from PyQt6.QtWidgets import QApplication, QMessageBox, QDialog, QInputDialog
 from blogging.gui.blog_dialogue import BlogEditDialog
+from blogging.gui.post_search_worker import PostSearchWorker
+
+
+
+# results are shown a page at a time while the search is still running
+RESULTS_PER_PAINT = 50
+
+# blogs fetched per page when the table is refreshed
+BLOGS_PER_PAGE = 100
+
+# widgets that start another handler or change the current blog, locked while results stream
+STREAM_LOCKED_WIDGETS = (
+    "login_button", "logout_button", "blogs_table",
+    "button_new_blog", "button_edit_blog", "button_delete_blog",
+    "button_search_blog", "button_clear_blog_search",
+    "button_new_post", "button_edit_post", "button_delete_post", "button_list_posts",
+    "button_search_post", "button_clear_post_search", "post_regex_check",
+)
+
+
+
+def lock_widgets(gui):
+    """
+        #disable every widget that could start another handler or change the
+        #current blog, the stop button stays usable, returns the function that
+        #puts them back as they were
+
+    """
+
+    widgets = [getattr(gui, name) for name in STREAM_LOCKED_WIDGETS if hasattr(gui, name)]
+    enabled = [widget.isEnabled() for widget in widgets]
+
+    for widget in widgets: widget.setEnabled(False)
+
+    def unlock():
+        for widget, was_enabled in zip(widgets, enabled): widget.setEnabled(was_enabled)
+
+    return unlock
+
+
+
+@contextmanager
+def streaming(gui):
+    """
+        #results are painted with processEvents, which also delivers clicks,
+        #so the widgets stay locked until the stream ends
+
+    """
+
+    unlock = lock_widgets(gui)
+
+    try:
+        yield
+
+    finally:
+        unlock()
 
 
 
@@ -193,16 +254,23 @@ def handle_search_blog_clicked(gui):
         QMessageBox.warning(gui, "SEARCH BLOG", "Please enter a search term.")
         return
     
-    # search blogs via controller
+    # search blogs via controller, rows are added a page at a time
+    gui.blogs_model.set_blogs([])
+    found = 0
     try:
-        blogs = gui.controller.retrieve_blogs(term)
+        blogs = gui.controller.iter_matching_blogs(term)
+        with streaming(gui):
+            while True:
+                page = list(islice(blogs, RESULTS_PER_PAINT))
+                if not page: break
+                gui.blogs_model.append_blogs(page)
+                found += len(page)
+                QApplication.processEvents()
     except Exception as ex:
         QMessageBox.warning(gui, "SEARCH BLOG", f"Error searching blogs:\n{ex}")
         return
 
-    # update table with search results
-    gui.blogs_model.set_blogs(blogs)
-    gui.statusBar().showMessage(f"{len(blogs)} blogs found for '{term}'")
+    gui.statusBar().showMessage(f"{found} blogs found for '{term}'")
     gui.posts_text.clear()
     # clear selected blog id
     if hasattr(gui, "selected_blog_id"):
@@ -242,7 +310,7 @@ def refresh_posts(gui):
     # fetch posts from controller
     try:
         gui.controller.set_current_blog(blog_id)    # temp make it controllers current blog
-        posts = gui.controller.list_posts()
+        posts = gui.controller.iter_posts()         # bound to the blog, survives the unset below
 
     except Exception:
         return
@@ -255,34 +323,95 @@ def refresh_posts(gui):
             pass
 
     # if no posts, show a hint for user
-    if not posts:
+    if not show_posts(gui, posts):
         gui.posts_text.setPlainText("No posts for this blog.")
-        return
+
+
+
+def post_lines(post):
+    """
+        #text lines shown for one post
+
+    """
 
     lines = []
 
-    for post in posts:
-        # display post header
-        header = f"#{post.code} - {post.title}"
+    # display post header
+    header = f"#{post.code} - {post.title}"
+
+    if getattr(post, "author", None): 
+        header += f" (by {post.author})"
+
+    lines.append(header)
+
+    # display creation time if available
+    created = getattr(post, "created_at", None) or getattr(post, "creation_time", None)
+    if created: lines.append(f"Created: {created}")
+
+    # display post text,
+    # separated by lines
+    lines.append("-" * 45)
+    lines.append(post.text)
+    # blank line between posts
+    lines.append("-" * 20)
+    lines.append("")  
+
+    return lines
+
+
+
+def list_post_lines(post):
+    """
+        #text lines shown for one post by the list posts button
+
+    """
+
+    lines = []
+
+    header = f"#{post.code} — {post.title}"
+    if getattr(post, "author", None):
+        header += f" (by {post.author})"
+
+    lines.append(header)
+
+    created = getattr(post, "created_at", None) or getattr(post, "creation_time", None)
+    if created:
+        lines.append(f"Created: {created}")
 
-        if getattr(post, "author", None): 
-            header += f" (by {post.author})"
+    lines.append("-" * 40)
+    lines.append(post.text)
+    lines.append("")  # 
 
-        lines.append(header)
+    return lines
 
-        # display creation time if available
-        created = getattr(post, "created_at", None) or getattr(post, "creation_time", None)
-        if created: lines.append(f"Created: {created}")
 
-        # display post text,
-        # separated by lines
-        lines.append("-" * 45)
-        lines.append(post.text)
-        # blank line between posts
-        lines.append("-" * 20)
-        lines.append("")  
 
-    gui.posts_text.setPlainText("\n".join(lines))
+def show_posts(gui, posts, lines_of=post_lines):
+    """
+        #append posts to the text box a page at a time as they arrive,
+        #the first page shows before the search is done, returns how many
+
+    """
+
+    shown = 0
+
+    with streaming(gui):
+
+        while True:
+
+            page = list(islice(posts, RESULTS_PER_PAINT))
+            if not page: break
+
+            lines = []
+            for post in page: lines.extend(lines_of(post))
+
+            gui.posts_text.appendPlainText("\n".join(lines))
+            shown += len(page)
+
+            # let qt paint this page before fetching the next
+            QApplication.processEvents()
+
+    return shown
 
 
 
@@ -292,19 +421,29 @@ def refresh_blogs(gui):
 
     """
 
+    gui.blogs_model.set_blogs([])
+    loaded = 0
+    last_id = None
+
+    # pages come in creation order, each one starts after the last blog shown
     try:
-        blogs = gui.controller.list_blogs()
+        with streaming(gui):
+            while True:
+                blogs = gui.controller.list_blogs(after_id=last_id, limit=BLOGS_PER_PAGE)
+                if not blogs: break
+
+                # update table
+                gui.blogs_model.append_blogs(blogs)
+                loaded += len(blogs)
+                last_id = blogs[-1].id
+                QApplication.processEvents()
+
     except Exception:
         gui.blogs_model.set_blogs([])
         gui.statusBar().showMessage("unable to load blogs (are you logged in?)")
         return
-    
-    # sort by id
-    blogs = sorted(blogs, key=lambda b: b.id)
 
-    # update table
-    gui.blogs_model.set_blogs(blogs)
-    gui.statusBar().showMessage(f"{len(blogs)} blogs loaded")
+    gui.statusBar().showMessage(f"{loaded} blogs loaded")
     gui.posts_text.clear()
 
 
@@ -628,7 +767,7 @@ def handle_list_posts_clicked(gui):
 
     #   fetch posts
     try:
-        posts = gui.controller.list_posts()
+        posts = gui.controller.iter_posts()
     except Exception as ex:
         QMessageBox.warning(gui, "LIST POSTS", f"Error retrieving posts:\n{ex}")
         return
@@ -637,33 +776,13 @@ def handle_list_posts_clicked(gui):
     gui.posts_text.clear()
 
     # if no posts, show a hint for user
-    if not posts:
+    if not show_posts(gui, posts, list_post_lines):
         gui.posts_text.setPlainText("No posts for this blog.")
-        return
-
-    # display posts
-    lines = []
-    for post in posts:
-        header = f"#{post.code} — {post.title}"
-        if getattr(post, "author", None):
-            header += f" (by {post.author})"
-
-        lines.append(header)
-
-        created = getattr(post, "created_at", None) or getattr(post, "creation_time", None)
-        if created:
-            lines.append(f"Created: {created}")
-
-        lines.append("-" * 40)
-        lines.append(post.text)
-        lines.append("")  # 
-
-    gui.posts_text.setPlainText("\n".join(lines))
 
 def handle_search_post_clicked(gui):
     """
-    Search posts by keyword within the currently selected blog,
-    and display matches in the QPlainTextEdit.
+    Search posts by keyword (or regex, if checked) within the currently
+    selected blog, and display matches in the QPlainTextEdit.
     """
 
     # must be logged in
@@ -685,10 +804,16 @@ def handle_search_post_clicked(gui):
         gui.statusBar().showMessage("Showing all posts (no search term).")
         return
 
+    # stop button sets it, the search runs off the ui thread so the click always gets through
+    cancel = threading.Event()
+    gui.post_search_cancel = cancel
+    regex = gui.post_regex_check.isChecked()
+
     try:
-        # temporarily set current blog for controller.retrieve_posts
+        # temporarily set current blog for controller.iter_matching_posts
         gui.controller.set_current_blog(blog_id)
-        posts = gui.controller.retrieve_posts(term)
+        # newest-first by code (matches your list_posts display style)
+        posts = gui.controller.iter_matching_posts(term, descending=True, regex=regex, cancel=cancel)
     except Exception as ex:
         QMessageBox.warning(gui, "SEARCH POSTS", f"Error searching posts:\n{ex}")
         return
@@ -700,33 +825,92 @@ def handle_search_post_clicked(gui):
             pass
 
     gui.posts_text.clear()
+    gui.statusBar().showMessage(f"Searching for '{term}'...")
+    run_post_search(gui, term, posts, cancel)
+
+
 
-    if not posts:
+def run_post_search(gui, term, posts, cancel):
+    """
+        #consume the search on a worker thread, pages are painted as they
+        #arrive, widgets stay locked until it ends
+
+    """
+
+    thread = QThread(gui)
+    worker = PostSearchWorker(posts, cancel, RESULTS_PER_PAINT)
+    worker.moveToThread(thread)
+    unlock = lock_widgets(gui)
+    shown = [0]
+
+    def show_page(page):
+        lines = []
+        for post in page: lines.extend(post_lines(post))
+        gui.posts_text.appendPlainText("\n".join(lines))
+        shown[0] += len(page)
+
+    def search_finished(outcome):
+        thread.quit()
+        unlock()
+        gui.post_search_thread = None
+        show_search_outcome(gui, term, outcome, shown[0])
+
+    # queued onto the ui thread, the worker never touches widgets
+    worker.found.connect(show_page)
+    worker.finished.connect(search_finished)
+    thread.started.connect(worker.run)
+    thread.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+
+    # keep both alive while the search runs
+    gui.post_search_thread = thread
+    gui.post_search_worker = worker
+    thread.start()
+
+
+
+def show_search_outcome(gui, term, outcome, found):
+    """
+        #status (or warning) for a post search that ended
+
+    """
+
+    # a slow pattern ends at the time budget, posts shown so far stay
+    if outcome == "timeout":
+        QMessageBox.warning(gui, "SEARCH POSTS", "Search took too long and was stopped.\nResults may be incomplete.")
+        gui.statusBar().showMessage(f"Search for '{term}' timed out.")
+        return
+
+    if outcome == "stopped":
+        gui.statusBar().showMessage(f"Search for '{term}' stopped.")
+        return
+
+    if outcome != "done":
+        QMessageBox.warning(gui, "SEARCH POSTS", f"Error searching posts:\n{outcome}")
+        return
+
+    if not found:
         gui.posts_text.setPlainText(f"No posts found for '{term}'.")
         gui.statusBar().showMessage(f"0 posts found for '{term}'")
         return
 
-    # Sort newest-first by code (matches your list_posts display style)
-    posts = sorted(posts, key=lambda p: p.code, reverse=True)
+    gui.statusBar().showMessage(f"{found} posts found for '{term}'")
 
-    lines = []
-    for post in posts:
-        header = f"#{post.code} - {post.title}"
-        if getattr(post, "author", None):
-            header += f" (by {post.author})"
-        lines.append(header)
-
-        created = getattr(post, "created_at", None) or getattr(post, "creation_time", None)
-        if created:
-            lines.append(f"Created: {created}")
-
-        lines.append("-" * 45)
-        lines.append(post.text)
-        lines.append("-" * 20)
-        lines.append("")
-
-    gui.posts_text.setPlainText("\n".join(lines))
-    gui.statusBar().showMessage(f"{len(posts)} posts found for '{term}'")
+
+def handle_stop_post_search_clicked(gui):
+    """Stop the post search still running, if any."""
+    cancel = getattr(gui, "post_search_cancel", None)
+    if cancel is not None:
+        cancel.set()
+
+
+def finish_post_search(gui):
+    """Stop the post search still running, if any, and wait for its thread."""
+    handle_stop_post_search_clicked(gui)
+    thread = getattr(gui, "post_search_thread", None)
+    if thread is not None:
+        thread.quit()
+        thread.wait()
 
 
 def handle_clear_post_search_clicked(gui):
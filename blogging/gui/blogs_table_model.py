@@ -65,6 +65,18 @@ class BlogsTableModel(QAbstractTableModel):
         self.endResetModel()
 
 
+    #add blog objs at the end, rows appear without resetting the view
+    def append_blogs(self, blogs):
+
+        blogs = list(blogs)
+        if not blogs: return
+
+        first = len(self._blogs)
+        self.beginInsertRows(QModelIndex(), first, first + len(blogs) - 1)
+        self._blogs.extend(blogs)
+        self.endInsertRows()
+
+
     def get_blog(self, row):
 
         if 0 <= row < len(self._blogs): return self._blogs[row]
@@ -0,0 +1,61 @@
+import time
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from blogging.exception.search_timeout_exception import SearchTimeoutException
+
+
+# longest a found post waits before its page is sent
+PAGE_INTERVAL = 0.1
+
+
+class PostSearchWorker(QObject):
+    """
+        #runs a post search on its own QThread, so a slow search (or pattern)
+        #never blocks the window, results go back to the ui thread a page at
+        #a time through found, then finished says how the search ended:
+        #"done", "stopped", "timeout" or the error message
+
+    """
+
+    found = pyqtSignal(list)
+    finished = pyqtSignal(str)
+
+
+    def __init__(self, posts, cancel, page_size):
+
+        super().__init__()
+        self.posts = posts          #generator from the controller, consumed on the worker thread
+        self.cancel = cancel        #set by the stop button
+        self.page_size = page_size
+
+
+    def run(self):
+
+        outcome = "done"
+        page = []
+        sent = time.monotonic()
+
+        try:
+            for post in self.posts:
+
+                # plain searches do not watch the event themselves
+                if self.cancel.is_set(): break
+
+                page.append(post)
+
+                # full page, or the first results have waited long enough
+                if len(page) >= self.page_size or time.monotonic() - sent >= PAGE_INTERVAL:
+                    self.found.emit(page)
+                    page = []
+                    sent = time.monotonic()
+
+        except SearchTimeoutException:
+            outcome = "timeout"
+
+        except Exception as ex:
+            outcome = str(ex) or type(ex).__name__
+
+        if page: self.found.emit(page)
+        if outcome == "done" and self.cancel.is_set(): outcome = "stopped"
+
+        self.finished.emit(outcome)
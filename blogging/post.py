@@ -1,18 +1,119 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+
+#timestamps are kept as integer microseconds since this (local, naive) epoch
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+####datetime <-> epoch microseconds, exact both ways
+def to_micros(moment):
+    return (moment - EPOCH) // MICROSECOND
+
+
+def from_micros(micros):
+    return EPOCH + timedelta(microseconds=micros)
+
 
 class Post:
+    #no per-post __dict__, timestamps are ints, datetimes are built on access
+    #text is inline (_text) or out of line (body = (source, offset, length), read on access)
+    __slots__ = ("code", "title", "_text", "body", "author", "created_us", "updated_us")
+
     def __init__(self, code, title, text, author=None):
         self.code = code
         self.title = title
         self.text = text
         self.author = author
-        self.created_at = datetime.now()
-        self.updated_at = self.created_at
+        self.created_us = to_micros(datetime.now())
+        self.updated_us = self.created_us
+
+
+    #text, read from the body source if it is out of line, nothing is kept
+    @property
+    def text(self):
+        if self.body is None: return self._text
+        source, offset, length = self.body
+        return source.read(offset, length)
+
+    @text.setter
+    def text(self, value):
+        self._text = value
+        self.body = None
+
+
+    #utf-8 text as a memoryview, a slice of the mapped body file when out of line (no copy)
+    def text_view(self):
+        if self.body is None: return memoryview((self._text or "").encode("utf-8"))
+        source, offset, length = self.body
+        return source.read_view(offset, length)
+
+
+    #true if the utf-8 bytes needle occur in the text, out of line bodies are searched in place
+    def text_contains(self, needle):
+        if self.body is None: return needle in (self._text or "").encode("utf-8")
+        source, offset, length = self.body
+        return source.find(needle, offset, length)
+
+
+    #characters of text held in memory, 0 when it is out of line
+    def inline_size(self):
+        return len(self._text) if self.body is None and self._text is not None else 0
+
+
+    #where the text is now, (inline text, body), for move_text
+    def text_source(self):
+        return self._text, self.body
+
+
+    #text now lives at body, unless it changed since source was taken, true if moved
+    def move_text(self, source, body):
+        if self._text is not source[0] or self.body is not source[1]: return False
+        self._text = None
+        self.body = body
+        return True
+
+
+    #creation / last change time as datetime
+    @property
+    def created_at(self):
+        return from_micros(self.created_us)
+
+    @created_at.setter
+    def created_at(self, moment):
+        self.created_us = to_micros(moment)
+
+    @property
+    def updated_at(self):
+        return from_micros(self.updated_us)
+
+    @updated_at.setter
+    def updated_at(self, moment):
+        self.updated_us = to_micros(moment)
 
 
     #Update the timestamp for when the post was last modified
     def update_time(self):
-        self.updated_at =datetime.now()#lil fix
+        self.updated_us = to_micros(datetime.now())#lil fix
+
+
+    #pickled as a flat tuple, smaller than a dict of attribute names
+    def __getstate__(self):
+        return (self.code, self.title, self.text, self.author, self.created_us, self.updated_us)
+
+
+    #tuple from __getstate__, or the __dict__ of a post pickled before slots
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            self.code, self.title, self.text, self.author, self.created_us, self.updated_us = state
+            return
+
+        #legacy records: datetimes in a dict, author may be missing
+        self.code = state["code"]
+        self.title = state["title"]
+        self.text = state["text"]
+        self.author = state.get("author")
+        self.created_at = state.get("created_at") or datetime.now()
+        self.updated_at = state.get("updated_at") or self.created_at
 
 
     #for tests
@@ -31,4 +132,4 @@ class Post:
 
 
     def __str__(self):
-        return f"[{self.code}] {self.title}"
\ No newline at end of file
+        return f"[{self.code}] {self.title}"
@@ -0,0 +1,48 @@
+import os
+from unittest import TestCase
+from blogging.dao.author_index import AuthorIndex
+from tests.scratch import use_scratch_folder
+
+class AuthorIndexTest(TestCase):
+
+
+    def setUp(self):
+
+        use_scratch_folder(self)
+
+        self.index = AuthorIndex(autosave=True)
+        self.index.rebuild([])
+        self.index.add(2, 1, "Ana")
+        self.index.add(1, 3, "ana")
+        self.index.add(1, 4, "Bob")
+
+
+    def test_pages_follow_blog_then_code(self):
+
+        self.assertEqual(([(1, 3)], (1, 3)), self.index.page("ANA", 1))
+        self.assertEqual(([(2, 1)], None), self.index.page("ana", 1, (1, 3)))
+        self.assertEqual(([], None), self.index.page("nobody", 5))
+        self.assertEqual(([], None), self.index.page("ana", 0))
+
+
+    def test_authors_fold_like_search(self):
+
+        self.index.add(3, 1, "Straße")
+        self.index.add(3, 2, "ＡＮＡ")
+
+        self.assertEqual(([(3, 1)], None), self.index.page("STRASSE", 5))
+        self.assertEqual(([(1, 3), (2, 1), (3, 2)], None), self.index.page("ana", 5))
+
+
+    def test_saved_index_loads_until_changed(self):
+
+        self.index.save_to_file()
+
+        reloaded = AuthorIndex(autosave=True)
+        self.assertTrue(reloaded.ready)
+        self.assertEqual(([(1, 4)], None), reloaded.page("bob", 5))
+
+        # a change makes the saved file stale, so it is dropped
+        reloaded.remove(1, 4)
+        self.assertFalse(os.path.exists(reloaded.filepath))
+        self.assertFalse(AuthorIndex(autosave=True).ready)
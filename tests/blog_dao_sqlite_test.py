@@ -0,0 +1,87 @@
+import gc
+from unittest import TestCase
+from blogging.blog import Blog
+from blogging.dao.blog_dao_sqlite import BlogDAOSQLite
+from tests.scratch import use_scratch_folder
+
+class BlogDAOSQLiteTest(TestCase):
+
+
+    def setUp(self):
+
+        use_scratch_folder(self)
+
+        self.dao = BlogDAOSQLite(autosave=True)
+        self.blog_1 = Blog(1111114444, "Short Journey", "short_journey", "short.journey@gmail.com")
+        self.blog_2 = Blog(1111115555, "Long Journey", "long_journey", "long.journey@gmail.com")
+        self.blog_3 = Blog(1111112000, "Long Trip", "long_trip", "long.trip@gmail.com")
+
+
+    def test_create_search_keeps_identity(self):
+
+        self.dao.create_blog(self.blog_1)
+
+        self.assertIs(self.blog_1, self.dao.search_blog(1111114444))
+        self.assertIsNone(self.dao.search_blog(1111119999))
+
+
+    def test_list_and_retrieve_in_creation_order(self):
+
+        self.dao.create_blog(self.blog_1)
+        self.dao.create_blog(self.blog_2)
+        self.dao.create_blog(self.blog_3)
+
+        self.assertEqual([self.blog_1, self.blog_2, self.blog_3], self.dao.list_blogs())
+        self.assertEqual([self.blog_1, self.blog_2], self.dao.retrieve_blogs("journey"))
+        self.assertEqual([], self.dao.retrieve_blogs("travel"))
+
+
+    def test_update_delete_and_persist(self):
+
+        self.dao.create_blog(self.blog_1)
+        self.dao.create_blog(self.blog_2)
+
+        self.blog_1.update_info_blog(name="Short Travel")
+        self.dao.update_blog(1111114444, self.blog_1)
+        self.dao.delete_blog(1111115555)
+
+        reopened = BlogDAOSQLite(autosave=True)
+        self.assertEqual(
+            [Blog(1111114444, "Short Travel", "short_journey", "short.journey@gmail.com")],
+            reopened.list_blogs()
+        )
+
+
+    def test_prefix_lookup_is_a_range_on_the_folded_index(self):
+
+        self.dao.create_blog(self.blog_1)
+        self.dao.create_blog(self.blog_2)
+        self.dao.create_blog(self.blog_3)
+        self.dao.create_blog(Blog(1111116666, "Long%Way", "long_way", "long.way@gmail.com"))
+
+        self.assertEqual([self.blog_2, self.blog_3], self.dao.retrieve_blogs_by_prefix("LONG "))
+        self.assertEqual([1111116666], [blog.id for blog in self.dao.retrieve_blogs_by_prefix("long%")])
+        self.assertEqual([], self.dao.retrieve_blogs_by_prefix("journey"))
+
+        plan = " ".join(row[-1] for row in self.dao.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM blogs WHERE folded >= ? AND folded < ? ORDER BY folded, id", ("a", "b")
+        ))
+        self.assertIn("USING COVERING INDEX blogs_folded (folded>? AND folded<?)", plan)
+
+
+    def test_blogs_no_longer_in_use_are_let_go(self):
+
+        self.dao.create_blog(self.blog_1)
+        self.dao.create_blog(self.blog_2)
+        self.blog_2 = None
+        gc.collect()
+
+        self.assertEqual([1111114444], list(self.dao.blogs.keys()))
+        self.assertIs(self.blog_1, self.dao.search_blog(1111114444))
+        self.assertEqual("Long Journey", self.dao.search_blog(1111115555).name)
+
+        # nothing saved => the cached blog is the only copy
+        in_memory = BlogDAOSQLite(autosave=False)
+        in_memory.create_blog(Blog(1111116666, "Kept", "kept", "kept@gmail.com"))
+        gc.collect()
+        self.assertEqual([1111116666], list(in_memory.blogs.keys()))
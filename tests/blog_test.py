@@ -1,14 +1,24 @@
 from unittest import TestCase
 from blogging.blog import Blog
+from blogging.configuration import Configuration
+from tests.scratch import use_scratch_folder
 
 class BlogTest(TestCase):
 
 
     def setUp(self):
 
+        use_scratch_folder(self)
+
         self.blog = Blog(1111110000, "test", "test_url", "test@example.com")
 
 
+    def tearDown(self):
+
+        # write and close the store before its folder goes
+        self.blog.close_post_store()
+
+
     def test_add_post_and_get_post(self):
 
         p1 = self.blog.add_post("first", "body1")
@@ -78,4 +88,22 @@ class BlogTest(TestCase):
 
         ordered = self.blog.posts_listed_descending()
         codes = [p.code for p in ordered]
-        self.assertEqual([p3.code, p2.code, p1.code], codes)
\ No newline at end of file
+        self.assertEqual([p3.code, p2.code, p1.code], codes)
+
+
+    def test_post_store_opens_on_first_access(self):
+
+        # in-memory store, kept by the blog itself
+        configuration = Configuration()
+        old_autosave = configuration.__class__.autosave
+        configuration.__class__.autosave = False
+
+        try:
+            blog = Blog(1111110001, "lazy", "lazy_url", "lazy@example.com")
+        finally:
+            configuration.__class__.autosave = old_autosave
+
+        self.assertIsNone(blog._post_dao)
+
+        blog.get_post(1)
+        self.assertIsNotNone(blog._post_dao)
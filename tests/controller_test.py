@@ -1,3 +1,7 @@
+import io
+import threading
+import time
+from datetime import datetime
 from unittest import TestCase
 from unittest import main
 from blogging.controller import Controller
@@ -10,6 +14,8 @@ from blogging.exception.invalid_logout_exception import InvalidLogoutException
 from blogging.exception.illegal_access_exception import IllegalAccessException
 from blogging.exception.illegal_operation_exception import IllegalOperationException
 from blogging.exception.no_current_blog_exception import NoCurrentBlogException
+from blogging.exception.search_timeout_exception import SearchTimeoutException
+from blogging.dao.regex_search import compile_pattern
 
 class ControllerTest(TestCase):
 
@@ -614,5 +620,326 @@ class ControllerTest(TestCase):
 		self.assertEqual(expected_post_2, posts_list[1], "post 2 is the second in the list of posts")
 
 
+	def test_search_posts_ranked(self):
+		# some posts that may be found
+		expected_post_1 = Post(1, "Starting my journey", "Once upon a time\nThere was a kid...")
+		expected_post_2 = Post(2, "Second step", "Before one could think,\nA storm stroke.")
+		expected_post_3 = Post(3, "Continuing my journey", "Along the way...\nThere were challenges.")
+		expected_post_5 = Post(5, "Finishing my journey", "And that was it.\nEnd of story.")
+
+		# cannot do operation without logging in
+		with self.assertRaises(IllegalAccessException, msg="cannot search posts without logging in"):
+			self.controller.search_posts_ranked("journey")
+
+		# login
+		self.assertTrue(self.controller.login("user", "123456"), "login correctly")
+
+		# cannot do operation without a valid current blog
+		with self.assertRaises(NoCurrentBlogException, msg="cannot search posts without a valid current blog"):
+			self.controller.search_posts_ranked("journey")
+
+		# add one blog, make it the current blog and add some posts
+		self.controller.create_blog(1111114444, "Short Journey", "short_journey", "short.journey@gmail.com")
+		self.controller.set_current_blog(1111114444)
+		self.controller.create_post("Starting my journey", "Once upon a time\nThere was a kid...")
+		self.controller.create_post("Second step", "Before one could think,\nA storm stroke.")
+		self.controller.create_post("Continuing my journey", "Along the way...\nThere were challenges.")
+		self.controller.create_post("Fourth step", "When less expected,\nAll worked fine.")
+		self.controller.create_post("Finishing my journey", "And that was it.\nEnd of story.")
+
+		# one matching post
+		self.assertEqual([expected_post_2], self.controller.search_posts_ranked("storm"))
+
+		# limit keeps only the top posts
+		ranked_list = self.controller.search_posts_ranked("journey", 2)
+		self.assertEqual(2, len(ranked_list), "ranked list is cut at the limit")
+		for post in ranked_list:
+			self.assertIn(post, [expected_post_1, expected_post_3, expected_post_5])
+
+		# a post matching more words ranks first
+		ranked_list = self.controller.search_posts_ranked("story journey")
+		self.assertEqual(expected_post_5, ranked_list[0], "post 5 matches both words")
+
+		# no matching posts
+		self.assertEqual([], self.controller.search_posts_ranked("travel"))
+
+
+	def test_search_all_posts(self):
+		# cannot do operation without logging in
+		with self.assertRaises(IllegalAccessException, msg="cannot search posts without logging in"):
+			self.controller.search_all_posts("journey")
+
+		# login
+		self.assertTrue(self.controller.login("user", "123456"), "login correctly")
+
+		# no blogs, nothing found
+		self.assertEqual([], list(self.controller.search_all_posts("journey")))
+
+		# posts spread over two blogs, no current blog needed
+		self.controller.create_blog(1111114444, "Short Journey", "short_journey", "short.journey@gmail.com")
+		self.controller.create_blog(1111115555, "Long Journey", "long_journey", "long.journey@gmail.com")
+		self.controller.set_current_blog(1111114444)
+		self.controller.create_post("Starting my journey", "Once upon a time\nThere was a kid...")
+		self.controller.create_post("Second step", "Before one could think,\nA storm stroke.")
+		self.controller.set_current_blog(1111115555)
+		self.controller.create_post("Another journey", "Far away.")
+		self.controller.unset_current_blog()
+
+		found = sorted((blog_id, post.code) for blog_id, post in self.controller.search_all_posts("JOURNEY"))
+		self.assertEqual([(1111114444, 1), (1111115555, 1)], found)
+		self.assertEqual([(1111114444, 2)], [(blog_id, post.code) for blog_id, post in self.controller.search_all_posts("storm")])
+
+		# limit stops the stream early
+		self.assertEqual(1, len(list(self.controller.search_all_posts("journey", 1))))
+		self.assertEqual([], list(self.controller.search_all_posts("journey", 0)))
+
+
+	def test_iter_posts_and_blogs(self):
+		# cannot do operation without logging in, raised before the first result
+		with self.assertRaises(IllegalAccessException, msg="cannot list blogs without logging in"):
+			self.controller.iter_blogs()
+		with self.assertRaises(IllegalAccessException, msg="cannot list posts without logging in"):
+			self.controller.iter_posts()
+
+		# login
+		self.assertTrue(self.controller.login("user", "123456"), "login correctly")
+
+		# cannot do operation without a valid current blog
+		with self.assertRaises(NoCurrentBlogException, msg="cannot list posts without a valid current blog"):
+			self.controller.iter_matching_posts("journey")
+
+		self.controller.create_blog(1111114444, "Short Journey", "short_journey", "short.journey@gmail.com")
+		self.controller.create_blog(1111115555, "Long Journey", "long_journey", "long.journey@gmail.com")
+		self.controller.create_blog(1111116666, "Other", "other", "other@gmail.com")
+		self.assertEqual([1111114444, 1111115555, 1111116666], [blog.id for blog in self.controller.iter_blogs()])
+		self.assertEqual([1111114444, 1111115555], [blog.id for blog in self.controller.iter_matching_blogs("journey")])
+
+		self.controller.set_current_blog(1111114444)
+		self.controller.create_post("Starting my journey", "Once upon a time\nThere was a kid...")
+		self.controller.create_post("Second step", "Before one could think,\nA storm stroke.")
+		self.controller.create_post("Continuing my journey", "Along the way...\nThere were challenges.")
+
+		# same posts as the list versions, first one available right away
+		self.assertEqual(self.controller.list_posts(), list(self.controller.iter_posts()))
+		self.assertEqual(self.controller.retrieve_posts("journey"), list(self.controller.iter_matching_posts("journey")))
+		self.assertEqual([3, 1], [post.code for post in self.controller.iter_matching_posts("JOURNEY", descending=True)])
+		self.assertEqual(3, next(self.controller.iter_posts()).code)
+
+
+	def test_list_pages(self):
+		# login
+		self.assertTrue(self.controller.login("user", "123456"), "login correctly")
+
+		# blog pages come in creation order, like the whole list
+		self.controller.create_blog(1111115555, "Long Journey", "long_journey", "long.journey@gmail.com")
+		self.controller.create_blog(1111112000, "Long Trip", "long_trip", "long.trip@gmail.com")
+		self.controller.create_blog(1111114444, "Short Journey", "short_journey", "short.journey@gmail.com")
+		page = self.controller.list_blogs(limit=2)
+		self.assertEqual([1111115555, 1111112000], [blog.id for blog in page])
+		page = self.controller.list_blogs(after_id=page[-1].id, limit=2)
+		self.assertEqual([1111114444], [blog.id for blog in page])
+		self.assertEqual([], self.controller.list_blogs(after_id=1111114444, limit=2))
+		self.assertEqual(self.controller.list_blogs(), self.controller.list_blogs(limit=10))
+
+		# a cursor must be a blog still stored
+		with self.assertRaises(ValueError):
+			self.controller.list_blogs(after_id=1111119999, limit=2)
+
+		# post pages walk from newest to oldest
+		self.controller.set_current_blog(1111114444)
+		for i in range(5):
+			self.controller.create_post("Post %d" % i, "text")
+		self.controller.delete_post(3)
+		page = self.controller.list_posts(limit=2)
+		self.assertEqual([5, 4], [post.code for post in page])
+		page = self.controller.list_posts(after_code=page[-1].code, limit=2)
+		self.assertEqual([2, 1], [post.code for post in page])
+		self.assertEqual([], self.controller.list_posts(after_code=1, limit=2))
+		self.assertEqual([2, 1], [post.code for post in self.controller.iter_posts(after_code=3)])
+
+
+	def test_time_queries(self):
+		# cannot do operation without logging in
+		with self.assertRaises(IllegalAccessException, msg="cannot query by time without logging in"):
+			self.controller.recently_updated_posts(2)
+
+		# login
+		self.assertTrue(self.controller.login("user", "123456"), "login correctly")
+
+		# cannot do operation without a valid current blog
+		with self.assertRaises(NoCurrentBlogException, msg="cannot query by time without a valid current blog"):
+			self.controller.posts_created_between(None, None)
+
+		self.controller.create_blog(1111114444, "Short Journey", "short_journey", "short.journey@gmail.com")
+		self.controller.set_current_blog(1111114444)
+		self.controller.create_post("Starting my journey", "Once upon a time\nThere was a kid...")
+		self.controller.create_post("Second step", "Before one could think,\nA storm stroke.")
+		time.sleep(0.002)
+		middle = datetime.now()
+		time.sleep(0.002)
+		self.controller.create_post("Continuing my journey", "Along the way...\nThere were challenges.")
+
+		# created ranges, end left out
+		self.assertEqual([1, 2, 3], [post.code for post in self.controller.posts_created_between(None, None)])
+		self.assertEqual([1, 2], [post.code for post in self.controller.posts_created_between(None, middle)])
+		self.assertEqual([3], [post.code for post in self.controller.posts_created_between(middle, None)])
+		self.assertEqual([], self.controller.posts_created_between(middle, middle))
+
+		# an update moves a post to the front
+		self.assertEqual([3, 2], [post.code for post in self.controller.recently_updated_posts(2)])
+		time.sleep(0.002)
+		self.controller.update_post(1, "Starting my trip", None)
+		self.assertEqual([1, 3], [post.code for post in self.controller.recently_updated_posts(2)])
+		self.assertEqual([], self.controller.recently_updated_posts(0))
+		self.assertEqual([], self.controller.recently_updated_posts(-1))
+		self.assertEqual([1, 2], [post.code for post in self.controller.posts_created_between(None, middle)])
+
+
+	def test_retrieve_posts_regex(self):
+		# login, blog with posts
+		self.assertTrue(self.controller.login("user", "123456"), "login correctly")
+		self.controller.create_blog(1111114444, "Short Journey", "short_journey", "short.journey@gmail.com")
+		self.controller.set_current_blog(1111114444)
+		self.controller.create_post("Starting my journey", "Once upon a time\nThere was a kid...")
+		self.controller.create_post("Second step", "Before one could think,\nA storm stroke.")
+		self.controller.create_post("Continuing my journey", "Along the way...\nThere were challenges.")
+
+		# patterns match case-insensitively, classes are not lowercased away
+		self.assertEqual([1, 3], [post.code for post in self.controller.retrieve_posts("^\\S+ing MY", regex=True)])
+		self.assertEqual([2], [post.code for post in self.controller.retrieve_posts("th(ink|unk)", regex=True)])
+		self.assertEqual([3, 1], [post.code for post in self.controller.iter_matching_posts("journey$", descending=True, regex=True)])
+		self.assertEqual([], self.controller.retrieve_posts("journey$x", regex=True))
+
+		# repeat counts and escape arguments never narrow the candidates
+		self.controller.create_post("Counting", "xxxxxxxxxx Abc")
+		self.assertEqual([4], [post.code for post in self.controller.retrieve_posts("x{10}", regex=True)])
+		self.assertEqual([4], [post.code for post in self.controller.retrieve_posts(r"\x41bc", regex=True)])
+
+		# patterns see the text as written, folding only narrows the candidates
+		self.controller.create_post("Straße", "a \ufb01le")
+		self.assertEqual([5], [post.code for post in self.controller.retrieve_posts("Straße", regex=True)])
+		self.assertEqual([5], [post.code for post in self.controller.retrieve_posts("STRAẞE$", regex=True)])
+		self.assertEqual([5], [post.code for post in self.controller.retrieve_posts("a \ufb01le", regex=True)])
+
+		# compiled once, then served from the cache
+		hits = compile_pattern.cache_info().hits
+		self.controller.retrieve_posts("th(ink|unk)", regex=True)
+		self.assertGreater(compile_pattern.cache_info().hits, hits)
+
+		with self.assertRaises(IllegalOperationException, msg="invalid pattern is rejected up front"):
+			self.controller.iter_matching_posts("(unclosed", regex=True)
+
+		# a set cancel event ends the stream
+		cancel = threading.Event()
+		cancel.set()
+		self.assertEqual([], self.controller.retrieve_posts("journey", regex=True, cancel=cancel))
+
+		# past the time budget the search stops
+		old_budget = self.configuration.__class__.search_time_budget
+		self.configuration.__class__.search_time_budget = -1.0
+		try:
+			with self.assertRaises(SearchTimeoutException, msg="search past its time budget"):
+				self.controller.retrieve_posts("journey", regex=True)
+		finally:
+			self.configuration.__class__.search_time_budget = old_budget
+
+
+	def test_byte_search_and_export(self):
+		# cannot do operation without logging in
+		with self.assertRaises(IllegalAccessException, msg="cannot export posts without logging in"):
+			self.controller.export_posts(io.BytesIO())
+
+		# login
+		self.assertTrue(self.controller.login("user", "123456"), "login correctly")
+
+		# cannot do operation without a valid current blog
+		with self.assertRaises(NoCurrentBlogException, msg="cannot search bytes without a valid current blog"):
+			self.controller.iter_posts_containing_bytes(b"x")
+
+		self.controller.create_blog(1111114444, "Short Journey", "short_journey", "short.journey@gmail.com")
+		self.controller.set_current_blog(1111114444)
+		self.controller.create_post("Starting my journey", "Once upon a time")
+		self.controller.create_post("Second step", "A storm stroke.")
+
+		# exact bytes, case matters
+		self.assertEqual([2], [post.code for post in self.controller.iter_posts_containing_bytes(b"storm")])
+		self.assertEqual([], list(self.controller.iter_posts_containing_bytes(b"ONCE")))
+
+		exported = io.BytesIO()
+		self.controller.export_posts(exported)
+		self.assertEqual(b"#2 Second step\nA storm stroke.\n\n#1 Starting my journey\nOnce upon a time\n\n", exported.getvalue())
+
+
+	def test_posts_by_author(self):
+		# cannot do operation without logging in
+		with self.assertRaises(IllegalAccessException, msg="cannot list posts by author without logging in"):
+			self.controller.posts_by_author("ana")
+
+		# login
+		self.assertTrue(self.controller.login("user", "123456"), "login correctly")
+
+		# posts by the same author over two blogs
+		self.controller.create_blog(1111114444, "Short Journey", "short_journey", "short.journey@gmail.com")
+		self.controller.create_blog(1111115555, "Long Journey", "long_journey", "long.journey@gmail.com")
+		self.controller.set_current_blog(1111114444)
+		self.controller.create_post("Starting my journey", "Once upon a time", "Ana")
+		self.controller.create_post("Second step", "Before one could think", "Bob")
+		self.controller.set_current_blog(1111115555)
+		self.controller.create_post("Another journey", "Far away.", "ana")
+
+		# first call builds the index, matching ignores case
+		page, cursor = self.controller.posts_by_author("ANA", 1)
+		self.assertEqual([(1111114444, 1)], [(blog_id, post.code) for blog_id, post in page])
+		page, cursor = self.controller.posts_by_author("ANA", 1, cursor)
+		self.assertEqual([(1111115555, 1)], [(blog_id, post.code) for blog_id, post in page])
+		self.assertIsNone(cursor)
+		self.assertEqual(([], None), self.controller.posts_by_author("ana", 0))
+
+		# kept current by new posts, author changes and deletes
+		self.controller.create_post("Third", "text", "Bob")
+		self.controller.update_post(1, author="Bob")
+		self.controller.set_current_blog(1111114444)
+		self.controller.delete_post(2)
+		page, cursor = self.controller.posts_by_author("bob")
+		self.assertEqual([(1111115555, 1), (1111115555, 2)], [(blog_id, post.code) for blog_id, post in page])
+		self.assertEqual([], self.controller.posts_by_author("nobody")[0])
+
+		# blog id changes and deletes move the entries
+		self.controller.unset_current_blog()
+		self.controller.update_blog(1111115555, 1111116666, "Long Journey", "long_journey", "long.journey@gmail.com")
+		page, cursor = self.controller.posts_by_author("bob")
+		self.assertEqual([(1111116666, 1), (1111116666, 2)], [(blog_id, post.code) for blog_id, post in page])
+		self.controller.delete_blog(1111116666)
+		self.assertEqual([], self.controller.posts_by_author("bob")[0])
+
+
+	def test_blog_name_index(self):
+		# cannot do operation without logging in
+		with self.assertRaises(IllegalAccessException, msg="cannot retrieve blogs without logging in"):
+			self.controller.retrieve_blogs_by_prefix("Short")
+
+		# login
+		self.assertTrue(self.controller.login("user", "123456"), "login correctly")
+
+		self.controller.create_blog(1111114444, "Short Journey", "short_journey", "short.journey@gmail.com")
+		self.controller.create_blog(1111115555, "Long Journey", "long_journey", "long.journey@gmail.com")
+		self.controller.create_blog(1111112000, "Long Trip", "long_trip", "long.trip@gmail.com")
+		self.controller.create_blog(1111116666, "Short Trip", "short_trip", "short.trip@gmail.com")
+
+		# prefixes come back in name order, substrings in creation order
+		self.assertEqual([1111115555, 1111112000], [blog.id for blog in self.controller.retrieve_blogs_by_prefix("LONG")])
+		self.assertEqual([1111114444, 1111116666], [blog.id for blog in self.controller.retrieve_blogs_by_prefix("short ")])
+		self.assertEqual([], self.controller.retrieve_blogs_by_prefix("Journey"))
+		self.assertEqual([1111112000, 1111116666], [blog.id for blog in self.controller.retrieve_blogs("rip")])
+		self.assertEqual([1111114444, 1111116666], [blog.id for blog in self.controller.retrieve_blogs("t ")])
+
+		# renames and deletes keep the index current
+		self.controller.update_blog(1111112000, 1111112000, "Short Hike", "long_trip", "long.trip@gmail.com")
+		self.controller.delete_blog(1111116666)
+		self.assertEqual([], self.controller.retrieve_blogs("rip"))
+		self.assertEqual([1111112000, 1111114444], [blog.id for blog in self.controller.retrieve_blogs_by_prefix("short")])
+		self.assertEqual([1111114444, 1111112000], [blog.id for blog in self.controller.retrieve_blogs("short")])
+
+
 if __name__ == '__main__':
 	unittest.main()
\ No newline at end of file
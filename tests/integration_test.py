@@ -5,12 +5,14 @@ from blogging.controller import Controller
 from blogging.blog import Blog
 from blogging.post import Post
 from blogging.configuration import Configuration
+from blogging.dao.post_store_cache import get_post_store_cache
 from blogging.exception.invalid_login_exception import InvalidLoginException
 from blogging.exception.duplicate_login_exception import DuplicateLoginException
 from blogging.exception.invalid_logout_exception import InvalidLogoutException
 from blogging.exception.illegal_access_exception import IllegalAccessException
 from blogging.exception.illegal_operation_exception import IllegalOperationException
 from blogging.exception.no_current_blog_exception import NoCurrentBlogException
+from tests.scratch import use_scratch_folder
 
 class IntegrationTest(TestCase):
 
@@ -18,10 +20,14 @@ class IntegrationTest(TestCase):
 		# set autosave to True to test persistence
 		self.configuration = Configuration()
 		self.configuration.__class__.autosave = True
+		# files go to a scratch folder, never the package
+		use_scratch_folder(self)
 		self.controller = Controller()
 
 	# comment the tearDown method to see the file when the test ends.
 	def tearDown(self):
+		# stores still cached write their indexes now, not at exit
+		get_post_store_cache().close_all()
 		blogs_file = self.configuration.__class__.blogs_file
 		records_path = self.configuration.__class__.records_path
 		blogs_file_exists = os.path.exists(blogs_file)
@@ -784,6 +790,35 @@ class IntegrationTest(TestCase):
 		self.assertEqual(expected_post_4, posts_list[0], "post 4 is the first in the list of posts")
 		self.assertEqual(expected_post_2, posts_list[1], "post 2 is the second in the list of posts")
 
+	def test_renamed_blog_keeps_posts(self):
+		# one open post store, so touching another blog evicts the renamed one
+		cache = get_post_store_cache()
+		old_max_blogs, cache.max_blogs = cache.max_blogs, 1
+
+		try:
+			self.assertTrue(self.controller.login("user", "123456"), "login correctly")
+			self.controller.create_blog(1111111111, "Short Journey", "short_journey", "short.journey@gmail.com")
+			self.controller.create_blog(1111112222, "Long Journey", "long_journey", "long.journey@gmail.com")
+			self.controller.set_current_blog(1111111111)
+			self.controller.create_post("Starting my journey", "Once upon a time")
+			self.controller.unset_current_blog()
+
+			self.controller.update_blog(1111111111, 3333333333, "Short Journey", "short_journey", "short.journey@gmail.com")
+			self.controller.set_current_blog(1111112222)
+			self.controller.list_posts()
+			self.controller.set_current_blog(3333333333)
+			self.assertEqual([1], [post.code for post in self.controller.list_posts()], "posts follow the new id after eviction")
+
+			# numbering continues, and a fresh start finds the posts too
+			self.assertEqual(2, self.controller.create_post("Second step", "Before one could think").code)
+			self.reset_persistence()
+			self.controller.set_current_blog(3333333333)
+			self.assertEqual([2, 1], [post.code for post in self.controller.list_posts()])
+			self.assertFalse(os.path.exists(os.path.join(self.configuration.__class__.records_path, "1111111111.dat.log")))
+
+		finally:
+			cache.max_blogs = old_max_blogs
+
 
 if __name__ == '__main__':
 	main()
\ No newline at end of file
@@ -0,0 +1,114 @@
+import os
+from datetime import datetime
+from unittest import TestCase
+from blogging.blog import Blog
+from blogging.dao.post_dao_columnar import PostDAOColumnar
+from blogging.post import Post
+from tests.scratch import use_scratch_folder
+
+class PostDAOColumnarTest(TestCase):
+
+
+    def setUp(self):
+
+        use_scratch_folder(self)
+
+        self.blog = Blog(1111110000, "test", "test_url", "test@example.com")
+        self.dao = PostDAOColumnar(self.blog, autosave=True)
+
+
+    def reopen(self):
+
+        return PostDAOColumnar(self.blog, autosave=True)
+
+
+    def test_mutations_keep_rows_in_code_order(self):
+
+        self.dao.create_post(Post(3, "third", "c", "ana"))
+        self.dao.create_post(Post(1, "first", "a"))
+        self.dao.create_post(Post(2, "second", "b", "bob"))
+
+        self.assertEqual([3, 2, 1], [p.code for p in self.dao.list_posts()])
+        self.assertEqual([2, 1], [p.code for p in self.dao.list_posts(after_code=3)])
+        self.assertEqual([3], [p.code for p in self.dao.list_posts(limit=1)])
+        self.assertEqual("bob", self.dao.search_post(2).author)
+        self.assertIsNone(self.dao.search_post(1).author)
+
+        self.assertTrue(self.dao.update_post(2, None, "changed"))
+        self.assertTrue(self.dao.delete_post(1))
+        self.assertFalse(self.dao.delete_post(1))
+        self.assertFalse(self.dao.update_post(9, "x", "y"))
+
+        self.assertEqual([2, 3], [p.code for p in self.dao.retrieve_posts("")])
+        self.assertEqual("changed", self.dao.search_post(2).text)
+
+
+    def test_search_and_time_queries(self):
+
+        self.dao.create_post(Post(1, "Straße", "once upon a time", "ana"))
+        self.dao.create_post(Post(2, "other", "i think so", "bob"))
+        self.dao.create_post(Post(3, "rethink", "body"))
+
+        self.assertEqual([1], [p.code for p in self.dao.retrieve_posts("STRASSE")])
+        self.assertEqual([3, 2], [p.code for p in self.dao.iter_matching_posts("think", descending=True)])
+        self.assertEqual([2], [p.code for p in self.dao.rank_posts("think", 5)])
+        self.assertEqual([2], [p.code for p in self.dao.iter_regex_posts("th(ink|unk) so")])
+
+        # rows are created in code order, so times follow codes
+        middle = self.dao.search_post(2).created_at
+        self.assertEqual([1], [p.code for p in self.dao.posts_created_between(None, middle)])
+        self.assertEqual([2, 3], [p.code for p in self.dao.posts_created_between(middle, None)])
+
+        self.dao.update_post(1, "road", None)
+        self.assertEqual([1, 3], [p.code for p in self.dao.recently_updated_posts(2)])
+        self.assertEqual([], self.dao.retrieve_posts("strasse"))
+
+
+    def test_columns_round_trip_through_file(self):
+
+        self.dao.create_post(Post(2, "two", "ünïcode body", "ana"))
+        self.dao.create_post(Post(1, "one", "a"))
+        self.dao.update_post(2, "TWO", None)
+        self.dao.close()
+        self.assertTrue(os.path.exists(self.dao.filepath))
+
+        dao = self.reopen()
+        self.assertEqual([2, 1], [p.code for p in dao.list_posts()])
+        self.assertEqual(("TWO", "ünïcode body", "ana"), (dao.search_post(2).title, dao.search_post(2).text, dao.search_post(2).author))
+        self.assertEqual(self.dao.search_post(2).updated_at, dao.search_post(2).updated_at)
+        self.assertEqual(3, self.blog.next_post_id)
+
+        # a torn file is copied aside with a warning, the store starts empty
+        with open(dao.filepath, "r+b") as file:
+            file.truncate(os.path.getsize(dao.filepath) - 3)
+        torn_size = os.path.getsize(dao.filepath)
+        with self.assertWarns(UserWarning):
+            dao = self.reopen()
+        self.assertEqual([], dao.list_posts())
+        self.assertEqual(torn_size, os.path.getsize(dao.filepath + ".corrupt"))
+
+
+    def test_replaced_post_reorders_created_times(self):
+
+        self.dao.create_post(Post(1, "first", "a"))
+        self.dao.create_post(Post(2, "second", "b"))
+        self.dao.posts_created_between(None, None)
+
+        # same code again with an older created time => first in the created order
+        older = Post(2, "second", "b")
+        older.created_at = datetime(2000, 1, 1)
+        self.dao.create_post(older)
+
+        self.assertEqual([2, 1], [p.code for p in self.dao.posts_created_between(None, None)])
+        self.assertEqual([2], [p.code for p in self.dao.posts_created_between(None, datetime(2001, 1, 1))])
+
+
+    def test_rewritten_strings_are_compacted(self):
+
+        self.dao.create_post(Post(1, "first", "x" * 1000))
+
+        for i in range(200): self.dao.update_post(1, None, str(i) * 1000)
+
+        # garbage never grows past the live bytes by much
+        self.assertLess(len(self.dao.texts.blob), 200 * 1000)
+        self.assertEqual("199" * 1000, self.dao.search_post(1).text)
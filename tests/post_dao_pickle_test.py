@@ -0,0 +1,455 @@
+import io
+import os
+import pickle
+import threading
+import time
+import zlib
+from unittest import TestCase, mock
+from blogging.blog import Blog
+from blogging.configuration import Configuration
+from blogging.dao.flusher import Flusher
+from blogging.dao.post_dao_pickle import LOG_FRAME, LOG_PUT, PostDAOPickle
+from blogging.post import Post
+from tests.scratch import use_scratch_folder
+
+class PostDAOPickleTest(TestCase):
+
+
+    def setUp(self):
+
+        use_scratch_folder(self)
+        self.configuration = Configuration()
+        self.old_compact_records = self.configuration.__class__.log_compact_records
+
+        self.blog = Blog(1111110000, "test", "test_url", "test@example.com")
+        self.dao = PostDAOPickle(self.blog, autosave=True)
+
+
+    def tearDown(self):
+
+        self.configuration.__class__.log_compact_records = self.old_compact_records
+
+
+    def reopen(self):
+
+        return PostDAOPickle(self.blog, autosave=True)
+
+
+    def test_mutations_append_to_log(self):
+
+        self.dao.create_post(Post(1, "first", "body1"))
+        self.dao.create_post(Post(2, "second", "body2"))
+
+        self.assertTrue(os.path.exists(self.dao.logpath))
+        self.assertFalse(os.path.exists(self.dao.filepath))
+
+        size = os.path.getsize(self.dao.logpath)
+        self.dao.update_post(1, "changed", None, "author")
+        self.dao.delete_post(2)
+        self.assertGreater(os.path.getsize(self.dao.logpath), size)
+
+
+    def test_replay_restores_posts(self):
+
+        self.dao.create_post(Post(1, "first", "body1"))
+        self.dao.create_post(Post(2, "second", "body2"))
+        self.dao.create_post(Post(3, "third", "body3"))
+        self.dao.update_post(1, "changed", None, "author")
+        self.dao.delete_post(2)
+
+        reopened = self.reopen()
+
+        self.assertEqual([3, 1], [p.code for p in reopened.list_posts()])
+        self.assertEqual("changed", reopened.search_post(1).title)
+        self.assertEqual("author", reopened.search_post(1).author)
+        self.assertEqual(4, self.blog.next_post_id)
+
+
+    def test_log_frames_hold_plain_rows(self):
+
+        post = Post(1, "first", "body1", "ana")
+        self.dao.create_post(post)
+
+        with open(self.dao.logpath, "rb") as file:
+            data = file.read()
+        length, _ = LOG_FRAME.unpack_from(data)
+        payload = data[LOG_FRAME.size:LOG_FRAME.size + length]
+
+        # no Post class reference in the frame
+        self.assertNotIn(b"Post", payload)
+        self.assertEqual(
+            (LOG_PUT, (1, "first", "body1", "ana", post.created_us, post.updated_us)),
+            pickle.loads(payload)
+        )
+
+        # a frame from an older log, holding the Post itself, still replays
+        legacy = pickle.dumps((LOG_PUT, Post(2, "second", "body2")))
+        with open(self.dao.logpath, "ab") as file:
+            file.write(LOG_FRAME.pack(len(legacy), zlib.crc32(legacy)) + legacy)
+
+        reopened = self.reopen()
+        self.assertEqual([2, 1], [p.code for p in reopened.list_posts()])
+        self.assertEqual(post.created_at, reopened.search_post(1).created_at)
+
+
+    def test_checkpoint_then_replay(self):
+
+        self.dao.create_post(Post(1, "first", "body1"))
+        self.dao.save_to_file()
+        self.assertFalse(os.path.exists(self.dao.logpath))
+
+        self.dao.create_post(Post(2, "second", "body2"))
+
+        reopened = self.reopen()
+        self.assertEqual([2, 1], [p.code for p in reopened.list_posts()])
+
+
+    def test_torn_tail_is_dropped(self):
+
+        self.dao.create_post(Post(1, "first", "body1"))
+        self.dao.create_post(Post(2, "second", "body2"))
+
+        # cut the last frame in half
+        size = os.path.getsize(self.dao.logpath)
+        with open(self.dao.logpath, "r+b") as file:
+            file.truncate(size - 5)
+
+        reopened = self.reopen()
+        self.assertEqual([1], [p.code for p in reopened.list_posts()])
+
+        # appends after recovery are replayed normally
+        reopened.create_post(Post(3, "third", "body3"))
+        self.assertEqual([3, 1], [p.code for p in self.reopen().list_posts()])
+
+
+    def test_compaction_folds_log_into_checkpoint(self):
+
+        self.configuration.__class__.log_compact_records = 5
+        dao = self.reopen()
+
+        for code in range(1, 6):
+            dao.create_post(Post(code, "title %d" % code, "body"))
+        dao.wait_for_compaction()
+
+        # log folded into the checkpoint
+        self.assertTrue(os.path.exists(dao.filepath))
+        self.assertEqual(0, dao.log_records)
+
+        # writes after compaction still land in the log
+        dao.update_post(1, "changed", None)
+        dao.delete_post(5)
+        self.assertEqual(2, dao.log_records)
+
+        reopened = self.reopen()
+        self.assertEqual([4, 3, 2, 1], [p.code for p in reopened.list_posts()])
+        self.assertEqual("changed", reopened.search_post(1).title)
+
+
+    def test_waiting_never_joins_an_unstarted_compaction(self):
+
+        self.configuration.__class__.log_compact_records = 5
+        dao = self.reopen()
+        starting = threading.Event()
+        errors = []
+        original_start = threading.Thread.start
+
+        # a close on another thread arrives while the compaction is being started
+        def slow_start(thread):
+            starting.set()
+            time.sleep(0.1)
+            original_start(thread)
+
+        def wait():
+            starting.wait()
+            try:
+                dao.wait_for_compaction()
+            except RuntimeError as ex:
+                errors.append(ex)
+
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+
+        with mock.patch.object(threading.Thread, "start", slow_start):
+            for code in range(1, 6):
+                dao.create_post(Post(code, "title %d" % code, "body"))
+
+        waiter.join()
+        dao.wait_for_compaction()
+        self.assertEqual([], errors)
+
+
+    def test_replaying_already_compacted_frames_is_harmless(self):
+
+        self.dao.create_post(Post(1, "first", "body1"))
+        self.dao.create_post(Post(2, "second", "body2"))
+        self.dao.delete_post(2)
+
+        # checkpoint written but log never trimmed, as after a crash mid compaction
+        self.dao.write_checkpoint(dict(self.dao.posts))
+
+        reopened = self.reopen()
+        self.assertEqual([1], [p.code for p in reopened.list_posts()])
+
+
+    def test_interval_policy_defers_log_writes(self):
+
+        self.dao.flusher = Flusher("interval", interval=60)
+
+        self.dao.create_post(Post(1, "first", "body1"))
+        self.dao.create_post(Post(2, "second", "body2"))
+        self.dao.update_post(1, "changed", None)
+
+        # nothing written yet
+        self.assertTrue(self.dao.dirty)
+        self.assertFalse(os.path.exists(self.dao.logpath))
+
+        # one write for the whole window
+        self.dao.flusher.flush_all()
+        self.assertFalse(self.dao.dirty)
+        self.assertEqual(3, self.dao.log_records)
+        self.assertEqual("changed", self.reopen().search_post(1).title)
+
+
+    def test_batch_policy_flushes_when_full(self):
+
+        self.dao.flusher = Flusher("batch", interval=60, batch_ops=2)
+
+        self.dao.create_post(Post(1, "first", "body1"))
+        self.dao.create_post(Post(2, "second", "body2"))
+
+        # flusher thread writes the full batch without waiting for the interval
+        deadline = time.monotonic() + 5
+        while self.dao.dirty and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual([2, 1], [p.code for p in self.reopen().list_posts()])
+
+
+    def test_search_index_follows_mutations(self):
+
+        self.dao.create_post(Post(1, "thinking", "x", "hello"))
+        self.dao.create_post(Post(2, "other", "i think so", "bob"))
+        self.assertEqual([1, 2], [p.code for p in self.dao.retrieve_posts("THINK")])
+
+        # index is maintained once built
+        self.dao.update_post(1, "nothing", None)
+        self.dao.create_post(Post(3, "rethink", "body"))
+        self.dao.delete_post(2)
+
+        self.assertEqual([3], [p.code for p in self.dao.retrieve_posts("think")])
+        self.assertEqual([1], [p.code for p in self.dao.retrieve_posts("nothing")])
+        self.assertEqual([1, 3], [p.code for p in self.dao.retrieve_posts("o")])
+
+
+    def test_search_folds_case_and_width(self):
+
+        self.dao.create_post(Post(1, "Straße", "ＦＵＬＬ width", "Émile"))
+        self.dao.create_post(Post(2, "plain", "text"))
+
+        self.assertEqual([1], [p.code for p in self.dao.retrieve_posts("STRASSE")])
+        self.assertEqual([1], [p.code for p in self.dao.retrieve_posts("full")])
+        self.assertEqual([1], [p.code for p in self.dao.retrieve_posts("émile")])
+        self.assertEqual([1], [p.code for p in self.dao.rank_posts("strasse", 5)])
+
+        # folded copy is dropped with the old version of the post
+        self.dao.update_post(1, "road", "ＦＵＬＬ width")
+        self.assertEqual([], self.dao.retrieve_posts("strasse"))
+        self.assertEqual([1], [p.code for p in self.dao.retrieve_posts("road")])
+
+        # a match never spans two fields
+        self.assertEqual([], self.dao.retrieve_posts("plain\x00text"))
+        self.assertEqual([], self.dao.retrieve_posts("aintex"))
+
+
+    def test_separator_inside_a_field(self):
+
+        self.dao.create_post(Post(1, "a\x00b", "c\x00d", "ana"))
+        self.dao.create_post(Post(2, "ab", "b", "a"))
+
+        # still three fields, the nul reads as a space
+        self.assertEqual(("a b", "c d", "ana"), self.dao.search_fields(self.dao.search_post(1)))
+        self.assertEqual([1], [p.code for p in self.dao.retrieve_posts("a b")])
+        self.assertEqual([], self.dao.retrieve_posts("b\x00c"))
+        self.assertEqual([], self.dao.retrieve_posts("bc"))
+        self.assertEqual([1], [p.code for p in self.dao.rank_posts("d", 5)])
+
+        # the saved word index takes it too
+        self.dao.close()
+        self.assertEqual([1], [p.code for p in self.reopen().rank_posts("d", 5)])
+
+
+    def test_short_queries_scan_buffer(self):
+
+        self.dao.create_post(Post(1, "ab", "x", "hello"))
+        self.dao.create_post(Post(2, "b", "zz"))
+        self.dao.create_post(Post(3, "a", "y"))
+
+        self.assertEqual([1, 3], [p.code for p in self.dao.retrieve_posts("A")])
+        self.assertEqual([3, 1], [p.code for p in self.dao.iter_matching_posts("a", descending=True)])
+        self.assertEqual([2], [p.code for p in self.dao.retrieve_posts("zz")])
+        buffer = self.dao.scan_buffer
+        self.assertIsNotNone(buffer)
+
+        # changes patch the buffer in place, the next short query sees them
+        self.dao.update_post(2, "b", "zaz")
+        self.dao.delete_post(1)
+        self.dao.create_post(Post(4, "za", "w"))
+        self.assertIs(buffer, self.dao.scan_buffer)
+        self.assertEqual([2, 3, 4], [p.code for p in self.dao.retrieve_posts("a")])
+        self.assertEqual([], self.dao.retrieve_posts("zz"))
+        self.assertEqual([2, 4], [p.code for p in self.dao.retrieve_posts("z")])
+
+
+    def test_bodies_stay_out_of_line(self):
+
+        self.dao.create_post(Post(1, "first", "ünïcode body", "ana"))
+        self.dao.create_post(Post(2, "second", "other body"))
+        self.dao.save_to_file()
+
+        dao = self.reopen()
+        first_body = dao.bodies.path
+        self.assertTrue(os.path.exists(first_body))
+        self.assertEqual(0, dao.search_post(1).inline_size())
+
+        # headers are enough to list, nothing reads the bodies
+        view, dao.bodies.view = dao.bodies.view, None
+        self.assertEqual(["second", "first"], [p.title for p in dao.list_posts()])
+        dao.bodies.view = view
+        self.assertEqual("ünïcode body", dao.search_post(1).text)
+
+        # a changed text is inline until the next checkpoint moves it out
+        dao.update_post(2, None, "changed")
+        self.assertEqual(len("changed"), dao.search_post(2).inline_size())
+        dao.save_to_file()
+        self.assertEqual(0, dao.search_post(2).inline_size())
+        self.assertEqual("changed", dao.search_post(2).text)
+        self.assertFalse(os.path.exists(first_body))
+
+        # a generation left by a crash is removed on load
+        orphan = dao.bodies.path[:-1] + "9"
+        open(orphan, "wb").close()
+        self.assertEqual("changed", self.reopen().search_post(2).text)
+        self.assertFalse(os.path.exists(orphan))
+
+
+    def test_mapped_body_file_removal_is_retried(self):
+
+        self.dao.create_post(Post(1, "first", "body"))
+        self.dao.save_to_file()
+        first_body = self.dao.bodies.path
+        view = self.dao.search_post(1).text_view()
+
+        # windows refuses to remove a mapped file => the checkpoint still completes
+        remove = os.remove
+
+        def refuse(path):
+            if path == first_body: raise PermissionError(path)
+            remove(path)
+
+        with mock.patch("blogging.dao.body_file.os.remove", refuse):
+            self.dao.update_post(1, None, "changed")
+            self.dao.save_to_file()
+
+        self.assertTrue(os.path.exists(first_body))
+        self.assertEqual(b"body", bytes(view))
+        self.assertEqual("changed", self.dao.search_post(1).text)
+
+        # the next load sweeps it
+        self.assertEqual("changed", self.reopen().search_post(1).text)
+        self.assertFalse(os.path.exists(first_body))
+
+
+    def test_text_views_and_byte_search_read_the_map(self):
+
+        self.dao.create_post(Post(1, "first", "ünïcode body", "ana"))
+        self.dao.create_post(Post(2, "second", "other Body"))
+        self.dao.save_to_file()
+        dao = self.reopen()
+
+        # out of line text is a slice of the mapped body file
+        view = dao.search_post(1).text_view()
+        self.assertIs(dao.bodies.mapped, view.obj)
+        self.assertEqual("ünïcode body".encode("utf-8"), view.tobytes())
+
+        # byte search is exact and covers inline texts too
+        dao.create_post(Post(3, "third", "a body inline"))
+        self.assertEqual([3, 1], [p.code for p in dao.iter_posts_containing_bytes(b"body")])
+        self.assertEqual([1], [p.code for p in dao.iter_posts_containing_bytes("ü".encode("utf-8"))])
+
+        buffer = io.BytesIO()
+        dao.export_posts(buffer)
+        self.assertEqual(
+            "#3 third\na body inline\n\n#2 second\nother Body\n\n#1 first\nünïcode body\n\n".encode("utf-8"),
+            buffer.getvalue()
+        )
+
+
+    def test_legacy_pickle_migrates_to_records(self):
+
+        with open(self.dao.filepath, "wb") as file:
+            pickle.dump({1: Post(1, "old", "pickled body", "ana"), 2: Post(2, "older", "text")}, file)
+
+        dao = self.reopen()
+        self.assertEqual(["older", "old"], [p.title for p in dao.list_posts()])
+        self.assertEqual("pickled body", dao.search_post(1).text)
+
+        with open(dao.filepath, "rb") as file:
+            self.assertEqual(b"PREC", file.read(4))
+        self.assertEqual("ana", self.reopen().search_post(1).author)
+
+
+    def test_damaged_records_are_kept_aside(self):
+
+        self.dao.create_post(Post(1, "first", "a", "ana"))
+        self.dao.create_post(Post(2, "second", "b"))
+        self.dao.save_to_file()
+
+        # flip a byte of the last title => only that row is lost
+        with open(self.dao.filepath, "r+b") as file:
+            data = file.read()
+            file.seek(data.rindex(b"second"))
+            file.write(b"S")
+
+        with self.assertWarns(UserWarning):
+            dao = self.reopen()
+        self.assertEqual([1], [p.code for p in dao.list_posts()])
+        self.assertTrue(os.path.exists(self.dao.filepath + ".corrupt"))
+
+        # a broken header loads nothing, still nothing is thrown away
+        body_path = dao.bodies.path
+        with open(self.dao.filepath, "r+b") as file:
+            file.truncate(6)
+        with self.assertWarns(UserWarning):
+            dao = self.reopen()
+        self.assertEqual([], dao.list_posts())
+        self.assertEqual(6, os.path.getsize(self.dao.filepath + ".corrupt"))
+
+        # the next checkpoint takes a new generation, the old bodies are kept aside
+        dao.create_post(Post(3, "third", "x"))
+        dao.save_to_file()
+        self.assertNotEqual(body_path, dao.bodies.path)
+        with open(body_path + ".corrupt", "rb") as file:
+            self.assertEqual(b"ab", file.read())
+
+
+    def test_saved_indexes_load_until_records_change(self):
+
+        self.dao.create_post(Post(1, "thinking", "x", "hello"))
+        self.dao.create_post(Post(2, "other", "i think so", "bob"))
+        self.dao.retrieve_posts("think")
+        self.dao.rank_posts("think", 5)
+        self.dao.close()
+        self.assertTrue(os.path.exists(self.dao.indexpath))
+
+        # fresh store maps the saved indexes instead of rebuilding
+        dao = self.reopen()
+        self.assertEqual([1, 2], [p.code for p in dao.retrieve_posts("think")])
+        self.assertIsNotNone(dao.search_index.mapped)
+        self.assertEqual([2], [p.code for p in dao.rank_posts("think", 5)])
+        self.assertEqual([1], [p.code for p in dao.rank_posts("hello", 5)])
+
+        # a change on disk makes the saved file stale
+        dao.create_post(Post(3, "rethink", "body"))
+        dao = self.reopen()
+        self.assertEqual([1, 2, 3], [p.code for p in dao.retrieve_posts("think")])
+        self.assertIsNone(dao.search_index.mapped)
@@ -0,0 +1,120 @@
+import threading
+from unittest import TestCase
+from blogging.blog import Blog
+from blogging.dao.post_dao_sqlite import PostDAOSQLite
+from blogging.dao.sqlite_database import close_connection
+from blogging.post import Post
+from tests.scratch import use_scratch_folder
+
+class PostDAOSQLiteTest(TestCase):
+
+
+    def setUp(self):
+
+        use_scratch_folder(self)
+
+        self.blog = Blog(1111110000, "test", "test_url", "test@example.com")
+        self.dao = PostDAOSQLite(self.blog, autosave=True)
+
+
+    def test_create_search_update_delete(self):
+
+        self.dao.create_post(Post(1, "first", "body1"))
+        self.dao.create_post(Post(2, "second", "body2"))
+
+        self.assertEqual(Post(1, "first", "body1"), self.dao.search_post(1))
+        self.assertIsNone(self.dao.search_post(3))
+
+        self.assertTrue(self.dao.update_post(1, "changed", None, "author"))
+        self.assertEqual("changed", self.dao.search_post(1).title)
+        self.assertEqual("body1", self.dao.search_post(1).text)
+        self.assertEqual("author", self.dao.search_post(1).author)
+        self.assertFalse(self.dao.update_post(3, "x", "y"))
+
+        self.assertTrue(self.dao.delete_post(2))
+        self.assertFalse(self.dao.delete_post(2))
+        self.assertIsNone(self.dao.search_post(2))
+
+
+    def test_retrieve_and_list_posts(self):
+
+        self.dao.create_post(Post(1, "Thinking", "x", "hello"))
+        self.dao.create_post(Post(2, "other", "I THINK so", "bob"))
+        self.dao.create_post(Post(3, "no match", "zzz", None))
+
+        self.assertEqual([1, 2], [p.code for p in self.dao.retrieve_posts("think")])
+        self.assertEqual([3, 2, 1], [p.code for p in self.dao.list_posts()])
+
+
+    def test_ranked_search_folds_text_and_query(self):
+
+        self.dao.create_post(Post(1, "ＢＬＯＧ", "Straße"))
+        self.dao.create_post(Post(2, "other", "text"))
+
+        self.assertEqual([1], [p.code for p in self.dao.rank_posts("blog", 5)])
+        self.assertEqual([1], [p.code for p in self.dao.rank_posts("STRASSE", 5)])
+
+        # updates and deletes take the folded words back out
+        self.dao.update_post(1, "plain", None)
+        self.assertEqual([], self.dao.rank_posts("blog", 5))
+        self.dao.delete_post(1)
+        self.assertEqual([], self.dao.rank_posts("strasse", 5))
+
+
+    def test_unfolded_search_table_is_rebuilt(self):
+
+        self.dao.create_post(Post(1, "ＢＬＯＧ", "body"))
+
+        # a search table from before folding indexed the raw text
+        connection = self.dao.connection
+        with connection:
+            for trigger in ("posts_fts_insert", "posts_fts_delete", "posts_fts_update"):
+                connection.execute(f"DROP TRIGGER {trigger}")
+            connection.execute("DROP TABLE posts_fts")
+            connection.execute(
+                "CREATE VIRTUAL TABLE posts_fts USING fts5(title, text, author, content='posts', content_rowid='rowid')"
+            )
+            connection.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+        close_connection(self.dao.database_file)
+
+        reopened = PostDAOSQLite(self.blog, autosave=True)
+        self.assertEqual([1], [p.code for p in reopened.rank_posts("blog", 5)])
+
+
+    def test_posts_are_scoped_by_blog_and_persist(self):
+
+        other_blog = Blog(2222220000, "other", "other_url", "other@example.com")
+        other_dao = PostDAOSQLite(other_blog, autosave=True)
+
+        self.dao.create_post(Post(1, "first", "body1"))
+        self.dao.create_post(Post(2, "second", "body2"))
+        other_dao.create_post(Post(1, "elsewhere", "body"))
+
+        reopened = PostDAOSQLite(self.blog, autosave=True)
+        self.assertEqual([2, 1], [p.code for p in reopened.list_posts()])
+        self.assertEqual(3, self.blog.next_post_id)
+        self.assertEqual("elsewhere", other_dao.search_post(1).title)
+
+
+    def test_concurrent_updates_keep_each_others_fields(self):
+
+        # each thread changes one field, a read-modify-write race would write
+        # back the other thread's old value
+        for code in range(1, 51):
+            self.dao.create_post(Post(code, "title", "text", "author"))
+
+        def update(**fields):
+            for code in range(1, 51):
+                self.dao.update_post(code, fields.get("title"), fields.get("text"), fields.get("author"))
+
+        threads = [
+            threading.Thread(target=update, kwargs={"title": "new title"}),
+            threading.Thread(target=update, kwargs={"text": "new text"}),
+            threading.Thread(target=update, kwargs={"author": "new author"}),
+        ]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+
+        for code in range(1, 51):
+            post = self.dao.search_post(code)
+            self.assertEqual(("new title", "new text", "new author"), (post.title, post.text, post.author))
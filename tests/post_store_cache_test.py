@@ -0,0 +1,76 @@
+from unittest import TestCase
+from blogging.dao.post_store_cache import PostStoreCache
+
+class FakeStore:
+
+    def __init__(self, size_bytes=0, dirty=False):
+        self.size_bytes = size_bytes
+        self.dirty = dirty
+        self.flushed = False
+        self.closed = False
+
+    def flush(self):
+        self.flushed = True
+        self.dirty = False
+
+    def close(self):
+        self.closed = True
+
+class FakeBlog:
+    pass
+
+class PostStoreCacheTest(TestCase):
+
+
+    def test_hits_misses_and_lru_eviction(self):
+
+        cache = PostStoreCache(max_blogs=2)
+        blogs = [FakeBlog(), FakeBlog(), FakeBlog()]
+        stores = [FakeStore(), FakeStore(), FakeStore()]
+
+        cache.get(blogs[0], lambda: stores[0])
+        cache.get(blogs[1], lambda: stores[1])
+        self.assertIs(stores[0], cache.get(blogs[0], lambda: None))
+
+        # blog 1 is least recently used, closed by the closer
+        cache.get(blogs[2], lambda: stores[2])
+        cache.close_evicted()
+
+        self.assertTrue(stores[1].closed)
+        self.assertFalse(stores[0].closed)
+        self.assertEqual({"hits": 1, "misses": 3, "evictions": 1, "blogs": 2, "bytes": 0}, cache.stats())
+
+
+    def test_dirty_store_is_flushed_before_eviction(self):
+
+        cache = PostStoreCache(max_bytes=100)
+        clean = FakeStore(size_bytes=60)
+        dirty = FakeStore(size_bytes=60, dirty=True)
+
+        blogs = [FakeBlog(), FakeBlog()]
+
+        cache.get(blogs[0], lambda: dirty)
+        cache.get(blogs[1], lambda: clean)
+        cache.close_evicted()
+
+        self.assertTrue(dirty.flushed)
+        self.assertTrue(dirty.closed)
+        self.assertFalse(clean.flushed)
+        self.assertEqual(1, cache.evictions)
+
+
+    def test_store_still_closing_is_taken_back(self):
+
+        cache = PostStoreCache(max_blogs=1)
+        blogs = [FakeBlog(), FakeBlog()]
+        store = FakeStore(dirty=True)
+
+        # evicted and queued, but the closer has not reached it yet
+        with cache.lock:
+            cache.get(blogs[0], lambda: store)
+            cache.get(blogs[1], lambda: FakeStore())
+            self.assertIn(id(blogs[0]), cache.closing)
+
+            # asked for again => the same store, not a reload from disk
+            self.assertIs(store, cache.get(blogs[0], lambda: None))
+            self.assertNotIn(id(blogs[0]), cache.closing)
@@ -1,3 +1,7 @@
+import copyreg
+import io
+import pickle
+from datetime import datetime
 from unittest import TestCase
 from blogging.post import Post
 from time import sleep
@@ -31,4 +35,32 @@ class PostTest(TestCase):
         self.assertEqual(old_created, p.created_at)
 
         #updated_at should change
-        self.assertNotEqual(old_updated, p.updated_at)
\ No newline at end of file
+        self.assertNotEqual(old_updated, p.updated_at)
+
+
+    def test_pickle_round_trip_and_legacy_state(self):
+
+        p = Post(1, "title", "body", "author")
+        copy = pickle.loads(pickle.dumps(p))
+
+        self.assertEqual(p, copy)
+        self.assertEqual("author", copy.author)
+        self.assertEqual(p.created_at, copy.created_at)
+
+        #posts pickled before slots carry a __dict__ with datetimes
+        created = datetime(2025, 12, 4, 22, 51, 6, 534635)
+        legacy = {"code": 2, "title": "old", "text": "post", "created_at": created, "updated_at": created}
+
+        class LegacyPickler(pickle.Pickler):
+            def reducer_override(self, obj):
+                if isinstance(obj, Post): return (copyreg.__newobj__, (Post,), legacy)
+                return NotImplemented
+
+        buffer = io.BytesIO()
+        LegacyPickler(buffer).dump(p)
+        old = pickle.loads(buffer.getvalue())
+
+        self.assertEqual(2, old.code)
+        self.assertIsNone(old.author)
+        self.assertEqual(created, old.created_at)
+        self.assertEqual(created, old.updated_at)
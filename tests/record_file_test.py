@@ -0,0 +1,49 @@
+from unittest import TestCase
+from blogging.dao.record_file import decode_records, encode_records, is_record_file
+
+HEADERS = [
+    (1, "first", "ana", 10, 11, 0, 5),
+    (2, "sécond", None, 20, 21, 5, 7),
+    (5, "third", "ana", 30, 31, 12, 0),
+]
+
+class RecordFileTest(TestCase):
+
+
+    def test_round_trip(self):
+
+        data = encode_records(3, "1.dat.body.3", HEADERS)
+
+        self.assertTrue(is_record_file(data))
+        generation, name, headers, bad = decode_records(data)
+        self.assertEqual((3, "1.dat.body.3", 0), (generation, name, bad))
+        self.assertEqual(HEADERS, list(headers))
+
+
+    def test_strings_holding_a_nul(self):
+
+        headers = [(1, "a\x00b", "x\x00", 1, 1, 0, 0), (2, "", "", 2, 2, 0, 0)]
+        self.assertEqual(headers, list(decode_records(encode_records(1, "b", headers))[2]))
+
+
+    def test_damaged_row_is_skipped(self):
+
+        data = bytearray(encode_records(1, "b", HEADERS))
+        data[data.rindex("sécond".encode("utf-8"))] ^= 1
+
+        generation, name, headers, bad = decode_records(bytes(data))
+        self.assertEqual(1, bad)
+        self.assertEqual([1, 5], [header[0] for header in headers])
+
+
+    def test_cut_strings_lose_only_their_rows(self):
+
+        data = encode_records(1, "b", HEADERS)
+
+        generation, name, headers, bad = decode_records(data[:-3])
+        self.assertEqual((2, 1), (len(headers), bad))
+
+        with self.assertRaises(ValueError):
+            decode_records(data[:40])
+        with self.assertRaises(ValueError):
+            decode_records(data + b"x")
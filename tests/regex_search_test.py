@@ -0,0 +1,97 @@
+import re
+import threading
+import time
+from unittest import TestCase
+from blogging.exception.search_timeout_exception import SearchTimeoutException
+from blogging.dao.regex_search import filter_posts, folded_literal, required_literal
+from blogging.post import Post
+
+class RegexSearchTest(TestCase):
+
+
+    def assertRequired(self, pattern, text):
+
+        # the literal must be in the text whenever the pattern matches it
+        self.assertIsNotNone(re.search(pattern, text, re.IGNORECASE))
+        self.assertIn(required_literal(pattern).lower(), text.lower())
+
+
+    def test_plain_runs(self):
+
+        self.assertEqual("hello world", required_literal("hello world"))
+        self.assertEqual("my journey", required_literal("^my journey$"))
+        self.assertEqual(".net", required_literal(r"\.net"))
+        self.assertEqual("cd", required_literal("(ab)+cd"))
+
+
+    def test_optional_pieces_are_not_required(self):
+
+        self.assertEqual("", required_literal("foo|bar"))
+        self.assertEqual("bc", required_literal("a?bc"))
+        self.assertEqual("", required_literal("(?x) hello"))
+        self.assertEqual("", required_literal("[abc]+"))
+
+
+    def test_repeat_counts_are_skipped(self):
+
+        self.assertEqual("", required_literal("x{10}"))
+        self.assertEqual("bc", required_literal("a{2,3}bc"))
+        self.assertEqual("bc", required_literal("a{,3}bc"))
+        self.assertRequired("x{10}", "xxxxxxxxxx")
+        self.assertRequired("ab{2}c", "abbc")
+
+
+    def test_escape_arguments_are_skipped(self):
+
+        self.assertEqual("bc", required_literal(r"\x41bc"))
+        self.assertEqual("bc", required_literal(r"\u0041bc"))
+        self.assertEqual("bc", required_literal(r"\U00000041bc"))
+        self.assertEqual("bc", required_literal(r"\N{LATIN CAPITAL LETTER A}bc"))
+        self.assertEqual("xy", required_literal(r"\101xy"))
+        self.assertEqual("bc", required_literal(r"(a)\1bc"))
+        self.assertRequired(r"\x41bc", "Abc")
+        self.assertRequired(r"\0xy", "\0xy")
+
+
+    def test_folded_literal_drops_unsafe_folds(self):
+
+        self.assertEqual("straße", required_literal("straße"))
+        self.assertEqual("", folded_literal("straße"))
+        self.assertEqual("journey", folded_literal("JOURNEY"))
+
+
+    def test_filter_matches_any_field(self):
+
+        posts = [Post(1, "a", "xxxxxxxxxx"), Post(2, "b", "xxx"), Post(3, "xxxxxxxxxx", "c")]
+        fields = lambda post: (post.title, post.text, post.author)
+
+        matched = filter_posts(posts, "x{10}", fields)
+        self.assertEqual([1, 3], [post.code for post in matched])
+
+        # same answer from the match process
+        matched = filter_posts(posts, "x{10}", fields, deadline=time.monotonic() + 10)
+        self.assertEqual([1, 3], [post.code for post in matched])
+
+
+    def test_slow_pattern_stops_at_the_deadline(self):
+
+        posts = [Post(1, "t", "a" * 28 + "!")]
+        fields = lambda post: (post.title, post.text, post.author)
+
+        started = time.monotonic()
+        with self.assertRaises(SearchTimeoutException):
+            list(filter_posts(posts, "(a+)+$", fields, deadline=started + 0.2))
+
+        self.assertLess(time.monotonic() - started, 2)
+
+
+    def test_slow_pattern_stops_on_cancel(self):
+
+        posts = [Post(1, "t", "a" * 28 + "!")]
+        fields = lambda post: (post.title, post.text, post.author)
+        cancel = threading.Event()
+        threading.Timer(0.2, cancel.set).start()
+
+        started = time.monotonic()
+        self.assertEqual([], list(filter_posts(posts, "(a+)+$", fields, cancel=cancel)))
+        self.assertLess(time.monotonic() - started, 2)
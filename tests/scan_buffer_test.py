@@ -0,0 +1,40 @@
+import random
+from unittest import TestCase
+from blogging.dao.scan_buffer import ScanBuffer
+
+class ScanBufferTest(TestCase):
+
+
+    def test_patches_match_a_rebuild(self):
+
+        texts = {}
+        buffer = ScanBuffer([], "\x00")
+        rng = random.Random(11)
+
+        for _ in range(2000):
+            code = rng.randrange(100)
+            if rng.random() < 0.6:
+                texts[code] = "".join(rng.choice("abc") for _ in range(rng.randrange(6)))
+                buffer.add(code, texts[code])
+            else:
+                texts.pop(code, None)
+                buffer.remove(code)
+
+            query = rng.choice(["a", "ab", "ca", "bb"])
+            self.assertEqual(sorted(code for code, text in texts.items() if query in text), buffer.find(query))
+
+        # dead rows never outgrow the live ones for long
+        self.assertLessEqual(buffer.dead_size, buffer.length * 0.5)
+
+
+    def test_hits_in_changed_posts_are_skipped(self):
+
+        buffer = ScanBuffer([(1, "apple"), (2, "pear"), (3, "plum")], "\x00")
+
+        buffer.add(1, "fig")
+        buffer.remove(3)
+        buffer.add(0, "grape")
+
+        self.assertEqual([0, 2], buffer.find("p"))
+        self.assertEqual([1], buffer.find("fig"))
+        self.assertEqual([], buffer.find("apple"))
@@ -0,0 +1,26 @@
+import os
+import tempfile
+from blogging.configuration import Configuration
+from blogging.dao.sqlite_database import close_connection
+
+
+####point record files, indexes, blogs.json and the sqlite database of test at a scratch folder
+####for the length of the test, returns the folder, cleanups run after tearDown
+
+def use_scratch_folder(test):
+
+    temp_dir = tempfile.TemporaryDirectory()
+    test.addCleanup(temp_dir.cleanup)
+
+    config_class = Configuration().__class__
+    for name in ("records_path", "blogs_file", "database_file"):
+        test.addCleanup(setattr, config_class, name, getattr(config_class, name))
+
+    config_class.records_path = temp_dir.name
+    config_class.blogs_file = os.path.join(temp_dir.name, "blogs.json")
+    config_class.database_file = os.path.join(temp_dir.name, "test.db")
+
+    #last in, first out: the connection closes before its file goes
+    test.addCleanup(close_connection, config_class.database_file)
+
+    return temp_dir.name
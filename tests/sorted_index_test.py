@@ -0,0 +1,64 @@
+import random
+from unittest import TestCase
+from blogging.dao import sorted_index
+from blogging.dao.sorted_index import SortedIndex
+
+class SortedIndexTest(TestCase):
+
+
+    def setUp(self):
+
+        # tiny chunks so a few hundred keys split and drop chunks
+        self.old_load = sorted_index.LOAD
+        sorted_index.LOAD = 4
+
+
+    def tearDown(self):
+
+        sorted_index.LOAD = self.old_load
+
+
+    def test_matches_a_sorted_list(self):
+
+        index = SortedIndex()
+        expected = set()
+        rng = random.Random(7)
+
+        for _ in range(500):
+            key = rng.randrange(200)
+            if rng.random() < 0.6:
+                self.assertEqual(key not in expected, index.add(key))
+                expected.add(key)
+            else:
+                self.assertEqual(key in expected, index.discard(key))
+                expected.discard(key)
+
+        self.assertEqual(sorted(expected), list(index))
+        self.assertEqual(sorted(expected, reverse=True), list(reversed(index)))
+        self.assertEqual(len(expected), len(index))
+        self.assertEqual(max(expected), index.last())
+        self.assertEqual(min(expected), index.first())
+
+
+    def test_range_queries(self):
+
+        index = SortedIndex(range(0, 100, 2))
+
+        self.assertEqual([10, 12, 14], list(index.irange(10, 14)))
+        self.assertEqual([12], list(index.irange(10, 14, inclusive=(False, False))))
+        self.assertEqual([14, 12, 10], list(index.irange(9, 15, reverse=True)))
+        self.assertEqual([96, 98], list(index.irange(low=95)))
+        self.assertEqual([4, 2, 0], list(index.irange(high=5, reverse=True)))
+        self.assertEqual([], list(index.irange(100)))
+        self.assertEqual([], list(index.irange(20, 10)))
+        self.assertEqual([], list(SortedIndex().irange()))
+
+
+    def test_tuple_keys(self):
+
+        index = SortedIndex([(5, 2), (5, 1), (3, 9)])
+
+        self.assertEqual([(3, 9), (5, 1), (5, 2)], list(index))
+        self.assertEqual([(5, 1), (5, 2)], list(index.irange((5,), (6,))))
+        self.assertIn((5, 1), index)
+        self.assertNotIn((5, 3), index)
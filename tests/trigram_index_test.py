@@ -0,0 +1,32 @@
+from unittest import TestCase
+from blogging.dao.trigram_index import TrigramIndex
+
+class TrigramIndexTest(TestCase):
+
+
+    def setUp(self):
+
+        self.index = TrigramIndex()
+        self.index.add(1, ("thinking", "x", "hello"))
+        self.index.add(2, ("other", "i think so", "bob"))
+        self.index.add(3, ("no match", "zzz", ""))
+
+
+    def test_candidates_contain_every_match(self):
+
+        self.assertEqual({1, 2}, self.index.candidates("think"))
+        self.assertEqual({3}, self.index.candidates("match"))
+        self.assertEqual(set(), self.index.candidates("travel"))
+
+
+    def test_short_query_cannot_be_narrowed(self):
+
+        self.assertIsNone(self.index.candidates("th"))
+
+
+    def test_remove_drops_key(self):
+
+        self.index.remove(2, ("other", "i think so", "bob"))
+
+        self.assertEqual({1}, self.index.candidates("think"))
+        self.assertNotIn("bob", self.index.postings)